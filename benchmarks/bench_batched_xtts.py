@@ -0,0 +1,63 @@
+"""一括生成のスループットを、行ごとのループ（batch=1）とバッチ推論で比較する。
+
+事前構築済み voice（src/voice/models/tts_model.json の voice_id）と XTTS v2 モデルが必要。
+合成キャッシュは無効化して毎回推論させる。
+
+使い方:
+    python benchmarks/bench_batched_xtts.py [--csv input/原稿.csv] [--rows 16] [--batch-sizes 1,4,8]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO))
+
+os.environ["SVM_SYNTH_CACHE_MAX_MB"] = "0"
+
+from src.voice.voice_generator import VoiceGenerator, load_script_csv  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--csv", default=str(REPO / "input" / "原稿.csv"))
+    parser.add_argument("--rows", type=int, default=16)
+    parser.add_argument("--batch-sizes", default="1,4,8")
+    args = parser.parse_args()
+
+    saved = json.loads((REPO / "src" / "voice" / "models" / "tts_model.json").read_text(encoding="utf-8"))
+    voice_id = saved.get("voice_id")
+    if not voice_id:
+        print("tts_model.json に voice_id がありません。Web UI で音声生成モデルを構築してください。")
+        return 2
+    voice_dir = Path(saved.get("voice_dir") or "src/voice/models")
+    voice_dir = voice_dir if voice_dir.is_absolute() else (REPO / voice_dir)
+
+    rows = [r for r in load_script_csv(Path(args.csv)) if r.script.strip()][: args.rows]
+    chars = sum(len(r.script) for r in rows)
+    vg = VoiceGenerator()
+
+    print(f"rows={len(rows)} chars={chars} device={vg._device}")
+    baseline = None
+    for size in [int(s) for s in args.batch_sizes.split(",")]:
+        with tempfile.TemporaryDirectory() as tmp:
+            t0 = time.perf_counter()
+            vg.generate_rows(rows, voice_id=voice_id, voice_dir=voice_dir, output_dir=Path(tmp), batch_size=size)
+            wall = time.perf_counter() - t0
+        baseline = baseline or wall
+        print(
+            f"batch={size:>2}: {wall:.2f}s  {len(rows) / wall:.2f} rows/s  {chars / wall:.1f} chars/s  "
+            f"speedup={baseline / wall:.2f}x"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,109 @@
+"""原稿CSV（既定 5 万行）の読み込み時間を、変更前の実装と `load_script_csv` で比較する。
+
+変更前は utf-8-sig / cp932 / euc-jp の 3 通りで全体をデコードし、それぞれを 1 文字ずつの
+Python ループで採点してから DictReader で読んでいた。UTF-8 と CP932 のファイルを作って計測する。
+
+使い方:
+    python benchmarks/bench_csv_load.py [--rows 50000] [--repeat 3]
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("SVM_FAKE_TTS", "1")
+
+from src.voice.voice_generator import ScriptRow, load_script_csv  # noqa: E402
+
+
+def _legacy_decode(data: bytes) -> str:
+    """変更前の `_decode_csv_bytes`（BOM 判定は省略）。"""
+
+    def japanese_count(s: str) -> int:
+        n = 0
+        for ch in s:
+            o = ord(ch)
+            if 0x3040 <= o <= 0x309F:
+                n += 1
+            elif 0x30A0 <= o <= 0x30FF:
+                n += 1
+            elif 0x4E00 <= o <= 0x9FFF:
+                n += 1
+        return n
+
+    best_val = float("-inf")
+    best_text = None
+    for enc in ("utf-8-sig", "cp932", "euc-jp"):
+        s = data.decode(enc, errors="replace")
+        header_bonus = 200.0 if ("index" in s.lower() and "script" in s.lower()) else 0.0
+        val = header_bonus + japanese_count(s) * 3.0 - s.count("\ufffd") * 100.0 - s.count("\x00") * 50.0
+        if val > best_val:
+            best_val, best_text = val, s
+    return best_text if best_text is not None else data.decode("utf-8-sig", errors="replace")
+
+
+def _legacy_load(path: Path) -> list[ScriptRow]:
+    """変更前の `load_script_csv`。"""
+
+    reader = csv.DictReader(io.StringIO(_legacy_decode(path.read_bytes())))
+    field_map = {f.strip().lower(): f for f in reader.fieldnames or [] if f}
+    rows: list[ScriptRow] = []
+    for r in reader:
+        raw_idx = (r.get(field_map["index"]) or "").strip()
+        raw_script = (r.get(field_map["script"]) or "").strip()
+        if not raw_idx:
+            continue
+        try:
+            idx = int(raw_idx)
+        except Exception:
+            continue
+        rows.append(ScriptRow(index=idx, script=raw_script))
+    rows.sort(key=lambda x: x.index)
+    return rows
+
+
+def _bench(label: str, fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    print(f"{label:<22} {best * 1e3:9.1f} ms")
+    return best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    buf = io.StringIO()
+    w = csv.writer(buf, lineterminator="\r\n")
+    w.writerow(["index", "script"])
+    for i in range(args.rows):
+        w.writerow([i, f"スライド{i}では、音声合成のパイプラインについて説明します。Latency と throughput を比べます。"])
+    text = buf.getvalue()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for enc in ("utf-8", "cp932"):
+            path = Path(tmp) / f"原稿_{enc}.csv"
+            path.write_bytes(text.encode(enc))
+            print(f"[{enc}] {args.rows} rows, {path.stat().st_size / 1e6:.1f} MB")
+            assert _legacy_load(path) == load_script_csv(path)
+            before = _bench("  before", lambda: _legacy_load(path), args.repeat)
+            after = _bench("  after", lambda: load_script_csv(path), args.repeat)
+            print(f"  speedup: {before / after:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,90 @@
+"""短いクリップ 100 本の MP3 エンコードで、ffmpeg の起動とプロセス内エンコード（lameenc）を比較する。
+
+どちらも同じエンコードプール（同じワーカー数）に載せるため、差は ffmpeg プロセスの起動の有無だけになる。
+参考として、変更前の経路（毎回 ffmpeg を探索して 1 本ずつ起動）も計測する。
+
+使い方:
+    python benchmarks/bench_encoder_pool.py [--clips 100] [--seconds 1.5] [--workers 2]
+"""
+
+from __future__ import annotations
+
+import argparse
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import imageio_ffmpeg  # noqa: E402
+import numpy as np  # noqa: E402
+
+from src.voice.ffmpeg_pool import EncoderPool  # noqa: E402
+from src.voice.lame import lame_available  # noqa: E402
+from src.voice.voice_generator import _encode_pcm_to_mp3, _ffmpeg_encode_pcm_to_mp3, _pcm16_bytes  # noqa: E402
+
+
+def _spawn_per_file(audio: np.ndarray, sr: int, dst: Path) -> None:
+    # 変更前の経路: 毎回 ffmpeg を探索して起動し、1 本ずつ終わるのを待つ
+    args = [
+        imageio_ffmpeg.get_ffmpeg_exe(),
+        "-y", "-hide_banner", "-loglevel", "error", "-nostats",
+        "-f", "s16le", "-ar", str(sr), "-ac", "1", "-i", "pipe:0",
+        "-vn", "-c:a", "libmp3lame", "-q:a", "3", str(dst),
+    ]
+    proc = subprocess.run(args, input=_pcm16_bytes(audio), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.decode("utf-8", errors="replace"))
+
+
+def _run_pool(fn, clips: list[np.ndarray], sr: int, out: Path, prefix: str, workers: int) -> float:
+    pool = EncoderPool(workers=workers, max_queue=workers * 2)
+    pool.check_health()
+    t0 = time.perf_counter()
+    futs = [pool.submit(fn, audio, sr, out / f"{prefix}_{i:03d}.mp3") for i, audio in enumerate(clips)]
+    for f in futs:
+        f.result()
+    elapsed = time.perf_counter() - t0
+    pool.close()
+    return elapsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clips", type=int, default=100)
+    parser.add_argument("--seconds", type=float, default=1.5)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    sr = 24000
+    rng = np.random.default_rng(0)
+    clips = [(rng.standard_normal(int(sr * args.seconds)) * 0.1).astype(np.float32) for _ in range(args.clips)]
+
+    def per_clip(seconds: float) -> str:
+        return f"{seconds:.3f}s ({seconds / args.clips * 1000:.1f} ms/clip)"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        out = Path(tmp)
+
+        t0 = time.perf_counter()
+        for i, audio in enumerate(clips):
+            _spawn_per_file(audio, sr, out / f"spawn_{i:03d}.mp3")
+        serial = time.perf_counter() - t0
+
+        spawn = _run_pool(_ffmpeg_encode_pcm_to_mp3, clips, sr, out, "ffmpeg", args.workers)
+        inproc = _run_pool(_encode_pcm_to_mp3, clips, sr, out, "lame", args.workers) if lame_available() else None
+
+    print(f"clips={args.clips} seconds={args.seconds} workers={args.workers}")
+    print(f"serial spawn (before)      : {per_clip(serial)}")
+    print(f"pool + ffmpeg per file     : {per_clip(spawn)}")
+    if inproc is None:
+        print("pool + in-process lameenc  : skipped (lameenc is not installed)")
+    else:
+        print(f"pool + in-process lameenc  : {per_clip(inproc)} speedup vs ffmpeg at equal workers={spawn / inproc:.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,92 @@
+"""行ごとの推論呼び出しのオーバーヘッドを、プランを毎回作る場合（変更前）と使い回す場合で比較する。
+
+XTTS 本体は使わず、`inference` が即座に返すフェイクモデルとフェイク latent で計測するため、
+表示される時間はほぼ「推論以外」の前処理（signature 解決・引数探索・デバイス問い合わせ・
+latent 転送・inference_mode への出入り）の差になる。
+
+使い方:
+    python benchmarks/bench_inference_plan.py [--rows 20000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import numpy as np  # noqa: E402
+import torch  # noqa: E402
+
+from src.voice.inference_plan import LatentInferencePlan, waveform_from_output  # noqa: E402
+
+_WAV = np.zeros((240,), dtype=np.float32)
+
+
+class FakeXtts(torch.nn.Module):
+    """XTTS v2 と同じ引数名を持つ、何もしない inference。"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.proj = torch.nn.Linear(1024, 1024)
+
+    def inference(
+        self,
+        text,
+        language,
+        gpt_cond_latent,
+        speaker_embedding,
+        temperature=0.75,
+        length_penalty=1.0,
+        repetition_penalty=10.0,
+        top_k=50,
+        top_p=0.85,
+        do_sample=True,
+        num_beams=1,
+        speed=1.0,
+        enable_text_splitting=False,
+        **hf_generate_kwargs,
+    ):
+        return {"wav": _WAV}
+
+
+def _bench(label: str, fn, rows: int) -> float:
+    fn()  # ウォームアップ
+    t0 = time.perf_counter()
+    for _ in range(rows):
+        fn()
+    per_row = (time.perf_counter() - t0) / rows
+    print(f"{label:<28} {per_row * 1e6:8.2f} us/row")
+    return per_row
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=20000)
+    args = parser.parse_args()
+
+    model = FakeXtts()
+    gpt = torch.zeros(1, 32, 1024)
+    spk = torch.zeros(1, 512, 1)
+    params = {"enable_text_splitting": True}
+
+    def per_row_plan() -> None:
+        # 変更前: 行ごとに signature・引数名・デバイスを解決してから呼ぶ
+        plan = LatentInferencePlan.build(model, gpt_cond_latent=gpt, speaker_embedding=spk, language="ja", params=params)
+        waveform_from_output(plan("こんにちは。"))
+
+    plan = LatentInferencePlan.build(model, gpt_cond_latent=gpt, speaker_embedding=spk, language="ja", params=params)
+
+    def cached_plan() -> None:
+        waveform_from_output(plan("こんにちは。"))
+
+    before = _bench("per-row resolution (before)", per_row_plan, args.rows)
+    after = _bench("precompiled plan (after)", cached_plan, args.rows)
+    print(f"overhead saved: {(before - after) * 1e6:.2f} us/row ({before / after:.1f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,100 @@
+"""fp32 と動的 INT8 量子化の XTTS 推論を固定スクリプトで比較する。
+
+速度比・GPT の重みメモリ削減量・波形の類似度（長さ比 / 平均スペクトルのコサイン類似度 /
+波形相関）を表示する。サンプリングの乱数で差が出ないよう、両者とも greedy（do_sample=False）で
+推論する。XTTS v2 モデルと話者（保存済み voice または話者サンプル）が必要。
+
+使い方:
+    python benchmarks/bench_quantize.py [--repeat 2]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO))
+
+os.environ["SVM_QUANTIZE"] = "off"  # fp32 でロードし、計測後にその場で量子化する
+
+import numpy as np  # noqa: E402
+import torch  # noqa: E402
+
+from src.voice.perf_profile import TUNE_CORPUS  # noqa: E402
+from src.voice.quantize import module_bytes, quantize_xtts  # noqa: E402
+from src.voice.voice_generator import VoiceGenerator, pick_default_speaker_wav  # noqa: E402
+
+
+def _synthesize(model, latents, scripts: list[str], repeat: int) -> tuple[list[np.ndarray], float]:
+    gpt_cond, spk = latents
+    wavs: list[np.ndarray] = []
+    best = float("inf")
+    for _ in range(repeat):
+        wavs = []
+        t0 = time.perf_counter()
+        with torch.inference_mode():
+            for text in scripts:
+                out = model.inference(text, "ja", gpt_cond, spk, do_sample=False, enable_text_splitting=True)
+                wavs.append(np.asarray(out["wav"], dtype=np.float32).reshape(-1))
+        best = min(best, time.perf_counter() - t0)
+    return wavs, best
+
+
+def _mean_log_spectrum(wav: np.ndarray, n_fft: int = 1024) -> np.ndarray:
+    frames = [wav[i : i + n_fft] for i in range(0, max(1, len(wav) - n_fft), n_fft // 2)]
+    frames = [f for f in frames if len(f) == n_fft] or [np.pad(wav, (0, max(0, n_fft - len(wav))))[:n_fft]]
+    spec = np.abs(np.fft.rfft(np.stack(frames) * np.hanning(n_fft), axis=1))
+    return np.log1p(spec).mean(axis=0)
+
+
+def _similarity(a: np.ndarray, b: np.ndarray) -> tuple[float, float, float]:
+    la, lb = _mean_log_spectrum(a), _mean_log_spectrum(b)
+    spectral = float(np.dot(la, lb) / (np.linalg.norm(la) * np.linalg.norm(lb) + 1e-9))
+    n = min(len(a), len(b))
+    corr = float(np.corrcoef(a[:n], b[:n])[0, 1]) if n > 1 else 0.0
+    return len(b) / max(1, len(a)), spectral, corr
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=2, help="各モードの計測回数（最速値を採用）")
+    args = parser.parse_args()
+
+    vg = VoiceGenerator()
+    if vg._tts is None:
+        print("XTTS モデルがロードされていません（SVM_FAKE_TTS=1 では比較できません）")
+        return 2
+    model = vg._tts.synthesizer.tts_model
+    speaker = pick_default_speaker_wav()
+    if speaker is None:
+        print("話者サンプルが見つかりません")
+        return 2
+    latents = model.get_conditioning_latents(audio_path=[str(speaker)])
+    scripts = list(TUNE_CORPUS)
+
+    fp32_bytes = module_bytes(model.gpt)
+    fp32_wavs, fp32_time = _synthesize(model, latents, scripts, args.repeat)
+    stats = quantize_xtts(model, "int8")
+    int8_wavs, int8_time = _synthesize(model, latents, scripts, args.repeat)
+
+    audio = sum(len(w) for w in fp32_wavs) / 24000
+    print(f"scripts={len(scripts)} audio={audio:.1f}s repeat={args.repeat}")
+    print(f"fp32 : {fp32_time:.2f}s RTF={fp32_time / audio:.3f}")
+    print(f"int8 : {int8_time:.2f}s RTF={int8_time / audio:.3f} speedup={fp32_time / int8_time:.2f}x")
+    print(
+        f"GPT weights: {fp32_bytes / 2**20:.1f}MB -> {int(stats['bytes_after']) / 2**20:.1f}MB "
+        f"(saved {(fp32_bytes - int(stats['bytes_after'])) / 2**20:.1f}MB)"
+    )
+    print("similarity (length ratio / spectral cosine / waveform corr):")
+    for i, (a, b) in enumerate(zip(fp32_wavs, int8_wavs)):
+        ratio, spectral, corr = _similarity(a, b)
+        print(f"  [{i}] {ratio:.3f} / {spectral:.4f} / {corr:.3f}  {scripts[i][:24]}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
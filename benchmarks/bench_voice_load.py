@@ -0,0 +1,68 @@
+"""voice キャッシュの読み込み時間を、従来の .pth（unpickle + latent の再帰探索）と軽量ファイル（mmap）で比較する。
+
+XTTS v2 の `clone_voice()` と同じ形（gpt_conditioning_latents [1, 32, 1024] と speaker_embedding [1, 512, 1]）の
+.pth を一時ディレクトリに作って計測する。OS のページキャッシュに載った状態（2 回目以降の読み込み）の値になる。
+
+使い方:
+    python benchmarks/bench_voice_load.py [--repeat 200] [--extra-mb 0]
+
+`--extra-mb` で .pth に latent 以外のピクル（独自形式の .pth を想定）を足せる。
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("SVM_FAKE_TTS", "1")
+
+import torch  # noqa: E402
+
+from src.voice.voice_generator import VoiceGenerator  # noqa: E402
+from src.voice.voice_tensors import compact_path, load_compact_voice, save_compact_voice  # noqa: E402
+
+
+def _bench(label: str, fn, repeat: int) -> float:
+    fn()  # ウォームアップ
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    per_load = (time.perf_counter() - t0) / repeat
+    print(f"{label:<32} {per_load * 1e3:8.3f} ms/load")
+    return per_load
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--extra-mb", type=float, default=0.0)
+    args = parser.parse_args()
+
+    vg = VoiceGenerator()
+    with tempfile.TemporaryDirectory() as tmp:
+        voice_file = Path(tmp) / "myvoice.pth"
+        payload: dict[str, object] = {
+            "gpt_conditioning_latents": torch.randn(1, 32, 1024),
+            "speaker_embedding": torch.randn(1, 512, 1),
+        }
+        if args.extra_mb > 0:
+            payload["extra"] = [list(range(1024)) for _ in range(int(args.extra_mb * 1024 * 1024 / 8 / 1024))]
+        torch.save(payload, voice_file)
+        latents = vg._read_legacy_voice_latents(voice_file)
+        assert latents is not None
+        save_compact_voice(voice_file, gpt=latents["gpt"], spk=latents["spk"])
+        print(f".pth {voice_file.stat().st_size} bytes, compact {compact_path(voice_file).stat().st_size} bytes")
+
+        before = _bench("legacy .pth (before)", lambda: vg._read_legacy_voice_latents(voice_file), args.repeat)
+        after = _bench("compact mmap + hash check (after)", lambda: load_compact_voice(voice_file), args.repeat)
+    print(f"speedup: {before / after:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
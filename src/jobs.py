@@ -0,0 +1,224 @@
+"""一括生成ジョブ（バックグラウンド実行 + 進捗ポーリング）。
+
+`/api/generate_from_csv` のように 1 リクエストでデッキ全体を待つと、プロキシや
+ブラウザのタイムアウトに掛かり、途中経過も分からない。ここではジョブを
+キューに積んで専用ワーカースレッドで順に実行し、行ごとの状態・所要時間・ETA を
+スナップショットとして返せるようにする。
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from src.logger import setup_logger
+from src.voice.events import publish_event
+
+logger = setup_logger("Jobs")
+
+
+# 行の状態
+ROW_PENDING = "pending"
+ROW_RUNNING = "running"
+ROW_DONE = "done"
+ROW_SKIPPED = "skipped"
+ROW_ERROR = "error"
+ROW_CANCELLED = "cancelled"
+
+# ジョブの状態
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_CANCELLING = "cancelling"
+JOB_DONE = "done"
+JOB_ERROR = "error"
+JOB_CANCELLED = "cancelled"
+
+_FINISHED = (JOB_DONE, JOB_ERROR, JOB_CANCELLED)
+
+
+class Job:
+    """1 件の一括生成ジョブ。行状態は VoiceGenerator の on_row 通知で更新される。"""
+
+    def __init__(self, job_id: str, indices: list[int], run: Callable[["Job"], object]):
+        self.id = job_id
+        self.status = JOB_QUEUED
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self.result: object = None
+        self.cancel_event = threading.Event()
+        self._run = run
+        self._lock = threading.Lock()
+        self._rows: OrderedDict[int, dict[str, object]] = OrderedDict(
+            (i, {"index": i, "state": ROW_PENDING}) for i in indices
+        )
+
+    def _publish(self, **data: object) -> None:
+        # 進捗の購読者（/api/events）向けに、集計値だけを載せた軽量イベントを送る
+        with self._lock:
+            counts: dict[str, int] = {}
+            for r in self._rows.values():
+                counts[str(r["state"])] = counts.get(str(r["state"]), 0) + 1
+            status = self.status
+        publish_event("job", job_id=self.id, status=status, total=len(self._rows), counts=counts, **data)
+
+    def on_row(self, event: str, index: int, info: dict[str, object]) -> None:
+        self._on_row(event, index, info)
+        self._publish(index=index, row_event=event)
+
+    def _on_row(self, event: str, index: int, info: dict[str, object]) -> None:
+        now = time.time()
+        with self._lock:
+            row = self._rows.setdefault(index, {"index": index, "state": ROW_PENDING})
+            if event == "started":
+                row["state"] = ROW_RUNNING
+                row["started_at"] = now
+            elif event == "done":
+                row["state"] = ROW_DONE
+                row["finished_at"] = now
+                row["seconds"] = round(float(info.get("seconds") or 0.0), 3)
+                row["path"] = info.get("path", "")
+            elif event == "skipped":
+                row["state"] = ROW_SKIPPED
+                row["reason"] = info.get("reason", "")
+                if info.get("path"):
+                    row["path"] = info["path"]
+            elif event == "error":
+                row["state"] = ROW_ERROR
+                row["finished_at"] = now
+                row["error"] = str(info.get("error") or "")
+
+    def _finish(self, status: str, *, error: Optional[str] = None) -> None:
+        with self._lock:
+            self.status = status
+            self.error = error
+            self.finished_at = time.time()
+            if status in (JOB_CANCELLED, JOB_ERROR):
+                for row in self._rows.values():
+                    if row["state"] in (ROW_PENDING, ROW_RUNNING):
+                        row["state"] = ROW_CANCELLED
+        self._publish(error=error)
+
+    def snapshot(self) -> dict[str, object]:
+        now = time.time()
+        with self._lock:
+            rows = [dict(r) for r in self._rows.values()]
+            status = self.status
+
+        counts: dict[str, int] = {}
+        for r in rows:
+            counts[str(r["state"])] = counts.get(str(r["state"]), 0) + 1
+
+        # ETA: 完了行の平均所要時間 × 残り行数（実行中の行は経過時間を差し引く）
+        eta: Optional[float] = None
+        durations = [float(r["seconds"]) for r in rows if r["state"] == ROW_DONE and "seconds" in r]
+        if status in (JOB_QUEUED, JOB_RUNNING, JOB_CANCELLING) and durations:
+            avg = sum(durations) / len(durations)
+            remaining = counts.get(ROW_PENDING, 0) * avg
+            for r in rows:
+                if r["state"] == ROW_RUNNING:
+                    remaining += max(0.0, avg - (now - float(r.get("started_at") or now)))
+            eta = round(remaining, 1)
+
+        return {
+            "id": self.id,
+            "status": status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "elapsed_seconds": round(((self.finished_at or now) - (self.started_at or now)), 3),
+            "error": self.error,
+            "total": len(rows),
+            "counts": counts,
+            "eta_seconds": eta,
+            "rows": rows,
+            "result": self.result if status in _FINISHED else None,
+        }
+
+
+class JobManager:
+    """ジョブを FIFO で 1 件ずつ実行する専用ワーカー。完了済みジョブは上限件数まで保持する。"""
+
+    def __init__(self, *, max_history: int = 50):
+        self._max_history = max_history
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[Job]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None and self._worker.is_alive():
+            return
+        self._worker = threading.Thread(target=self._loop, name="svm-job-worker", daemon=True)
+        self._worker.start()
+
+    def _loop(self) -> None:
+        while True:
+            job = self._queue.get()
+            try:
+                self._execute(job)
+            finally:
+                self._queue.task_done()
+
+    def _execute(self, job: Job) -> None:
+        if job.cancel_event.is_set():
+            job._finish(JOB_CANCELLED)
+            return
+
+        with job._lock:
+            job.status = JOB_RUNNING
+            job.started_at = time.time()
+        job._publish()
+        logger.info(f"[Jobs] start job={job.id} rows={len(job._rows)}")
+        try:
+            job.result = job._run(job)
+        except Exception as e:  # noqa: BLE001
+            if job.cancel_event.is_set():
+                job._finish(JOB_CANCELLED)
+                logger.info(f"[Jobs] cancelled job={job.id}")
+            else:
+                job._finish(JOB_ERROR, error=str(e))
+                logger.exception(f"[Jobs] failed job={job.id}")
+            return
+        job._finish(JOB_DONE)
+        logger.info(f"[Jobs] done job={job.id} in {(job.finished_at or 0) - (job.started_at or 0):.3f}s")
+
+    def submit(self, indices: list[int], run: Callable[[Job], object]) -> Job:
+        job = Job(uuid.uuid4().hex[:12], indices, run)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._trim_history()
+            self._ensure_worker()
+        self._queue.put(job)
+        return job
+
+    def _trim_history(self) -> None:
+        finished = [j for j in self._jobs.values() if j.status in _FINISHED]
+        for j in finished[: max(0, len(finished) - self._max_history)]:
+            self._jobs.pop(j.id, None)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job.cancel_event.set()
+        with job._lock:
+            if job.status == JOB_QUEUED:
+                # キュー待ちのジョブはワーカーが取り出した時点で捨てられる
+                job.status = JOB_CANCELLED
+                job.finished_at = time.time()
+                for row in job._rows.values():
+                    row["state"] = ROW_CANCELLED
+            elif job.status == JOB_RUNNING:
+                job.status = JOB_CANCELLING
+        job._publish()
+        return job
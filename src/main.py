@@ -39,9 +39,40 @@ def _load_saved_voice_model(repo_root: Path) -> dict:
         return {}
 
 
+def tune_main(argv: list[str]) -> int:
+    """`python src/main.py tune`: CPU推論設定を計測し、最速の設定を perf_profile.json に保存する。"""
+
+    from src.voice.perf_profile import tune
+
+    parser = argparse.ArgumentParser(
+        prog="main.py tune",
+        description="Benchmark synthesis over a grid of CPU settings and save the fastest profile.",
+    )
+    parser.add_argument("--script", default=None, help="Corpus CSV (default: built-in fixed corpus).")
+    parser.add_argument("--intra", default=None, help="Intra-op thread counts, comma separated (default: 1,2,4,...,cores).")
+    parser.add_argument("--inter", default=None, help="Inter-op thread counts, comma separated (default: 1,2).")
+    parser.add_argument("--workers", default=None, help="Synthesis worker counts, comma separated (default: 1,2,4).")
+    parser.add_argument("--batch", default=None, help="Batch sizes, comma separated (default: 1,4).")
+    parser.add_argument("--no-save", action="store_true", help="Only report; do not write perf_profile.json.")
+    args = parser.parse_args(argv)
+
+    results = tune(
+        script=Path(args.script) if args.script else None,
+        intra=args.intra,
+        inter=args.inter,
+        workers=args.workers,
+        batch=args.batch,
+        save=not args.no_save,
+    )
+    return 0 if any(r.get("rtf") is not None for r in results) else 1
+
+
 def main() -> int:
     repo_root = _repo_root()
 
+    if len(sys.argv) > 1 and sys.argv[1] == "tune":
+        return tune_main(sys.argv[2:])
+
     parser = argparse.ArgumentParser(
         description="Generate MP3 narration from input/原稿.csv using Coqui XTTS v2.",
     )
@@ -71,6 +102,33 @@ def main() -> int:
         action="store_true",
         help="Do not overwrite existing output files.",
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Bypass the synthesis cache and always re-run TTS.",
+    )
+    parser.add_argument(
+        "--only-changed",
+        action="store_true",
+        help="Regenerate only rows added/edited since the last run (output/manifest.json); remove outputs of deleted rows.",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=None,
+        help="Batch sentence chunks of similar length into one XTTS inference (default: SVM_TTS_BATCH_SIZE or 1).",
+    )
+    parser.add_argument(
+        "--narration",
+        action="store_true",
+        help="After generating, join all row mp3 files into output/narration.mp3 with chapters in narration.json.",
+    )
+    parser.add_argument(
+        "--gap",
+        type=float,
+        default=None,
+        help="Silence between rows in narration.mp3, in seconds (default: SVM_NARRATION_GAP_SECONDS or 0.5).",
+    )
     args = parser.parse_args()
 
     script_csv = Path(args.script)
@@ -115,13 +173,10 @@ def main() -> int:
 
     vg = get_voice_generator()
     if args.index is not None:
-        # まず CSV を読み、指定indexの行だけ生成する。
-        # VoiceGenerator は公開APIとして load_script_csv を持たないため、モジュール関数を使う。
-        from src.voice.voice_generator import load_script_csv
-
-        rows = load_script_csv(script_csv)
+        # まず CSV を読み、指定indexの行だけ生成する（解析済みの原稿はサーバーと同じストアで共有する）。
+        from src.voice.script_store import get_script_store
 
-        target = next((r for r in rows if r.index == args.index), None)
+        target = get_script_store().load(script_csv).row(args.index)
         if target is None:
             print(f"Index not found in CSV: {args.index}")
             return 2
@@ -137,6 +192,7 @@ def main() -> int:
             voice_dir=voice_dir,
             output_dir=out_dir,
             overwrite=not args.no_overwrite,
+            use_cache=not args.no_cache,
         )
         print(f"生成完了: {out_path}")
     else:
@@ -147,8 +203,25 @@ def main() -> int:
             voice_dir=voice_dir,
             output_dir=out_dir,
             overwrite=not args.no_overwrite,
+            use_cache=not args.no_cache,
+            only_changed=args.only_changed,
+            batch_size=args.batch_size,
         )
         print(f"生成完了: {len(generated)} 件")
+
+    if args.narration:
+        # 行ごとの MP3 をフレーム単位で連結する（再エンコードしない）。未生成の行は飛ばす。
+        from src.voice.narration import build_narration
+        from src.voice.script_store import load_script_csv
+
+        indices = [r.index for r in load_script_csv(script_csv) if r.script.strip()]
+        result = build_narration(out_dir, indices=indices, gap_seconds=args.gap)
+        print(
+            f"ナレーション: {out_dir / 'narration.mp3'} "
+            f"({result['duration_seconds']}s, {len(result['chapters'])} チャプター)"
+        )
+        if result["missing"]:
+            print(f"未生成の行を飛ばしました: {result['missing']}")
     return 0
 
 
@@ -3,21 +3,35 @@ import re
 import sys
 import json
 import asyncio
-import subprocess
 import shutil
+import tempfile
 import time
 import threading
 from pathlib import Path
 from typing import Optional
 
-from fastapi import FastAPI, File, HTTPException, UploadFile
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi import FastAPI, File, HTTPException, Request, UploadFile
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel
-
-import imageio_ffmpeg
+from pydantic import BaseModel, Field
 
+from src.jobs import JobManager
 from src.logger import setup_logger
+from src.uploads import (
+    UploadLimitMiddleware,
+    UploadTooLarge,
+    copy_file,
+    copy_upload,
+    retry_on_permission_error,
+    upload_max_bytes,
+)
+from src.voice.audio_prep import prep_enabled, prepare_reference
+from src.voice.events import subscribe_events
+from src.voice.ffmpeg_pool import convert_to_wav, get_encoder_pool
+from src.voice.manifest import ScriptDiff, diff_rows, load_manifest
+from src.voice.narration import build_narration
+from src.voice.scheduler import BULK, INTERACTIVE, get_scheduler
+from src.voice.script_store import ScriptRow, get_script_store, load_script_csv
 
 logger = setup_logger("Server")
 
@@ -25,11 +39,10 @@ logger = setup_logger("Server")
 sys.path.insert(0, str(Path(__file__).parent))
 
 from voice.voice_generator import (
-    ScriptRow,
     get_voice_generator,
     get_voice_generator_async,
     get_tts_init_state,
-    load_script_csv,
+    list_speaker_samples,
     pick_default_speaker_wav,
 )
 
@@ -62,10 +75,20 @@ def _voice_cache_dir(repo_root: Path) -> Path:
 
 
 def _default_voice_id() -> str:
-    # UI/仕様として単一ユーザー想定のため固定IDを使う
+    # voice_id を指定しない場合（UI の既定）に使う ID
     return "myvoice"
 
 
+_VOICE_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def _check_voice_id(voice_id: str) -> str:
+    # voice_id はそのままファイル名（<voice_id>.pth）になるため、パス区切り等は受け付けない
+    if not _VOICE_ID_RE.match(voice_id):
+        raise HTTPException(status_code=400, detail=f"voice_idは英数字・_・- の64文字以内で指定してください: {voice_id}")
+    return voice_id
+
+
 def _rel_to_repo(repo_root: Path, p: Path) -> str:
     try:
         return p.resolve().relative_to(repo_root.resolve()).as_posix()
@@ -95,6 +118,7 @@ def save_voice_model(repo_root: Path, *, speaker_wav: Path) -> Path:
     p = _voice_model_path(repo_root)
     p.parent.mkdir(parents=True, exist_ok=True)
     voice_dir = _voice_cache_dir(repo_root)
+    prev = load_saved_voice_model(repo_root) or {}
     payload = {
         "kind": "myvoice-maker-voice-model",
         "model_name": "tts_models/multilingual/multi-dataset/xtts_v2",
@@ -104,11 +128,95 @@ def save_voice_model(repo_root: Path, *, speaker_wav: Path) -> Path:
         "voice_dir": _rel_to_repo(repo_root, voice_dir),
         "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
     }
+    if prev.get("quantize"):
+        # 手動で設定された推論オプションはモデル再構築でも引き継ぐ
+        payload["quantize"] = prev["quantize"]
     p.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
     return p
 
 
+def _current_script_csv(repo_root: Path) -> Path:
+    """直近アップロードのCSVを優先し、無ければ input/原稿.csv を返す。"""
+
+    with _CSV_LOCK:
+        if _LAST_UPLOADED_SCRIPT_CSV and _LAST_UPLOADED_SCRIPT_CSV.exists():
+            return _LAST_UPLOADED_SCRIPT_CSV
+    return _input_dir(repo_root) / "原稿.csv"
+
+
+def _resolve_voice(
+    repo_root: Path, speaker_wav: Optional[str] = None, requested_voice_id: Optional[str] = None
+) -> tuple[Optional[Path], Optional[str], Optional[Path]]:
+    """生成に使う話者を (speaker_wav, voice_id, voice_dir) で返す。
+
+    優先順位:
+      1) 明示指定の voice_id（構築済みの voices/<voice_id>.pth）
+      2) 明示指定の speaker_wav（テスト等）
+      3) 保存済みモデルの voice キャッシュ（.pth）
+      4) 保存済みモデルの speaker_wav
+      5) samples/ からの自動選択
+    """
+
+    speaker: Optional[Path] = None
+    voice_id: Optional[str] = None
+    voice_dir: Optional[Path] = None
+
+    if requested_voice_id:
+        voice_id = _check_voice_id(requested_voice_id)
+        voice_dir = _voice_cache_dir(repo_root)
+        if not (voice_dir / f"{voice_id}.pth").exists():
+            raise HTTPException(status_code=404, detail=f"voiceが見つかりません（先にモデル構築してください）: {voice_id}")
+        return None, voice_id, voice_dir
+
+    if speaker_wav:
+        speaker = _abs_from_repo(repo_root, speaker_wav)
+        if not speaker.exists():
+            raise HTTPException(status_code=400, detail=f"speaker_wavが見つかりません: {speaker}")
+        return speaker, None, None
+
+    saved = load_saved_voice_model(repo_root) or {}
+    if saved.get("voice_id") and saved.get("voice_dir"):
+        voice_id = str(saved.get("voice_id"))
+        voice_dir = _abs_from_repo(repo_root, str(saved.get("voice_dir")))
+        voice_file = voice_dir / f"{voice_id}.pth"
+        if not voice_file.exists():
+            # voice キャッシュが無い場合は speaker_wav 経由で生成にフォールバック
+            voice_id = None
+            voice_dir = None
+
+    if voice_id is None and saved.get("speaker_wav"):
+        speaker = _abs_from_repo(repo_root, str(saved["speaker_wav"]))
+
+    if voice_id is None and (not speaker or not speaker.exists()):
+        speaker = pick_default_speaker_wav()
+
+    if voice_id is None and not speaker:
+        raise HTTPException(status_code=400, detail="話者サンプルが見つかりません。録音して sample_01.wav 等を作成してください")
+    return speaker, voice_id, voice_dir
+
+
+def _audio_item(repo_root: Path, p: Path) -> dict[str, object]:
+    """voice_XXX.mp3 のパスを UI 向けの {index, audio_url, path} にする。"""
+
+    audio_url = ""
+    try:
+        rel = p.relative_to(repo_root)
+        audio_url = f"/{rel.as_posix()}"
+    except Exception:
+        # 出力先が repo 外（SVM_OUTPUT_DIR差し替え等）の場合、static配信できないためURLは空
+        audio_url = ""
+    # voice_000.mp3 → index 抽出
+    m = re.match(r"^voice_(\d+)\.mp3$", p.name, flags=re.IGNORECASE)
+    idx = int(m.group(1)) if m else -1
+    return {"index": idx, "audio_url": audio_url, "path": str(p)}
+
+
+_JOBS = JobManager()
+
+
 app = FastAPI(title="MyVoice Maker Local API")
+# SVM_UPLOAD_MAX_MB を超える本文は、Starlette がスプールする前に Content-Length で断る
+app.add_middleware(UploadLimitMiddleware, paths=("/api/upload/csv", "/api/upload/recording"))
 
 
 @app.on_event("startup")
@@ -146,6 +254,85 @@ def tts_status() -> dict[str, object]:
     return get_tts_init_state()
 
 
+def _sse(event_type: str, data: dict[str, object], *, event_id: object = None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event_type}")
+    lines.append("data: " + json.dumps(data, ensure_ascii=False, default=str))
+    return "\n".join(lines) + "\n\n"
+
+
+@app.get("/api/events")
+async def events(request: Request) -> StreamingResponse:
+    """初期化の段階遷移（init）・行の生成（row）・ジョブ進捗（job）を Server-Sent Events で配信する。
+
+    接続直後に現在の初期化状態を 1 件送るため、UI はポーリングせずに準備完了を待てる。
+    """
+
+    loop = asyncio.get_running_loop()
+    q: asyncio.Queue[dict[str, object]] = asyncio.Queue(maxsize=1000)
+
+    def enqueue(ev: dict[str, object]) -> None:
+        try:
+            q.put_nowait(ev)
+        except asyncio.QueueFull:
+            # 遅い購読者のためにバックログを無制限に溜めない（最新状態は次のイベントで追いつける）
+            pass
+
+    def on_event(ev: dict[str, object]) -> None:
+        loop.call_soon_threadsafe(enqueue, ev)
+
+    unsubscribe = subscribe_events(on_event)
+
+    async def stream():
+        try:
+            yield "retry: 2000\n\n"
+            yield _sse("init", get_tts_init_state())
+            while True:
+                if await request.is_disconnected():
+                    break
+                try:
+                    ev = await asyncio.wait_for(q.get(), timeout=15.0)
+                except asyncio.TimeoutError:
+                    # プロキシ等で無通信切断されないためのコメント行
+                    yield ": keepalive\n\n"
+                    continue
+                yield _sse(str(ev.get("type") or "message"), ev, event_id=ev.get("seq"))
+        finally:
+            unsubscribe()
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/api/stats")
+async def stats() -> dict[str, object]:
+    """合成キャッシュ・エンコードプール等の統計を返す（モデル未初期化ならキャッシュ統計は省略）。"""
+
+    encoder = get_encoder_pool().stats()
+    st = get_tts_init_state()
+    scripts = get_script_store().stats()
+    scheduler = get_scheduler().stats()
+    if st.get("ready") is not True:
+        return {"ready": False, "encoder": encoder, "scripts": scripts, "scheduler": scheduler}
+    vg = await get_voice_generator_async()
+    return {
+        "ready": True,
+        "synth_cache": vg.synth_cache_stats(),
+        "encoder": encoder,
+        "scripts": scripts,
+        "scheduler": scheduler,
+        "synth_workers": vg.synth_pool_stats(),
+        "quantize": vg.quantize_stats(),
+        "voices": vg.voice_registry_stats(),
+        "coalesce": vg.coalesce_stats(),
+    }
+
+
 @app.post("/api/warmup_tts")
 async def warmup_tts() -> dict[str, str]:
     """Coqui TTSモデルを事前ロードする（初回アクセス高速化）"""
@@ -161,39 +348,6 @@ async def warmup_tts() -> dict[str, str]:
         return {"status": "error", "message": str(e)}
 
 
-def _ffmpeg_convert_to_wav(src_path: Path, dst_path: Path) -> None:
-    """任意の音声を PCM 16-bit mono WAV に変換する（XTTS v2向け）。"""
-    ffmpeg = imageio_ffmpeg.get_ffmpeg_exe()
-    dst_path.parent.mkdir(parents=True, exist_ok=True)
-
-    # XTTS は入力のサンプルレートに厳密ではないが、安定のため 24kHz に揃える。
-    args = [
-        ffmpeg,
-        "-y",
-        "-hide_banner",
-        "-loglevel",
-        "error",
-        "-nostats",
-        "-i",
-        str(src_path),
-        "-ac",
-        "1",
-        "-ar",
-        "24000",
-        "-c:a",
-        "pcm_s16le",
-        str(dst_path),
-    ]
-    proc = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    if proc.returncode != 0:
-        stderr = proc.stderr or b""
-        try:
-            msg = stderr.decode("utf-8")
-        except Exception:
-            msg = stderr.decode("utf-8", errors="replace")
-        raise RuntimeError(f"FFmpeg conversion failed (code={proc.returncode}): {msg}")
-
-
 def _sanitize_filename(name: str) -> str:
     # すごく雑に危険文字だけ落とす（Windows/Unix両方を意識）
     name = name.strip().replace("\\", "_").replace("/", "_")
@@ -242,12 +396,38 @@ def clear_temp_folder(temp_dir: str) -> bool:
         return False
 
 
+def _prepare_references(paths: list[Path], out_dir: Path) -> tuple[list[Path], dict[str, dict[str, float]]]:
+    """参照音声を前処理したコピーを out_dir に作り、(clone に渡すパス, ファイル名 → 削った秒数等) を返す。
+
+    前処理できない形式・無効化時（SVM_REF_PREP=0）は元のファイルをそのまま使う。
+    """
+
+    if not prep_enabled():
+        return list(paths), {}
+    refs: list[Path] = []
+    reports: dict[str, dict[str, float]] = {}
+    for i, src in enumerate(paths):
+        # 同名のサンプルがあっても衝突しないよう番号のディレクトリに置く（ファイル名は元のまま）
+        dst = out_dir / f"{i:02d}" / src.name
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            reports[src.name] = prepare_reference(src, dst).to_dict()
+            refs.append(dst)
+        except Exception as e:  # noqa: BLE001
+            logger.warning(f"[Server] reference prep skipped ({src.name}): {e}")
+            refs.append(src)
+    return refs, reports
+
+
 class BuildVoiceModelRequest(BaseModel):
     speaker_wav: Optional[str] = None  # 指定があればそれを優先（相対パスはリポジトリルート基準）
+    voice_id: Optional[str] = None  # 未指定は既定の voice（tts_model.json も更新する）。指定時は voices/<voice_id>.pth だけ作る
+    samples: Optional[list[str]] = None  # 複数の話者サンプルから作る（サンプルごとの latent をキャッシュして集約）
+    all_samples: bool = False  # True で samples/ の全 WAV から作る（追加した録音の分だけ latent を計算する）
 
 
 @app.post("/api/build_voice_model")
-async def build_voice_model(req: BuildVoiceModelRequest) -> dict[str, str]:
+async def build_voice_model(req: BuildVoiceModelRequest) -> dict[str, object]:
     """音声生成モデル（話者WAV + 話者埋め込みキャッシュ）を構築して保存する。"""
     repo_root = _repo_root()
 
@@ -257,11 +437,23 @@ async def build_voice_model(req: BuildVoiceModelRequest) -> dict[str, str]:
     except Exception as e:  # noqa: BLE001
         raise HTTPException(status_code=500, detail=f"TTSモデルの初期化に失敗しました: {e}")
 
+    samples: list[Path] = []
+    if req.samples:
+        samples = [_abs_from_repo(repo_root, s) for s in req.samples]
+        missing = [p for p in samples if not p.exists()]
+        if missing:
+            raise HTTPException(status_code=400, detail=f"話者サンプルが見つかりません: {missing[0]}")
+    elif req.all_samples:
+        samples = list_speaker_samples()
+
     speaker: Optional[Path] = None
     if req.speaker_wav:
         speaker = _abs_from_repo(repo_root, req.speaker_wav)
         if not speaker.exists():
             raise HTTPException(status_code=400, detail=f"speaker_wavが見つかりません: {speaker}")
+    elif samples:
+        # tts_model.json には代表として最後のサンプルを記録する（voice キャッシュが無い場合の話者）
+        speaker = samples[-1]
     else:
         speaker = pick_default_speaker_wav()
 
@@ -269,29 +461,77 @@ async def build_voice_model(req: BuildVoiceModelRequest) -> dict[str, str]:
         raise HTTPException(status_code=400, detail="話者サンプルが見つかりません。録音して sample_01.wav 等を作成してください")
 
     # 話者埋め込み（conditioning latents 等）を事前計算して保存する
-    voice_id = _default_voice_id()
+    voice_id = _check_voice_id(req.voice_id) if req.voice_id else _default_voice_id()
     voice_dir = _voice_cache_dir(repo_root)
-    try:
-        vg = await get_voice_generator_async()
-        voice_file = await asyncio.to_thread(
-            vg.build_voice_cache,
-            speaker_wav=speaker,
-            voice_id=voice_id,
-            voice_dir=voice_dir,
-        )
-    except Exception as e:  # noqa: BLE001
-        raise HTTPException(status_code=500, detail=f"話者埋め込みの保存に失敗しました: {e}")
+    with tempfile.TemporaryDirectory(prefix="svm_ref_") as tmp:
+        # 無音・長い間を除いた参照音声を clone に渡す（元のサンプルは変更しない）
+        refs, prep = await asyncio.to_thread(_prepare_references, samples or [speaker], Path(tmp))
+        try:
+            vg = await get_voice_generator_async()
+            t0 = time.perf_counter()
+            voice_file = await get_scheduler().run(
+                INTERACTIVE,
+                vg.build_voice_cache,
+                speaker_wav=refs[-1],
+                voice_id=voice_id,
+                voice_dir=voice_dir,
+                samples=refs if samples else None,
+            )
+            clone_seconds = time.perf_counter() - t0
+        except Exception as e:  # noqa: BLE001
+            raise HTTPException(status_code=500, detail=f"話者埋め込みの保存に失敗しました: {e}")
+    logger.info(
+        f"[Server] build_voice_model: voice_id={voice_id} clone={clone_seconds:.3f}s "
+        f"removed={sum(r['removed_seconds'] for r in prep.values()):.2f}s"
+    )
 
-    saved = save_voice_model(repo_root, speaker_wav=speaker)
+    # tts_model.json（既定の話者）は voice_id 未指定のときだけ更新する
+    saved = save_voice_model(repo_root, speaker_wav=speaker) if voice_id == _default_voice_id() else None
     return {
         "ok": "true",
-        "saved": str(saved),
+        "saved": str(saved) if saved else None,
+        "voice_id": voice_id,
         "speaker_wav": str(speaker),
+        "samples": [p.name for p in samples],
         "voice_file": str(voice_file),
+        "prep": prep,
+        "clone_seconds": round(clone_seconds, 3),
         "model_name": "tts_models/multilingual/multi-dataset/xtts_v2",
     }
 
 
+async def _script_changes(repo_root: Path, rows: list[ScriptRow]) -> ScriptDiff:
+    """原稿行と output/manifest.json の差分を、生成と同じ話者の voice_key で求める。
+
+    モデルの初期化前は voice_key を計算できないため、原稿と出力ファイルだけで比べる。
+    """
+
+    out_dir = _output_dir(repo_root)
+    st = get_tts_init_state()
+    if st.get("ready") is True or os.environ.get("SVM_FAKE_TTS", "0") == "1":
+        try:
+            speaker, voice_id, voice_dir = _resolve_voice(repo_root)
+        except HTTPException:
+            speaker, voice_id, voice_dir = None, None, None
+        if speaker is not None or voice_id is not None:
+            vg = await get_voice_generator_async()
+            return await asyncio.to_thread(
+                vg.diff_script_rows,
+                rows,
+                output_dir=out_dir,
+                speaker_wav=speaker,
+                voice_id=voice_id,
+                voice_dir=voice_dir,
+            )
+    return await asyncio.to_thread(
+        lambda: diff_rows(
+            [(r.index, r.script) for r in rows if r.script.strip()],
+            load_manifest(out_dir),
+            output_dir=out_dir,
+        )
+    )
+
+
 @app.post("/api/upload/csv")
 async def upload_csv(file: UploadFile = File(...)) -> dict[str, object]:
     if not file.filename or not file.filename.lower().endswith(".csv"):
@@ -301,51 +541,49 @@ async def upload_csv(file: UploadFile = File(...)) -> dict[str, object]:
     in_dir = _input_dir(repo_root)
     in_dir.mkdir(parents=True, exist_ok=True)
 
-    data = await file.read()
-    if not data:
-        raise HTTPException(status_code=400, detail="CSVが空です")
-
-    # Windowsで input/原稿.csv がExcel等でロックされると write_bytes が PermissionError になり、
+    # Windowsで input/原稿.csv がExcel等でロックされると書き込みが PermissionError になり、
     # そのままだと 500 で落ちる。必ずユニーク名に保存し、可能なら原稿.csvへも反映する。
     global _LAST_UPLOADED_SCRIPT_CSV
 
     ts = time.strftime("%Y%m%d-%H%M%S")
     unique = in_dir / f"原稿_{ts}.csv"
 
-    def try_write(p: Path, payload: bytes) -> None:
-        last: Exception | None = None
-        for _ in range(3):
-            try:
-                p.write_bytes(payload)
-                return
-            except PermissionError as e:
-                last = e
-                time.sleep(0.25)
-        if last:
-            raise last
+    def store() -> int:
+        with _CSV_LOCK:
+            size = copy_upload(file.file, unique, max_bytes=upload_max_bytes())
+            if size == 0:
+                unique.unlink(missing_ok=True)
+            return size
 
     try:
-        with _CSV_LOCK:
-            try_write(unique, data)
-            _LAST_UPLOADED_SCRIPT_CSV = unique
+        size = await retry_on_permission_error(store)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=f"CSVが大きすぎます（上限 {e.max_bytes / (1024 * 1024):g}MB）")
     except PermissionError as e:
         raise HTTPException(status_code=423, detail=f"CSVを保存できません（他アプリで開いていませんか？）: {e}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"CSV保存に失敗しました: {e}")
+    if size == 0:
+        raise HTTPException(status_code=400, detail="CSVが空です")
+    with _CSV_LOCK:
+        _LAST_UPLOADED_SCRIPT_CSV = unique
 
     # サーバー側で文字化け対処 + CSVパースし、UIへそのまま返す。
     try:
-        rows = load_script_csv(unique)
+        rows = await asyncio.to_thread(load_script_csv, unique)
         script_rows = [{"index": r.index, "script": r.script} for r in rows]
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"CSVの解析に失敗しました: {e}")
 
+    # 直近の生成結果（output/manifest.json）との差分。only_changed 生成で再合成される行が分かる。
+    changes = await _script_changes(repo_root, rows)
+
     canonical = in_dir / "原稿.csv"
     canonical_saved = False
     try:
         # 可能なら canonical を更新（失敗しても UI には成功を返す）
         # ロックされている場合はスキップし、generate_from_csv は最後にアップロードされたCSVを優先する。
-        try_write(canonical, data)
+        await retry_on_permission_error(lambda: copy_file(unique, canonical))
         canonical_saved = True
     except Exception:
         canonical_saved = False
@@ -356,11 +594,12 @@ async def upload_csv(file: UploadFile = File(...)) -> dict[str, object]:
         "canonical_saved": canonical_saved,
         "canonical_path": str(canonical),
         "rows": script_rows,
+        "changes": changes.to_dict(),
     }
 
 
 @app.post("/api/upload/recording")
-async def upload_recording(file: UploadFile = File(...)) -> dict[str, str]:
+async def upload_recording(file: UploadFile = File(...)) -> dict[str, object]:
     """録音ファイルをsrc/voice/models/samples/に保存（上書き禁止: sample_01.wav などで保存）。"""
     if not file.filename:
         raise HTTPException(status_code=400, detail="ファイル名が指定されていません")
@@ -376,15 +615,17 @@ async def upload_recording(file: UploadFile = File(...)) -> dict[str, str]:
         # 拡張子が無い場合でも受け取り、FFmpegのプローブに任せる
         raw_filename = raw_filename + ".bin"
 
-    data = await file.read()
-    if not data:
-        raise HTTPException(status_code=400, detail="ファイルが空です")
-
-    # 変換前の退避
+    # 変換前の退避（本文はワーカースレッドでチャンクごとにディスクへ書く）
     uploaded_dir = samples_dir / "uploaded"
     uploaded_dir.mkdir(parents=True, exist_ok=True)
     raw_path = uploaded_dir / raw_filename
-    raw_path.write_bytes(data)
+    try:
+        size = await asyncio.to_thread(copy_upload, file.file, raw_path, max_bytes=upload_max_bytes())
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=f"録音ファイルが大きすぎます（上限 {e.max_bytes / (1024 * 1024):g}MB）")
+    if size == 0:
+        raw_path.unlink(missing_ok=True)
+        raise HTTPException(status_code=400, detail="ファイルが空です")
 
     # 上書き禁止のため sample_01.wav, sample_02.wav... として保存する
     existing = sorted(samples_dir.glob("sample_*.wav"))
@@ -395,22 +636,43 @@ async def upload_recording(file: UploadFile = File(...)) -> dict[str, str]:
             max_n = max(max_n, int(m.group(1)))
     dst_wav = samples_dir / f"sample_{max_n + 1:02d}.wav"
     try:
-        await asyncio.to_thread(_ffmpeg_convert_to_wav, raw_path, dst_wav)
+        # 既に 24kHz mono PCM16 の WAV なら ffmpeg を起動せずにコピーする
+        converted = await asyncio.to_thread(convert_to_wav, raw_path, dst_wav)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"録音のWAV変換に失敗しました: {e}")
 
-    return {"saved": str(dst_wav), "filename": dst_wav.name}
+    # 前後の無音・長い間を削って保存する（元の録音は uploaded/ に残る）
+    prep: Optional[dict[str, float]] = None
+    if prep_enabled():
+        try:
+            prep = (await asyncio.to_thread(prepare_reference, dst_wav)).to_dict()
+        except Exception as e:  # noqa: BLE001
+            logger.warning(f"[Server] recording prep skipped ({dst_wav.name}): {e}")
+
+    return {"saved": str(dst_wav), "filename": dst_wav.name, "converted": converted, "prep": prep}
 
 
 class GenerateAudioRequest(BaseModel):
     index: int
     script: str
     overwrite: bool = True
+    use_cache: bool = True  # False で合成キャッシュを使わずに再生成する
+    voice_id: Optional[str] = None  # 構築済みの voices/<voice_id>.pth を使う（未指定は保存済みモデル）
 
 
 class GenerateFromCsvRequest(BaseModel):
     overwrite: bool = True
     speaker_wav: Optional[str] = None  # 指定があればそれを優先（相対パスはリポジトリルート基準）
+    voice_id: Optional[str] = None  # 構築済みの voices/<voice_id>.pth を使う（speaker_wav より優先）
+    use_cache: bool = True
+    only_changed: bool = False  # True で前回生成（output/manifest.json）からの追加・変更行だけ再合成する
+    batch_size: Optional[int] = Field(default=None, ge=1)  # 文チャンクをまとめて推論する件数（未指定は SVM_TTS_BATCH_SIZE）
+    narration: bool = False  # True で生成後に全行を連結した output/narration.mp3 と narration.json を書く
+    gap_seconds: Optional[float] = Field(default=None, ge=0)  # narration の行間の無音（未指定は SVM_NARRATION_GAP_SECONDS）
+
+
+class NarrationRequest(BaseModel):
+    gap_seconds: Optional[float] = Field(default=None, ge=0)
 
 
 class ClearTempRequest(BaseModel):
@@ -418,6 +680,16 @@ class ClearTempRequest(BaseModel):
     scope: Optional[str] = None
 
 
+def _narration(repo_root: Path, out_dir: Path, generated: list[Path], gap_seconds: Optional[float]) -> dict[str, object]:
+    """生成した行の MP3 を再エンコードせずに連結し、narration.mp3 / narration.json を書く。"""
+
+    indices = [int(item["index"]) for item in (_audio_item(repo_root, p) for p in generated) if int(item["index"]) >= 0]
+    result = build_narration(out_dir, indices=indices, gap_seconds=gap_seconds)
+    result["audio_url"] = _audio_item(repo_root, out_dir / "narration.mp3")["audio_url"]
+    result["manifest"] = str(out_dir / "narration.json")
+    return result
+
+
 @app.post("/api/generate_audio")
 async def generate_audio(req: GenerateAudioRequest) -> dict[str, str]:
     """単一行の音声を output/voice_000.mp3 等へ保存する。"""
@@ -447,34 +719,12 @@ async def generate_audio(req: GenerateAudioRequest) -> dict[str, str]:
         return {"audio_url": "", "path": ""}
 
     # 保存済みモデルを優先して使う
-    saved = load_saved_voice_model(repo_root) or {}
-    speaker: Optional[Path] = None
-    voice_id: Optional[str] = None
-    voice_dir: Optional[Path] = None
-
-    if saved.get("voice_id") and saved.get("voice_dir"):
-        voice_id = str(saved.get("voice_id"))
-        voice_dir = _abs_from_repo(repo_root, str(saved.get("voice_dir")))
-        voice_file = voice_dir / f"{voice_id}.pth"
-        if not voice_file.exists():
-            # voice キャッシュが無い場合は speaker_wav 経由で生成にフォールバック
-            voice_id = None
-            voice_dir = None
-
-    if voice_id is None:
-        if saved.get("speaker_wav"):
-            speaker = _abs_from_repo(repo_root, str(saved["speaker_wav"]))
-        if not speaker or not speaker.exists():
-            speaker = pick_default_speaker_wav()
-        if not speaker:
-            raise HTTPException(
-                status_code=400,
-                detail="話者サンプルが見つかりません。録音して sample_01.wav 等を作成してください",
-            )
+    speaker, voice_id, voice_dir = _resolve_voice(repo_root, requested_voice_id=req.voice_id)
 
     try:
         vg = await get_voice_generator_async()
-        audio_path = await asyncio.to_thread(
+        audio_path = await get_scheduler().run(
+            INTERACTIVE,
             vg.generate_one,
             index=req.index,
             script=req.script,
@@ -483,6 +733,7 @@ async def generate_audio(req: GenerateAudioRequest) -> dict[str, str]:
             voice_dir=voice_dir,
             output_dir=out_dir,
             overwrite=req.overwrite,
+            use_cache=req.use_cache,
         )
         logger.info(f"/api/generate_audio done index={req.index} in {(time.perf_counter() - t0):.3f}s")
         audio_url = ""
@@ -501,62 +752,82 @@ async def generate_audio(req: GenerateAudioRequest) -> dict[str, str]:
         raise HTTPException(status_code=500, detail=f"音声生成エラー: {e}")
 
 
+@app.post("/api/stream_audio")
+async def stream_audio(req: GenerateAudioRequest) -> StreamingResponse:
+    """単一行を推論しながら MP3 をチャンク転送で返す（終了時に output/voice_000.mp3 等へ保存）。"""
+    repo_root = _repo_root()
+    out_dir = _output_dir(repo_root)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    logger.info(f"/api/stream_audio start index={req.index} script_len={len(req.script or '')} overwrite={req.overwrite}")
+
+    st = get_tts_init_state()
+    if st.get("ready") is not True and os.environ.get("SVM_FAKE_TTS", "0") != "1":
+        return JSONResponse(
+            status_code=202,
+            content={"status": "warming", "message": "TTSモデル初期化中です", "tts": st},
+        )
+
+    if not req.script or not req.script.strip():
+        raise HTTPException(status_code=400, detail="scriptが空です")
+
+    speaker, voice_id, voice_dir = _resolve_voice(repo_root, requested_voice_id=req.voice_id)
+
+    try:
+        vg = await get_voice_generator_async()
+        stream = await get_scheduler().run(
+            INTERACTIVE,
+            vg.open_stream,
+            index=req.index,
+            script=req.script,
+            speaker_wav=speaker,
+            voice_id=voice_id,
+            voice_dir=voice_dir,
+            output_dir=out_dir,
+            overwrite=req.overwrite,
+            use_cache=req.use_cache,
+        )
+    except FileExistsError as e:
+        logger.warning(f"/api/stream_audio conflict index={req.index}: {e}")
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        logger.exception(f"/api/stream_audio error index={req.index}")
+        raise HTTPException(status_code=500, detail=f"音声生成エラー: {e}")
+
+    item = _audio_item(repo_root, stream.path)
+    # 同期イテレータはスレッドプールで反復されるため、推論・エンコード待ちでイベントループを塞がない
+    return StreamingResponse(
+        iter(stream),
+        media_type="audio/mpeg",
+        headers={
+            "Cache-Control": "no-store",
+            "X-Audio-Url": item["audio_url"],
+            "X-Audio-Cached": "1" if stream.cached else "0",
+        },
+    )
+
+
 @app.post("/api/generate_from_csv")
 async def generate_from_csv(req: GenerateFromCsvRequest) -> dict[str, object]:
     """input/原稿.csv から音声を一括生成して output/ に保存する。"""
     repo_root = _repo_root()
-    in_dir = _input_dir(repo_root)
     out_dir = _output_dir(repo_root)
     out_dir.mkdir(parents=True, exist_ok=True)
 
     # 直近アップロードを優先（原稿.csv がロックされて更新できないケースの救済）
-    global _LAST_UPLOADED_SCRIPT_CSV
-    script_path = None
-    with _CSV_LOCK:
-        if _LAST_UPLOADED_SCRIPT_CSV and _LAST_UPLOADED_SCRIPT_CSV.exists():
-            script_path = _LAST_UPLOADED_SCRIPT_CSV
-    if script_path is None:
-        script_path = in_dir / "原稿.csv"
-
+    script_path = _current_script_csv(repo_root)
     if not script_path.exists():
         raise HTTPException(status_code=404, detail=f"原稿CSVが見つかりません: {script_path}")
 
     # tempは全削除（wav等の中間生成物）
     clear_temp_folder(str(out_dir / "temp"))
 
-    speaker: Optional[Path] = None
-    voice_id: Optional[str] = None
-    voice_dir: Optional[Path] = None
-
-    # 1) 明示指定（テスト等）: speaker_wav を最優先（voice キャッシュより上）
-    if req.speaker_wav:
-        speaker = _abs_from_repo(repo_root, req.speaker_wav)
-        if not speaker.exists():
-            raise HTTPException(status_code=400, detail=f"speaker_wavが見つかりません: {speaker}")
-    else:
-        # 2) 保存済みモデル（voice キャッシュ優先）
-        saved = load_saved_voice_model(repo_root) or {}
-        if saved.get("voice_id") and saved.get("voice_dir"):
-            voice_id = str(saved.get("voice_id"))
-            voice_dir = _abs_from_repo(repo_root, str(saved.get("voice_dir")))
-            voice_file = voice_dir / f"{voice_id}.pth"
-            if not voice_file.exists():
-                voice_id = None
-                voice_dir = None
-
-        if voice_id is None and saved.get("speaker_wav"):
-            speaker = _abs_from_repo(repo_root, str(saved["speaker_wav"]))
-
-        # 3) デフォルト
-        if voice_id is None and (not speaker or not speaker.exists()):
-            speaker = pick_default_speaker_wav()
-
-    if voice_id is None and not speaker:
-        raise HTTPException(status_code=400, detail="話者サンプルが見つかりません。録音して sample_01.wav 等を作成してください")
+    speaker, voice_id, voice_dir = _resolve_voice(repo_root, req.speaker_wav, req.voice_id)
 
     try:
         vg = await get_voice_generator_async()
-        generated = await asyncio.to_thread(
+        generated = await get_scheduler().run(
+            BULK,
             vg.generate_from_csv,
             script_csv_path=script_path,
             speaker_wav=speaker,
@@ -564,23 +835,19 @@ async def generate_from_csv(req: GenerateFromCsvRequest) -> dict[str, object]:
             voice_dir=voice_dir,
             output_dir=out_dir,
             overwrite=req.overwrite,
+            use_cache=req.use_cache,
+            only_changed=req.only_changed,
+            batch_size=req.batch_size,
         )
-        items = []
-        for p in generated:
-            audio_url = ""
-            try:
-                rel = p.relative_to(repo_root)
-                audio_url = f"/{rel.as_posix()}"
-            except Exception:
-                audio_url = ""
-            # voice_000.mp3 → index 抽出
-            m = re.match(r"^voice_(\d+)\.mp3$", p.name, flags=re.IGNORECASE)
-            idx = int(m.group(1)) if m else -1
-            items.append({"index": idx, "audio_url": audio_url, "path": str(p)})
+        items = [_audio_item(repo_root, p) for p in generated]
+        narration = None
+        if req.narration:
+            narration = await asyncio.to_thread(_narration, repo_root, out_dir, generated, req.gap_seconds)
         return {
             "ok": True,
             "count": len(items),
             "items": items,
+            "narration": narration,
             "speaker_wav": str(speaker) if speaker else "",
             "voice_id": str(voice_id) if voice_id else "",
             "voice_dir": str(voice_dir) if voice_dir else "",
@@ -591,6 +858,247 @@ async def generate_from_csv(req: GenerateFromCsvRequest) -> dict[str, object]:
         raise HTTPException(status_code=500, detail=f"一括生成エラー: {e}")
 
 
+class JobRow(BaseModel):
+    index: int
+    script: str
+
+
+class CreateJobRequest(GenerateFromCsvRequest):
+    # 指定があればCSVの代わりにこの行を生成する（UIで編集中の原稿など）
+    rows: Optional[list[JobRow]] = None
+
+
+def _request_rows(repo_root: Path, rows: Optional[list[JobRow]]) -> list[ScriptRow]:
+    """リクエストで指定された行（未指定なら現在の原稿CSV）を index 順で返す。"""
+
+    if rows is not None:
+        return sorted((ScriptRow(index=r.index, script=r.script) for r in rows), key=lambda r: r.index)
+    script_path = _current_script_csv(repo_root)
+    if not script_path.exists():
+        raise HTTPException(status_code=404, detail=f"原稿CSVが見つかりません: {script_path}")
+    try:
+        return load_script_csv(script_path)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"CSVの解析に失敗しました: {e}")
+
+
+@app.post("/api/jobs")
+def create_job(req: CreateJobRequest) -> dict[str, object]:
+    """一括生成ジョブを登録してすぐに job_id を返す（生成はバックグラウンドワーカーで実行）。"""
+    repo_root = _repo_root()
+    out_dir = _output_dir(repo_root)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    rows = _request_rows(repo_root, req.rows)
+    if not rows:
+        raise HTTPException(status_code=400, detail="有効な原稿データが見つかりません")
+
+    speaker, voice_id, voice_dir = _resolve_voice(repo_root, req.speaker_wav, req.voice_id)
+
+    def run(job) -> dict[str, object]:
+        # ジョブの実行順（1 件ずつ）は JobManager が決め、生成そのものは一括生成の専用スレッドで行う
+        return get_scheduler().submit(BULK, generate, job).result()
+
+    def generate(job) -> dict[str, object]:
+        clear_temp_folder(str(out_dir / "temp"))
+        vg = get_voice_generator()
+        generated = vg.generate_rows(
+            rows,
+            speaker_wav=speaker,
+            voice_id=voice_id,
+            voice_dir=voice_dir,
+            output_dir=out_dir,
+            overwrite=req.overwrite,
+            use_cache=req.use_cache,
+            only_changed=req.only_changed,
+            batch_size=req.batch_size,
+            on_row=job.on_row,
+            cancel_event=job.cancel_event,
+        )
+        items = [_audio_item(repo_root, p) for p in generated]
+        narration = _narration(repo_root, out_dir, generated, req.gap_seconds) if req.narration else None
+        return {"count": len(items), "items": items, "narration": narration}
+
+    job = _JOBS.submit([r.index for r in rows], run)
+    logger.info(f"/api/jobs created job={job.id} rows={len(rows)}")
+    return {"job_id": job.id, "status": job.status, "total": len(rows)}
+
+
+def _job_snapshot(job) -> dict[str, object]:
+    snap = job.snapshot()
+    # モデル初期化待ちで止まって見える間も、UIが段階を表示できるようにする
+    snap["tts"] = get_tts_init_state()
+    return snap
+
+
+@app.get("/api/jobs/{job_id}")
+def get_job(job_id: str) -> dict[str, object]:
+    job = _JOBS.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"ジョブが見つかりません: {job_id}")
+    return _job_snapshot(job)
+
+
+@app.delete("/api/jobs/{job_id}")
+def cancel_job(job_id: str) -> dict[str, object]:
+    """ジョブをキャンセルする（実行中の行が終わった時点で停止する）。"""
+    job = _JOBS.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"ジョブが見つかりません: {job_id}")
+    return _job_snapshot(job)
+
+
+class GenerateBatchRequest(CreateJobRequest):
+    # 生成する index の範囲（両端を含む。未指定は全行）
+    start: Optional[int] = None
+    end: Optional[int] = None
+
+
+def _ndjson(data: dict[str, object]) -> str:
+    return json.dumps(data, ensure_ascii=False, default=str) + "\n"
+
+
+def _batch_row_line(repo_root: Path, event: str, index: int, info: dict[str, object]) -> dict[str, object]:
+    line: dict[str, object] = {"type": "row", "index": index, "status": event}
+    if info.get("path"):
+        item = _audio_item(repo_root, Path(str(info["path"])))
+        line["path"] = item["path"]
+        line["audio_url"] = item["audio_url"]
+    for key in ("reason", "error", "cached", "copied_from"):
+        if key in info:
+            line[key] = info[key]
+    for key in ("seconds", "audio_seconds", "synth_seconds", "encode_seconds"):
+        if key in info:
+            line[key] = round(float(info[key] or 0.0), 3)  # type: ignore[arg-type]
+    return line
+
+
+@app.post("/api/generate_batch")
+async def generate_batch(req: GenerateBatchRequest) -> StreamingResponse:
+    """複数行を 1 本のパイプラインで生成し、行が終わるたびに NDJSON を 1 行ずつ返す。
+
+    行ごとに /api/generate_audio を呼ぶ場合と違い、話者の解決・推論プランの準備は 1 回で済み、
+    推論とエンコードのパイプライン（バッチ推論・推論ワーカー）もそのまま使われる。
+    最後に "type": "summary" の行を送る。クライアントが切断したら実行中の行の後で止める。
+    """
+    repo_root = _repo_root()
+    out_dir = _output_dir(repo_root)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    st = get_tts_init_state()
+    if st.get("ready") is not True and os.environ.get("SVM_FAKE_TTS", "0") != "1":
+        return JSONResponse(
+            status_code=202,
+            content={"status": "warming", "message": "TTSモデル初期化中です", "tts": st},
+        )
+
+    rows = _request_rows(repo_root, req.rows)
+    if req.start is not None:
+        rows = [r for r in rows if r.index >= req.start]
+    if req.end is not None:
+        rows = [r for r in rows if r.index <= req.end]
+    if not rows:
+        raise HTTPException(status_code=400, detail="有効な原稿データが見つかりません")
+
+    speaker, voice_id, voice_dir = _resolve_voice(repo_root, req.speaker_wav, req.voice_id)
+    vg = await get_voice_generator_async()
+    logger.info(f"/api/generate_batch start rows={len(rows)} voice_id={voice_id or ''}")
+
+    loop = asyncio.get_running_loop()
+    q: asyncio.Queue[Optional[dict[str, object]]] = asyncio.Queue()
+    cancel_event = threading.Event()
+
+    def on_row(event: str, index: int, info: dict[str, object]) -> None:
+        if event != "started":
+            loop.call_soon_threadsafe(q.put_nowait, _batch_row_line(repo_root, event, index, info))
+
+    def run() -> list[Path]:
+        return vg.generate_rows(
+            rows,
+            speaker_wav=speaker,
+            voice_id=voice_id,
+            voice_dir=voice_dir,
+            output_dir=out_dir,
+            overwrite=req.overwrite,
+            use_cache=req.use_cache,
+            only_changed=req.only_changed,
+            batch_size=req.batch_size,
+            on_row=on_row,
+            cancel_event=cancel_event,
+        )
+
+    async def stream():
+        t0 = time.perf_counter()
+        task = asyncio.ensure_future(get_scheduler().run(BULK, run))
+        # 行の通知はすべて完了前にキューへ積まれているため、終端の None は最後に届く
+        task.add_done_callback(lambda _: q.put_nowait(None))
+        counts: dict[str, int] = {}
+        try:
+            while (line := await q.get()) is not None:
+                counts[str(line["status"])] = counts.get(str(line["status"]), 0) + 1
+                yield _ndjson(line)
+            error = task.exception()
+            narration = None
+            if error is None and req.narration:
+                try:
+                    narration = await asyncio.to_thread(_narration, repo_root, out_dir, task.result(), req.gap_seconds)
+                except Exception as e:  # noqa: BLE001
+                    error = e
+            elapsed = time.perf_counter() - t0
+            if error is not None:
+                logger.warning(f"/api/generate_batch failed after {elapsed:.3f}s: {error}")
+            else:
+                logger.info(f"/api/generate_batch done rows={len(rows)} in {elapsed:.3f}s")
+            yield _ndjson(
+                {
+                    "type": "summary",
+                    "ok": error is None,
+                    "error": str(error) if error is not None else None,
+                    "total": len(rows),
+                    "counts": counts,
+                    "elapsed_seconds": round(elapsed, 3),
+                    "narration": narration,
+                    "voice_id": voice_id or "",
+                }
+            )
+        finally:
+            # 切断された場合は次の行へ進む前に止める（結果は捨てる）
+            cancel_event.set()
+            if not task.done():
+                task.add_done_callback(lambda t: t.exception())
+
+    return StreamingResponse(
+        stream(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/api/narration")
+async def narration(req: NarrationRequest) -> dict[str, object]:
+    """生成済みの行 MP3 を再エンコードせずに 1 本へ連結し、チャプター情報と一緒に返す。
+
+    対象は現在の原稿CSVの空でない行（CSVが無ければ output/ の voice_*.mp3 すべて）。
+    MP3 が未生成の行は飛ばし "missing" に入れる。
+    """
+    repo_root = _repo_root()
+    out_dir = _output_dir(repo_root)
+    indices: Optional[list[int]] = None
+    if _current_script_csv(repo_root).exists():
+        indices = [r.index for r in _request_rows(repo_root, None) if r.script.strip()]
+    try:
+        result = await asyncio.to_thread(build_narration, out_dir, indices=indices, gap_seconds=req.gap_seconds)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    result["audio_url"] = _audio_item(repo_root, out_dir / "narration.mp3")["audio_url"]
+    result["manifest"] = str(out_dir / "narration.json")
+    logger.info(
+        f"/api/narration chapters={len(result['chapters'])} missing={len(result['missing'])} "
+        f"duration={result['duration_seconds']}s"
+    )
+    return result
+
+
 @app.post("/api/clear_temp")
 def clear_temp(req: ClearTempRequest) -> JSONResponse:
     """output/temp を削除して再作成する。
@@ -617,16 +1125,8 @@ def clear_temp(req: ClearTempRequest) -> JSONResponse:
 def export_csv() -> FileResponse:
     """現在の原稿CSVをダウンロードする。"""
     repo_root = _repo_root()
-    in_dir = _input_dir(repo_root)
-
-    global _LAST_UPLOADED_SCRIPT_CSV
-    script_path = None
-    with _CSV_LOCK:
-        if _LAST_UPLOADED_SCRIPT_CSV and _LAST_UPLOADED_SCRIPT_CSV.exists():
-            script_path = _LAST_UPLOADED_SCRIPT_CSV
-    if script_path is None:
-        script_path = in_dir / "原稿.csv"
 
+    script_path = _current_script_csv(repo_root)
     if not script_path.exists():
         raise HTTPException(status_code=404, detail=f"原稿CSVが見つかりません: {script_path}")
 
@@ -0,0 +1,131 @@
+"""アップロードファイルの保存（イベントループを止めずにチャンク単位でディスクへ書く）。
+
+`await file.read()` で本文全体をメモリに載せ、async ハンドラ内で `write_bytes` や
+`time.sleep` のリトライを行うと、その間ほかのリクエスト（SSE・進捗ポーリング等）が止まる。
+ここではアップロード本体（Starlette が一時ファイルにスプールしたもの）をワーカースレッドで
+チャンクごとにコピーし、サイズ上限を超えたら途中で打ち切る。ロック中のファイルへの
+書き込みリトライは `asyncio.sleep` で待つ。
+
+Starlette はハンドラを呼ぶ前に本文を一時ファイルへスプールするため、コピー時の上限だけでは
+巨大な本文も受信し切ってしまう。UploadLimitMiddleware が Content-Length を見て、本文を読む前に
+`413` を返す（Content-Length の無いチャンク転送は従来どおりコピー時の上限で止める）。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Iterable, Optional, TypeVar
+
+T = TypeVar("T")
+
+_CHUNK_SIZE = 1024 * 1024
+# multipart の境界・パートヘッダーの分（Content-Length はファイル本体より少し大きい）
+_FORM_OVERHEAD = 64 * 1024
+
+
+class UploadTooLarge(Exception):
+    def __init__(self, max_bytes: int):
+        super().__init__(f"upload exceeds {max_bytes} bytes")
+        self.max_bytes = max_bytes
+
+
+def upload_max_bytes() -> int:
+    """アップロード 1 件あたりの上限。SVM_UPLOAD_MAX_MB（既定 100）で変更できる。"""
+    try:
+        mb = float(os.environ.get("SVM_UPLOAD_MAX_MB", "100"))
+    except ValueError:
+        mb = 100.0
+    return int(mb * 1024 * 1024)
+
+
+def copy_upload(src: BinaryIO, dst: Path, *, max_bytes: int, chunk_size: int = _CHUNK_SIZE) -> int:
+    """src を先頭からチャンクごとに dst へ書き、書いたバイト数を返す（同期。ワーカースレッドで呼ぶ）。
+
+    上限を超えた場合・失敗した場合は書きかけのファイルを残さない。
+    """
+
+    src.seek(0)
+    tmp = dst.with_name(dst.name + ".part")
+    written = 0
+    try:
+        with tmp.open("wb") as out:
+            while True:
+                chunk = src.read(chunk_size)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > max_bytes:
+                    raise UploadTooLarge(max_bytes)
+                out.write(chunk)
+        os.replace(tmp, dst)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return written
+
+
+def copy_file(src: Path, dst: Path) -> None:
+    """保存済みアップロードを別名へ複製する（一時ファイル経由で置き換える）。"""
+
+    tmp = dst.with_name(dst.name + ".part")
+    try:
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, dst)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+async def retry_on_permission_error(fn: Callable[[], T], *, attempts: int = 3, delay: float = 0.25) -> T:
+    """fn をワーカースレッドで実行し、PermissionError（Windows のファイルロック等）なら待って再試行する。"""
+
+    last: Optional[PermissionError] = None
+    for i in range(attempts):
+        try:
+            return await asyncio.to_thread(fn)
+        except PermissionError as e:
+            last = e
+            if i + 1 < attempts:
+                await asyncio.sleep(delay)
+    assert last is not None
+    raise last
+
+
+class UploadLimitMiddleware:
+    """指定パスへのリクエストで、Content-Length が上限を超えていれば本文を読まずに 413 を返す（ASGI）。"""
+
+    def __init__(self, app: Any, *, paths: Iterable[str]):
+        self.app = app
+        self.paths = frozenset(paths)
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] == "http" and scope["path"] in self.paths:
+            max_bytes = upload_max_bytes()
+            length = dict(scope.get("headers") or []).get(b"content-length")
+            try:
+                too_large = length is not None and int(length) > max_bytes + _FORM_OVERHEAD
+            except ValueError:
+                too_large = False
+            if too_large:
+                body = json.dumps(
+                    {"detail": f"アップロードが大きすぎます（上限 {max_bytes / (1024 * 1024):g}MB）"},
+                    ensure_ascii=False,
+                ).encode("utf-8")
+                await send(
+                    {
+                        "type": "http.response.start",
+                        "status": 413,
+                        "headers": [
+                            (b"content-type", b"application/json"),
+                            (b"content-length", str(len(body)).encode("ascii")),
+                            (b"connection", b"close"),
+                        ],
+                    }
+                )
+                await send({"type": "http.response.body", "body": body})
+                return
+        await self.app(scope, receive, send)
@@ -0,0 +1,187 @@
+"""話者サンプル（参照音声）の前処理（numpy でまとめて処理する）。
+
+`convert_to_wav` は 24kHz mono へのリサンプルだけなので、録音の前後の無音や長い間が
+そのまま `clone_voice` に渡り、conditioning の計算が遅く・不安定になる。
+ここでは 20ms フレームのエネルギー（RMS）で有音/無音を判定し、次を行う:
+
+1. 前後の無音を削る（有音部の前後に少しだけ余白を残す）
+2. 文中の長い無音を `max_pause` 秒に詰める
+3. ピークを -1 dBFS に正規化する（小さすぎる録音の増幅は +20dB まで）
+4. 参照音声の長さを `max_seconds` で打ち切る（XTTS はそれ以上を参照しない）
+
+どの処理も 2 回かけてもほぼ変化しない（録音時と voice 構築時の両方で通してよい）。
+SVM_REF_PREP=0 で無効化、SVM_REF_MAX_SECONDS で長さの上限を変えられる。
+"""
+
+from __future__ import annotations
+
+import os
+import wave
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from src.logger import setup_logger
+
+logger = setup_logger("AudioPrep")
+
+_FRAME_SECONDS = 0.02
+_EDGE_PAD_SECONDS = 0.1
+_TARGET_PEAK = 10 ** (-1.0 / 20)  # -1 dBFS
+_MAX_GAIN = 10.0  # +20dB
+
+
+def prep_enabled() -> bool:
+    return os.environ.get("SVM_REF_PREP", "1").strip() != "0"
+
+
+def ref_max_seconds() -> float:
+    try:
+        return float(os.environ.get("SVM_REF_MAX_SECONDS", "30"))
+    except ValueError:
+        return 30.0
+
+
+@dataclass
+class PrepReport:
+    input_seconds: float
+    output_seconds: float
+    trimmed_seconds: float
+    compacted_seconds: float
+    capped_seconds: float
+    gain_db: float
+
+    @property
+    def removed_seconds(self) -> float:
+        return self.input_seconds - self.output_seconds
+
+    def to_dict(self) -> dict[str, float]:
+        out = {k: round(v, 3) for k, v in asdict(self).items()}
+        out["removed_seconds"] = round(self.removed_seconds, 3)
+        return out
+
+
+def read_wav(path: Path) -> tuple[np.ndarray, int]:
+    """PCM 16-bit WAV を float32 mono（-1..1）で読む（それ以外の形式は ValueError）。"""
+
+    with wave.open(str(path), "rb") as wf:
+        if wf.getsampwidth() != 2:
+            raise ValueError(f"PCM 16-bit 以外の WAV は扱えません: {path}")
+        channels = wf.getnchannels()
+        sr = wf.getframerate()
+        raw = wf.readframes(wf.getnframes())
+    audio = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    if channels > 1:
+        audio = audio.reshape(-1, channels).mean(axis=1)
+    return audio, sr
+
+
+def write_wav(path: Path, audio: np.ndarray, sr: int) -> None:
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767.0).astype("<i2")
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sr)
+        wf.writeframes(pcm.tobytes())
+
+
+def voiced_frames(audio: np.ndarray, sr: int, *, threshold_db: float = -40.0) -> np.ndarray:
+    """フレームごとの有音判定（最も大きいフレームから threshold_db 以内を有音とする）。"""
+
+    frame = max(1, int(sr * _FRAME_SECONDS))
+    n = -(-len(audio) // frame)
+    padded = np.zeros(n * frame, dtype=np.float32)
+    padded[: len(audio)] = audio
+    rms = np.sqrt(np.mean(padded.reshape(n, frame) ** 2, axis=1))
+    db = 20.0 * np.log10(rms + 1e-10)
+    return db > max(float(db.max()) + threshold_db, -60.0)
+
+
+def preprocess(
+    audio: np.ndarray,
+    sr: int,
+    *,
+    max_pause: float = 0.3,
+    max_seconds: Optional[float] = None,
+    threshold_db: float = -40.0,
+) -> tuple[np.ndarray, PrepReport]:
+    """無音の削除・間の圧縮・ピーク正規化・長さの打ち切りをまとめて行う。"""
+
+    frame = max(1, int(sr * _FRAME_SECONDS))
+    input_seconds = len(audio) / sr
+    if len(audio) == 0:
+        return audio, PrepReport(0.0, 0.0, 0.0, 0.0, 0.0, 0.0)
+    voiced = voiced_frames(audio, sr, threshold_db=threshold_db)
+    if not voiced.any() or float(np.abs(audio).max()) < 1e-4:
+        # 無音だけの録音は触らない（呼び出し側で弾く）
+        return audio, PrepReport(input_seconds, input_seconds, 0.0, 0.0, 0.0, 0.0)
+
+    # 1) 前後の無音（有音部の前後 _EDGE_PAD_SECONDS は残す）
+    idx = np.flatnonzero(voiced)
+    pad = int(round(_EDGE_PAD_SECONDS / _FRAME_SECONDS))
+    first = max(0, int(idx[0]) - pad)
+    last = min(len(voiced), int(idx[-1]) + 1 + pad)
+    keep = np.zeros(len(voiced), dtype=bool)
+    keep[first:last] = True
+    trimmed_frames = len(voiced) - (last - first)
+
+    # 2) 文中の無音区間のうち max_pause を超える部分（区間の中央）を落とす
+    max_pause_frames = max(1, int(round(max_pause / _FRAME_SECONDS)))
+    silent = ~voiced[first:last]
+    edges = np.diff(np.concatenate(([0], silent.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    lengths = np.flatnonzero(edges == -1) - starts
+    long_runs = lengths > max_pause_frames
+    drop = np.zeros(last - first + 1, dtype=np.int32)
+    head = max_pause_frames // 2
+    drop_from = starts[long_runs] + head
+    drop_to = starts[long_runs] + lengths[long_runs] - (max_pause_frames - head)
+    np.add.at(drop, drop_from, 1)
+    np.add.at(drop, drop_to, -1)
+    dropped = np.cumsum(drop)[:-1] > 0
+    keep[first:last] &= ~dropped
+    compacted_frames = int(dropped.sum())
+
+    mask = np.repeat(keep, frame)[: len(audio)]
+    out = audio[mask]
+
+    # 3) ピーク正規化
+    peak = float(np.abs(out).max())
+    gain = min(_TARGET_PEAK / peak, _MAX_GAIN) if peak > 0 else 1.0
+    if abs(gain - 1.0) > 1e-3:
+        out = out * np.float32(gain)
+
+    # 4) 長さの上限
+    capped_seconds = 0.0
+    limit = ref_max_seconds() if max_seconds is None else max_seconds
+    if limit > 0 and len(out) > int(limit * sr):
+        capped_seconds = (len(out) - int(limit * sr)) / sr
+        out = out[: int(limit * sr)]
+
+    report = PrepReport(
+        input_seconds=input_seconds,
+        output_seconds=len(out) / sr,
+        trimmed_seconds=min(trimmed_frames * _FRAME_SECONDS, input_seconds),
+        compacted_seconds=compacted_frames * _FRAME_SECONDS,
+        capped_seconds=capped_seconds,
+        gain_db=float(20.0 * np.log10(gain)),
+    )
+    return out.astype(np.float32, copy=False), report
+
+
+def prepare_reference(src: Path, dst: Optional[Path] = None, **kwargs: object) -> PrepReport:
+    """WAV ファイルを前処理して dst（省略時は src を置き換え）に書く。"""
+
+    audio, sr = read_wav(src)
+    out, report = preprocess(audio, sr, **kwargs)  # type: ignore[arg-type]
+    target = dst or src
+    tmp = target.with_name(target.name + ".tmp")
+    write_wav(tmp, out, sr)
+    os.replace(tmp, target)
+    logger.info(
+        f"[AudioPrep] {src.name}: {report.input_seconds:.2f}s -> {report.output_seconds:.2f}s "
+        f"(removed {report.removed_seconds:.2f}s, gain {report.gain_db:+.1f}dB)"
+    )
+    return report
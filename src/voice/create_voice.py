@@ -3,10 +3,13 @@ from __future__ import annotations
 import argparse
 import os
 import re
-import subprocess
+import sys
 from pathlib import Path
 
-import imageio_ffmpeg
+# スクリプトとして直接実行された場合も src パッケージを import できるようにする
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.voice.ffmpeg_pool import convert_to_wav  # noqa: E402
 
 
 def _repo_root() -> Path:
@@ -28,34 +31,6 @@ def _next_sample_path(samples_dir: Path) -> Path:
     return samples_dir / f"sample_{max_n + 1:02d}.wav"
 
 
-def _ffmpeg_convert_to_wav(src_path: Path, dst_path: Path) -> None:
-    """任意の音声を PCM 16-bit mono WAV(24kHz) に変換する（XTTS v2向け）。"""
-    ffmpeg = imageio_ffmpeg.get_ffmpeg_exe()
-    dst_path.parent.mkdir(parents=True, exist_ok=True)
-
-    args = [
-        ffmpeg,
-        "-y",
-        "-hide_banner",
-        "-loglevel",
-        "error",
-        "-nostats",
-        "-i",
-        str(src_path),
-        "-ac",
-        "1",
-        "-ar",
-        "24000",
-        "-c:a",
-        "pcm_s16le",
-        str(dst_path),
-    ]
-    proc = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    if proc.returncode != 0:
-        msg = (proc.stderr or b"").decode("utf-8", errors="replace")
-        raise RuntimeError(f"FFmpeg conversion failed (code={proc.returncode}): {msg}")
-
-
 def main(argv: list[str] | None = None) -> int:
     parser = argparse.ArgumentParser(description="音声サンプル作成ユーティリティ（sample_XX.wav を追加）")
     parser.add_argument(
@@ -79,7 +54,7 @@ def main(argv: list[str] | None = None) -> int:
 
     dst = _next_sample_path(_samples_dir())
     try:
-        _ffmpeg_convert_to_wav(src, dst)
+        convert_to_wav(src, dst)
     except Exception as e:
         print(f"変換に失敗しました: {e}")
         return 1
@@ -0,0 +1,68 @@
+"""生成/初期化イベントのプロセス内 pub/sub。
+
+モデル初期化の段階遷移や行ごとの生成イベントを購読者へ即時に配る。
+サーバーはこれを Server-Sent Events（/api/events）として中継し、UI は
+202 のポーリングをせずに準備完了・生成完了を知ることができる。
+
+publish はワーカースレッドから呼ばれるため、購読コールバックは素早く戻る
+（例: イベントループへ call_soon_threadsafe で渡すだけ）こと。
+"""
+
+from __future__ import annotations
+
+import itertools
+import os
+import threading
+import time
+from typing import Callable
+
+from src.logger import setup_logger
+
+logger = setup_logger("Events")
+
+EventCallback = Callable[[dict[str, object]], None]
+
+_LOCK = threading.Lock()
+_SUBSCRIBERS: dict[int, EventCallback] = {}
+_IDS = itertools.count(1)
+_SEQ = itertools.count(1)
+
+
+def _reset_after_fork() -> None:
+    # fork した推論ワーカーに親の購読者（イベントループ向けコールバック）を持ち込まない
+    global _LOCK
+    _LOCK = threading.Lock()
+    _SUBSCRIBERS.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def subscribe_events(callback: EventCallback) -> Callable[[], None]:
+    """購読を登録し、解除用の関数を返す。"""
+
+    sub_id = next(_IDS)
+    with _LOCK:
+        _SUBSCRIBERS[sub_id] = callback
+
+    def unsubscribe() -> None:
+        with _LOCK:
+            _SUBSCRIBERS.pop(sub_id, None)
+
+    return unsubscribe
+
+
+def publish_event(event_type: str, **data: object) -> None:
+    """イベントを全購読者へ配る。購読者側の例外は握りつぶす（生成処理を止めない）。"""
+
+    with _LOCK:
+        if not _SUBSCRIBERS:
+            return
+        callbacks = list(_SUBSCRIBERS.values())
+    event: dict[str, object] = {"type": event_type, "seq": next(_SEQ), "ts": time.time(), **data}
+    for cb in callbacks:
+        try:
+            cb(event)
+        except Exception as e:  # noqa: BLE001
+            logger.debug(f"[Events] subscriber failed: {e}")
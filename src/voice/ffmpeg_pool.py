@@ -0,0 +1,282 @@
+"""FFmpeg エンコード用の常駐ワーカープール。
+
+これまではファイルごとに `imageio_ffmpeg.get_ffmpeg_exe()` で実行ファイルを探し、
+一括生成のたびに ThreadPoolExecutor を作り直していた。ここでは
+
+- 実行ファイルのパスと `ffmpeg -version` による健全性チェック結果をプロセス内で使い回す
+- 常駐ワーカースレッドが上限付きキューからジョブを取り出して実行する
+  （キューが満杯なら submit 側が待つ = 推論側へのバックプレッシャー）
+- ワーカーが落ちていれば次の submit 時に補充する
+
+ffmpeg の CLI は 1 プロセスで 1 出力ファイルしか扱えないため、ffmpeg を使うジョブは
+ジョブごとにプロセスを起動する（常駐するのは起動・待機・後処理を受け持つワーカースレッド）。
+行の MP3 化は lameenc があればワーカースレッド内で直接エンコードし、ffmpeg を起動しない
+（src/voice/lame.py）。
+"""
+
+from __future__ import annotations
+
+import os
+import queue
+import shutil
+import subprocess
+import threading
+import time
+import wave
+from concurrent.futures import Future
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+import imageio_ffmpeg
+
+from src.logger import setup_logger
+
+logger = setup_logger("FFmpegPool")
+
+# 健全性チェック結果を信用する秒数（失敗時は次の submit で再チェックする）
+_HEALTH_TTL_SECONDS = 60.0
+
+
+@lru_cache(maxsize=1)
+def ffmpeg_exe() -> str:
+    """ffmpeg 実行ファイルのパス（初回のみ探索してキャッシュする）。"""
+    return imageio_ffmpeg.get_ffmpeg_exe()
+
+
+def run_ffmpeg(args: list[str], *, stdin_bytes: Optional[bytes] = None, error_label: str = "FFmpeg") -> None:
+    """`ffmpeg <args>` を実行し、失敗したら stderr 付きの RuntimeError を送出する。"""
+
+    proc = subprocess.run(
+        [ffmpeg_exe(), "-y", "-hide_banner", "-loglevel", "error", "-nostats", *args],
+        input=stdin_bytes,
+        stdin=None if stdin_bytes is not None else subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    if proc.returncode != 0:
+        msg = (proc.stderr or b"").decode("utf-8", errors="replace")
+        raise RuntimeError(f"{error_label} failed (code={proc.returncode}): {msg}")
+
+
+def is_xtts_wav(path: Path) -> bool:
+    """既に XTTS 向けの形式（PCM 16-bit mono 24kHz の WAV）なら True。"""
+
+    try:
+        with wave.open(str(path), "rb") as wf:
+            return (
+                wf.getnchannels() == 1
+                and wf.getsampwidth() == 2
+                and wf.getframerate() == 24000
+                and wf.getcomptype() == "NONE"
+                and wf.getnframes() > 0
+            )
+    except (wave.Error, EOFError, OSError):
+        return False
+
+
+def _convert_to_wav(src_path: Path, dst_path: Path) -> None:
+    dst_path.parent.mkdir(parents=True, exist_ok=True)
+    # XTTS は入力のサンプルレートに厳密ではないが、安定のため 24kHz に揃える。
+    run_ffmpeg(
+        ["-i", str(src_path), "-ac", "1", "-ar", "24000", "-c:a", "pcm_s16le", str(dst_path)],
+        error_label="FFmpeg conversion",
+    )
+
+
+class EncoderPool:
+    """上限付きキューを持つ常駐エンコードワーカー。"""
+
+    def __init__(self, *, workers: int = 2, max_queue: int = 4):
+        self.workers = max(1, int(workers))
+        self.max_queue = max(1, int(max_queue))
+        self._queue: "queue.Queue[Optional[tuple[Future[Any], Callable[..., Any], tuple[Any, ...]]]]" = queue.Queue(
+            maxsize=self.max_queue
+        )
+        self._lock = threading.Lock()
+        self._threads: list[threading.Thread] = []
+        self._closed = False
+        self._busy = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._restarts = 0
+        self._wait_seconds = 0.0
+        self._healthy: Optional[bool] = None
+        self._health_checked_at = 0.0
+        self._health_error: Optional[str] = None
+        self._version: Optional[str] = None
+
+    # --- 健全性チェック ---
+
+    def check_health(self, *, force: bool = False) -> bool:
+        """`ffmpeg -version` が通るかを確認する（結果は一定時間キャッシュ）。"""
+
+        with self._lock:
+            fresh = time.monotonic() - self._health_checked_at < _HEALTH_TTL_SECONDS
+            if not force and self._healthy is not None and fresh:
+                return self._healthy
+
+        healthy, version, error = False, None, None
+        try:
+            proc = subprocess.run(
+                [ffmpeg_exe(), "-hide_banner", "-version"],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                timeout=15,
+            )
+            healthy = proc.returncode == 0
+            out = (proc.stdout or b"").decode("utf-8", errors="replace").strip()
+            version = out.splitlines()[0] if out else None
+            if not healthy:
+                error = (proc.stderr or b"").decode("utf-8", errors="replace").strip() or f"code={proc.returncode}"
+        except Exception as e:  # noqa: BLE001
+            error = str(e)
+
+        with self._lock:
+            self._healthy = healthy
+            self._version = version
+            self._health_error = error
+            self._health_checked_at = time.monotonic()
+        if not healthy:
+            logger.error(f"[FFmpegPool] health check failed: {error}")
+        return healthy
+
+    # --- ワーカー ---
+
+    def _ensure_workers(self) -> None:
+        with self._lock:
+            alive = [t for t in self._threads if t.is_alive()]
+            if self._threads and len(alive) < len(self._threads):
+                self._restarts += len(self._threads) - len(alive)
+                logger.warning(f"[FFmpegPool] restarting {len(self._threads) - len(alive)} dead worker(s)")
+            self._threads = alive
+            while len(self._threads) < self.workers:
+                t = threading.Thread(
+                    target=self._loop, name=f"svm-encode-{len(self._threads)}", daemon=True
+                )
+                t.start()
+                self._threads.append(t)
+
+    def _loop(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            fut, fn, args = item
+            try:
+                if not fut.set_running_or_notify_cancel():
+                    continue
+                with self._lock:
+                    self._busy += 1
+                try:
+                    result = fn(*args)
+                except BaseException as e:  # noqa: BLE001
+                    with self._lock:
+                        self._failed += 1
+                    fut.set_exception(e)
+                else:
+                    with self._lock:
+                        self._completed += 1
+                    fut.set_result(result)
+                finally:
+                    with self._lock:
+                        self._busy -= 1
+            finally:
+                self._queue.task_done()
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> "Future[Any]":
+        """ジョブを投入する。キューが満杯なら空くまで待つ（バックプレッシャー）。"""
+
+        if self._closed:
+            raise RuntimeError("EncoderPool is closed")
+        if not self.check_health():
+            # 一時的な失敗の可能性もあるため、キャッシュを無視してもう一度だけ確認する
+            if not self.check_health(force=True):
+                raise RuntimeError(f"FFmpeg が利用できません: {self._health_error}")
+        self._ensure_workers()
+
+        fut: Future[Any] = Future()
+        t0 = time.perf_counter()
+        self._queue.put((fut, fn, args))
+        waited = time.perf_counter() - t0
+        with self._lock:
+            self._submitted += 1
+            self._wait_seconds += waited
+        return fut
+
+    # --- ffmpeg ジョブのヘルパ ---
+
+    def convert_to_wav(self, src_path: Path, dst_path: Path) -> bool:
+        """任意の音声を PCM 16-bit mono WAV(24kHz) に変換する（XTTS v2向け、完了まで待つ）。
+
+        既にその形式の WAV なら ffmpeg を起動せずにコピーする。ffmpeg で変換した場合は True。
+        """
+        if is_xtts_wav(src_path):
+            dst_path.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(src_path, dst_path)
+            return False
+        self.submit(_convert_to_wav, src_path, dst_path).result()
+        return True
+
+    def stats(self) -> dict[str, object]:
+        from src.voice.lame import mp3_encoder  # lame → narration → このモジュールの循環を避ける
+
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "alive": sum(1 for t in self._threads if t.is_alive()),
+                "busy": self._busy,
+                "queued": self._queue.qsize(),
+                "max_queue": self.max_queue,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "restarts": self._restarts,
+                "submit_wait_seconds": round(self._wait_seconds, 3),
+                "healthy": self._healthy,
+                "health_error": self._health_error,
+                "version": self._version,
+                "mp3_encoder": mp3_encoder(),
+            }
+
+    def close(self) -> None:
+        """投入済みのジョブを処理し終えてからワーカーを止める。"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            threads = list(self._threads)
+        for _ in threads:
+            self._queue.put(None)
+        for t in threads:
+            t.join()
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.environ.get(name, str(default))))
+    except ValueError:
+        return default
+
+
+_POOL_LOCK = threading.Lock()
+_POOL: Optional[EncoderPool] = None
+
+
+def get_encoder_pool() -> EncoderPool:
+    """プロセス共通のエンコードプール（SVM_ENCODE_WORKERS / SVM_ENCODE_QUEUE で調整）。"""
+
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            workers = _env_int("SVM_ENCODE_WORKERS", 2)
+            _POOL = EncoderPool(workers=workers, max_queue=_env_int("SVM_ENCODE_QUEUE", workers * 2))
+        return _POOL
+
+
+def convert_to_wav(src_path: Path, dst_path: Path) -> bool:
+    """共有プール経由で WAV(24kHz mono PCM16) へ変換する（既にその形式ならコピーだけで False）。"""
+    return get_encoder_pool().convert_to_wav(src_path, dst_path)
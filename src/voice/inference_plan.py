@@ -0,0 +1,152 @@
+"""voice ごとに事前解決した XTTS `inference` の呼び出し（行ごとの前処理を省く）。
+
+以前は行ごとに `inspect.signature(tts_model.inference)` の取得、引数名の候補探索、
+`next(tts_model.parameters()).device` の問い合わせ、latent のデバイス転送を繰り返していた。
+`LatentInferencePlan.build` で voice のロード時に 1 回だけこれらを済ませ、以降の行は
+`plan(text)`（`torch.inference_mode` 下での直接呼び出し 1 回）だけにする。
+"""
+
+from __future__ import annotations
+
+import inspect
+from typing import Any, Callable, Optional
+
+_TEXT_NAMES = ("text",)
+_LANGUAGE_NAMES = ("language", "lang")
+_GPT_NAMES = ("gpt_cond_latent", "gpt_conditioning_latents", "gpt_cond_latents", "gpt_latent")
+_SPK_NAMES = ("speaker_embedding", "spk_embedding", "speaker_emb", "embedding")
+
+
+def _first(names: tuple[str, ...], params: Any) -> Optional[str]:
+    return next((n for n in names if n in params), None)
+
+
+def model_device(tts_model: Any, fallback: Optional[str] = None) -> Any:
+    """モデルのパラメータが載っているデバイス（取れなければ fallback）。"""
+
+    import torch
+
+    try:
+        return next(tts_model.parameters()).device
+    except Exception:
+        return torch.device(fallback or "cpu")
+
+
+def pin_to_device(value: Any, device: Any) -> Any:
+    """Tensor ならモデルと同じデバイスへ移す（既に載っていればそのまま）。"""
+
+    import torch
+
+    if isinstance(value, torch.Tensor) and value.device != device:
+        return value.to(device)
+    return value
+
+
+class LatentInferencePlan:
+    """latent・言語・推論パラメータを束ねた `inference` 呼び出し。`plan(text)` で 1 行を推論する。"""
+
+    def __init__(
+        self,
+        fn: Callable[..., Any],
+        *,
+        text_param: Optional[str],
+        kwargs: dict[str, Any],
+        positional: tuple[Any, ...],
+        gpt_cond_latent: Any,
+        speaker_embedding: Any,
+    ):
+        self._fn = fn
+        self._text_param = text_param
+        self._kwargs = kwargs
+        self._positional = positional
+        self.gpt_cond_latent = gpt_cond_latent
+        self.speaker_embedding = speaker_embedding
+
+    @classmethod
+    def build(
+        cls,
+        tts_model: Any,
+        *,
+        gpt_cond_latent: Any,
+        speaker_embedding: Any,
+        language: str,
+        params: Optional[dict[str, Any]] = None,
+        fallback_device: Optional[str] = None,
+    ) -> "LatentInferencePlan":
+        """`tts_model.inference` の引数名を解決し、latent をモデルのデバイスへ載せておく。"""
+
+        fn = tts_model.inference
+        device = model_device(tts_model, fallback_device)
+        gpt = pin_to_device(gpt_cond_latent, device)
+        spk = pin_to_device(speaker_embedding, device)
+
+        # 返却値/引数はバージョン差分があるため、signature を見て適応する
+        sig_params = inspect.signature(fn).parameters
+        text_param = _first(_TEXT_NAMES, sig_params)
+        if text_param is None:
+            # text 引数名が見つからない場合は positional で呼ぶ
+            return cls(
+                fn,
+                text_param=None,
+                kwargs={},
+                positional=(language, gpt, spk),
+                gpt_cond_latent=gpt,
+                speaker_embedding=spk,
+            )
+
+        kwargs: dict[str, Any] = {}
+        lang_param = _first(_LANGUAGE_NAMES, sig_params)
+        if lang_param:
+            kwargs[lang_param] = language
+        gpt_param = _first(_GPT_NAMES, sig_params)
+        if gpt_param:
+            kwargs[gpt_param] = gpt
+        spk_param = _first(_SPK_NAMES, sig_params)
+        if spk_param:
+            kwargs[spk_param] = spk
+        for name, value in (params or {}).items():
+            if name in sig_params:
+                kwargs[name] = value
+        return cls(
+            fn,
+            text_param=text_param,
+            kwargs=kwargs,
+            positional=(),
+            gpt_cond_latent=gpt,
+            speaker_embedding=spk,
+        )
+
+    def __call__(self, text: str) -> Any:
+        import torch
+
+        with torch.inference_mode():
+            if self._text_param is None:
+                return self._fn(text, *self._positional)
+            return self._fn(**{self._text_param: text}, **self._kwargs)
+
+
+def waveform_from_output(out: Any, *, default_sr: int = 24000) -> Optional[tuple[Any, int]]:
+    """`inference` の戻り値（dict / tuple / 波形そのもの）から (波形, サンプルレート) を取り出す。"""
+
+    if out is None:
+        return None
+    wav = None
+    sr = default_sr
+    if isinstance(out, dict):
+        # 波形は ndarray/Tensor のため `or` で繋ぐと真偽値評価で例外になる
+        wav = out.get("wav")
+        if wav is None:
+            wav = out.get("audio")
+        sr = int(out.get("sample_rate") or out.get("sr") or sr)
+    elif isinstance(out, tuple) and len(out) >= 1:
+        wav = out[0]
+        if len(out) >= 2:
+            try:
+                sr = int(out[1])
+            except Exception:
+                pass
+    else:
+        wav = out
+    if wav is None:
+        return None
+    return wav, sr
@@ -0,0 +1,143 @@
+"""プロセス内の LAME で PCM を MP3 にする（行ごとに ffmpeg を起動しない）。
+
+行の MP3 化はこれまで 1 行ごとに ffmpeg プロセスを起動していた（エンコードプールが常駐させて
+いるのは、起動と完了待ちを受け持つスレッドだけ）。lameenc（LAME のバインディング。エンコード中は
+GIL を離す）が入っていれば、エンコードワーカーのスレッド内で直接エンコードする。
+
+設定は ffmpeg（libmp3lame、`-q:a 3`）と同じ VBR で、先頭の Xing/LAME タグのフレームはここで書く
+（フレーム数・バイト数・シーク用 TOC・エンコーダ遅延とパディング）。プレイヤーの長さ表示と、
+デコード時に先頭の遅延・末尾のパディングを削る挙動は ffmpeg の出力と同じになる。
+
+SVM_MP3_ENCODER=ffmpeg で従来どおり ffmpeg を使う（既定の auto は lameenc があれば lame）。
+"""
+
+from __future__ import annotations
+
+import os
+import struct
+from typing import Any, Optional
+
+from src.logger import setup_logger
+from src.voice.narration import parse_header, side_info_size
+
+logger = setup_logger("Lame")
+
+_VBR_MTRH = 4  # LAME の vbr_default（ffmpeg が -q:a 指定時に使うモード）
+_VBR_QUALITY = 3  # ffmpeg の -q:a 3
+_QUALITY = 3  # LAME の既定のアルゴリズム品質（ffmpeg は compression_level 未指定なら変えない）
+_ENCODER_DELAY = 576  # LAME のエンコーダ遅延（サンプル）。デコーダ側の 529 サンプルは含まない
+_LAME_VERSION = b"LAME3.100"
+
+_warned_missing = False
+
+
+def _lameenc() -> Optional[Any]:
+    try:
+        import lameenc
+    except ImportError:
+        return None
+    return lameenc
+
+
+def lame_available() -> bool:
+    return _lameenc() is not None
+
+
+def mp3_encoder() -> str:
+    """行の MP3 化に使うエンコーダ（"lame" / "ffmpeg"）。SVM_MP3_ENCODER（auto / lame / ffmpeg）で選ぶ。"""
+
+    global _warned_missing
+    mode = os.environ.get("SVM_MP3_ENCODER", "auto").strip().lower()
+    if mode == "ffmpeg":
+        return "ffmpeg"
+    if lame_available():
+        return "lame"
+    if mode == "lame" and not _warned_missing:
+        _warned_missing = True
+        logger.warning("[Lame] SVM_MP3_ENCODER=lame but lameenc is not installed; falling back to ffmpeg")
+    return "ffmpeg"
+
+
+def _crc16(data: bytes) -> int:
+    """LAME タグの CRC（CRC-16/ARC）。"""
+
+    crc = 0
+    for b in data:
+        crc ^= b
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+    return crc
+
+
+def info_tag_frame(audio: bytes, *, samples: int) -> bytes:
+    """audio（先頭から MP3 フレームが並ぶバイト列）の前に置く Xing/LAME タグのフレームを作る。
+
+    samples はエンコード前の PCM のサンプル数（チャンネルあたり）。末尾のパディングの計算に使う。
+    """
+
+    first = parse_header(audio, 0)
+    if first is None:
+        raise ValueError("MP3 フレームで始まっていません")
+    offsets: list[int] = []
+    pos = 0
+    while (h := parse_header(audio, pos)) is not None and pos + h.length <= len(audio):
+        offsets.append(pos)
+        pos += h.length
+    frames = len(offsets)
+
+    # 元のフレームと同じ形式で、タグが収まる最小のビットレートのフレームにする（CRC なし・パディングなし）
+    side = side_info_size(first)
+    need = 4 + side + 120 + 36
+    b1 = audio[1] | 0x01
+    for bitrate_index in range(1, 15):
+        hdr = bytes([0xFF, b1, (bitrate_index << 4) | (audio[2] & 0x0C), audio[3]])
+        tag_header = parse_header(hdr, 0)
+        if tag_header is not None and tag_header.length >= need:
+            break
+    else:
+        raise ValueError("Xing タグが収まるフレームを作れません")
+
+    length = tag_header.length
+    total_bytes = length + len(audio)
+    # TOC: 再生位置 i% のフレームがファイル先頭から何バイト目かを 256 段階で
+    toc = bytes(
+        min(255, (length + offsets[min(frames - 1, i * frames // 100)]) * 256 // total_bytes) if frames else 0
+        for i in range(100)
+    )
+    padding = frames * first.samples - _ENCODER_DELAY - samples
+    delays = (_ENCODER_DELAY << 12) | min(4095, max(0, padding))
+
+    frame = bytearray(length)
+    frame[:4] = hdr
+    p = 4 + side
+    frame[p : p + 120] = (
+        b"Xing"
+        + struct.pack(">III", 0x0F, frames, total_bytes)
+        + toc
+        + struct.pack(">I", 100 - 10 * _VBR_QUALITY - _QUALITY)
+    )
+    p += 120
+    lame = bytearray(36)
+    lame[0:9] = _LAME_VERSION
+    lame[9] = _VBR_MTRH  # タグのリビジョン 0 + VBR の方式
+    lame[21:24] = delays.to_bytes(3, "big")
+    lame[28:32] = struct.pack(">I", total_bytes)  # music length（このフレームを含む）
+    frame[p : p + 36] = lame
+    frame[p + 34 : p + 36] = struct.pack(">H", _crc16(bytes(frame[: p + 34])))
+    return bytes(frame)
+
+
+def encode_pcm16(pcm: bytes, *, sample_rate: int, channels: int = 1) -> bytes:
+    """s16le PCM を MP3（先頭に Xing/LAME タグ）にして返す。lameenc が無ければ RuntimeError。"""
+
+    lameenc = _lameenc()
+    if lameenc is None:
+        raise RuntimeError("lameenc がインストールされていません")
+    enc = lameenc.Encoder()
+    enc.set_in_sample_rate(int(sample_rate))
+    enc.set_channels(int(channels))
+    enc.set_vbr(_VBR_MTRH)
+    enc.set_vbr_quality(_VBR_QUALITY)
+    enc.set_quality(_QUALITY)
+    audio = bytes(enc.encode(pcm)) + bytes(enc.flush())
+    return info_tag_frame(audio, samples=len(pcm) // (2 * int(channels))) + audio
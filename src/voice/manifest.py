@@ -0,0 +1,132 @@
+"""生成済み音声のマニフェスト（output/manifest.json）。
+
+どの index をどの原稿・話者設定で生成したかを記録しておき、新しい原稿CSVとの
+差分（追加/変更/削除/未変更）を求められるようにする。差分生成
+（only_changed）では、追加・変更された行だけを再合成する。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, Optional
+
+from src.voice.synth_cache import normalize_script
+
+MANIFEST_NAME = "manifest.json"
+
+_MANIFEST_LOCK = threading.Lock()
+
+
+def manifest_path(output_dir: Path) -> Path:
+    return Path(output_dir) / MANIFEST_NAME
+
+
+def script_digest(script: str) -> str:
+    return hashlib.sha256(normalize_script(script).encode("utf-8")).hexdigest()
+
+
+def load_manifest(output_dir: Path) -> dict[int, dict[str, object]]:
+    """index -> 行情報 を返す（無い/壊れている場合は空）。"""
+
+    p = manifest_path(output_dir)
+    if not p.exists():
+        return {}
+    try:
+        data = json.loads(p.read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+    rows = data.get("rows") if isinstance(data, dict) else None
+    if not isinstance(rows, dict):
+        return {}
+    out: dict[int, dict[str, object]] = {}
+    for k, v in rows.items():
+        try:
+            out[int(k)] = dict(v)
+        except Exception:
+            continue
+    return out
+
+
+def _write_manifest(output_dir: Path, rows: dict[int, dict[str, object]]) -> None:
+    p = manifest_path(output_dir)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    payload = {"version": 1, "rows": {str(k): rows[k] for k in sorted(rows)}}
+    tmp = p.with_name(p.name + ".tmp")
+    tmp.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(str(tmp), str(p))
+
+
+def record_rows(output_dir: Path, entries: dict[int, dict[str, object]]) -> None:
+    """生成済み行を追記/更新する。"""
+
+    with _MANIFEST_LOCK:
+        rows = load_manifest(output_dir)
+        rows.update(entries)
+        _write_manifest(output_dir, rows)
+
+
+def forget_rows(output_dir: Path, indices: Iterable[int]) -> None:
+    with _MANIFEST_LOCK:
+        rows = load_manifest(output_dir)
+        for i in indices:
+            rows.pop(int(i), None)
+        _write_manifest(output_dir, rows)
+
+
+@dataclass
+class ScriptDiff:
+    added: list[int] = field(default_factory=list)
+    changed: list[int] = field(default_factory=list)
+    removed: list[int] = field(default_factory=list)
+    unchanged: list[int] = field(default_factory=list)
+
+    @property
+    def targets(self) -> list[int]:
+        """再合成が必要な index（追加 + 変更）。"""
+        return sorted(self.added + self.changed)
+
+    def to_dict(self) -> dict[str, object]:
+        return {
+            "added": self.added,
+            "changed": self.changed,
+            "removed": self.removed,
+            "unchanged": len(self.unchanged),
+        }
+
+
+def diff_rows(
+    rows: Iterable[tuple[int, str]],
+    manifest: dict[int, dict[str, object]],
+    *,
+    output_dir: Optional[Path] = None,
+    voice_key: Optional[str] = None,
+) -> ScriptDiff:
+    """(index, script) の列をマニフェストと突き合わせる。
+
+    - voice_key を渡した場合、話者/モデル設定が違う行も「変更」とみなす
+    - output_dir を渡した場合、出力MP3が消えている行も「変更」とみなす
+    """
+
+    diff = ScriptDiff()
+    seen: set[int] = set()
+    for index, script in rows:
+        seen.add(index)
+        prev = manifest.get(index)
+        if prev is None:
+            diff.added.append(index)
+            continue
+        same = prev.get("script_sha") == script_digest(script)
+        if same and voice_key is not None and prev.get("voice_key") != voice_key:
+            same = False
+        if same and output_dir is not None:
+            f = Path(output_dir) / str(prev.get("file") or "")
+            same = f.is_file() and f.stat().st_size > 0
+        (diff.unchanged if same else diff.changed).append(index)
+
+    diff.removed = sorted(i for i in manifest if i not in seen)
+    return diff
@@ -0,0 +1,210 @@
+"""XTTS の重みスナップショット（mmap で読める torch 形式）による高速再起動。
+
+`TTS(model_name=...)` は起動のたびにモデルマネージャでの探索、チェックポイントの
+unpickle（数 GB をメモリへコピー）、デバイスへの移動を行う。初回ロードに成功したら
+推論用の重みだけを `torch.save` で src/voice/models/xtts_snapshot/ に書き出し、次回からは
+`torch.load(mmap=True)` + `load_state_dict(assign=True)` でファイルを直接マップして
+モデルを組み立てる（CPU では重みのコピーが発生せず、ページキャッシュも再利用される）。
+
+torch の zip 形式は mmap 読み込みに対応しているため、追加の依存は不要。
+スナップショットは元モデルのファイル（サイズ・更新時刻）と torch / coqui-tts の
+バージョンを記録し、どれかが変わったら使わずに通常ロードへ戻る（その後に書き直す）。
+SVM_MODEL_SNAPSHOT=0 で無効化。
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+from src.logger import setup_logger
+
+logger = setup_logger("ModelSnapshot")
+
+SNAPSHOT_FORMAT = 1
+_WEIGHTS_FILE = "weights.pt"
+_META_FILE = "snapshot.json"
+# 推論用 GPT（gpt.gpt_inference.*）は本体の層を参照するだけなので保存せず、ロード後に組み立て直す
+_DERIVED_PREFIXES = ("gpt.gpt_inference.",)
+_SOURCE_FILES = ("model.pth", "config.json", "vocab.json")
+
+
+def snapshot_enabled() -> bool:
+    return os.environ.get("SVM_MODEL_SNAPSHOT", "1").strip() != "0"
+
+
+def snapshot_dir() -> Path:
+    override = os.environ.get("SVM_MODEL_SNAPSHOT_DIR", "").strip()
+    if override:
+        return Path(override).resolve()
+    return Path(__file__).resolve().parent / "models" / "xtts_snapshot"
+
+
+def _versions() -> dict[str, str]:
+    from importlib import metadata
+
+    import torch
+
+    out = {"torch": str(torch.__version__)}
+    for dist in ("coqui-tts", "TTS"):
+        try:
+            out["tts"] = metadata.version(dist)
+            break
+        except metadata.PackageNotFoundError:
+            continue
+    return out
+
+
+def _fingerprint(model_dir: Path) -> dict[str, list[int]]:
+    out: dict[str, list[int]] = {}
+    for name in _SOURCE_FILES:
+        p = model_dir / name
+        if p.exists():
+            st = p.stat()
+            out[name] = [st.st_size, st.st_mtime_ns]
+    return out
+
+
+def find_model_dir(tts: Any, model_name: str) -> Optional[Path]:
+    """通常ロードした TTS から、config.json / vocab.json のあるモデルディレクトリを探す。"""
+
+    synthesizer = getattr(tts, "synthesizer", None)
+    candidates: list[Path] = []
+    for attr in ("model_dir", "tts_checkpoint"):
+        value = getattr(synthesizer, attr, None)
+        if value:
+            p = Path(str(value))
+            candidates.append(p if p.is_dir() else p.parent)
+    try:
+        from TTS.utils.generic_utils import get_user_data_dir
+
+        candidates.append(Path(get_user_data_dir("tts")) / model_name.replace("/", "--"))
+    except Exception:
+        pass
+    for p in candidates:
+        if (p / "config.json").exists() and (p / "vocab.json").exists():
+            return p.resolve()
+    return None
+
+
+def save_snapshot(model: Any, *, model_dir: Path, model_name: str, path: Optional[Path] = None) -> Path:
+    """推論用の重みを書き出す。メタデータは最後に置き、揃っていないスナップショットは使われない。"""
+
+    import torch
+
+    out = path or snapshot_dir()
+    out.mkdir(parents=True, exist_ok=True)
+    meta_path = out / _META_FILE
+    meta_path.unlink(missing_ok=True)
+
+    state = {
+        k: v.detach().to("cpu")
+        for k, v in model.state_dict().items()
+        if not k.startswith(_DERIVED_PREFIXES)
+    }
+    tmp = out / (_WEIGHTS_FILE + ".tmp")
+    torch.save(state, str(tmp))
+    os.replace(tmp, out / _WEIGHTS_FILE)
+
+    meta = {
+        "format": SNAPSHOT_FORMAT,
+        "model_name": model_name,
+        "model_dir": str(model_dir),
+        "source": _fingerprint(model_dir),
+        "versions": _versions(),
+        "tensors": len(state),
+        "bytes": (out / _WEIGHTS_FILE).stat().st_size,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    tmp_meta = meta_path.with_suffix(".json.tmp")
+    tmp_meta.write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp_meta, meta_path)
+    return out
+
+
+def load_snapshot_meta(model_name: str, path: Optional[Path] = None) -> Optional[dict[str, Any]]:
+    """使えるスナップショットのメタデータ（無い・古い場合は理由をログに出して None）。"""
+
+    out = path or snapshot_dir()
+    try:
+        meta = json.loads((out / _META_FILE).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if not isinstance(meta, dict):
+        return None
+
+    reason = ""
+    model_dir = Path(str(meta.get("model_dir") or ""))
+    if meta.get("format") != SNAPSHOT_FORMAT:
+        reason = f"format {meta.get('format')} != {SNAPSHOT_FORMAT}"
+    elif meta.get("model_name") != model_name:
+        reason = f"model {meta.get('model_name')} != {model_name}"
+    elif not (out / _WEIGHTS_FILE).exists():
+        reason = "weights missing"
+    elif meta.get("versions") != _versions():
+        reason = f"versions changed {meta.get('versions')} -> {_versions()}"
+    elif meta.get("source") != _fingerprint(model_dir):
+        reason = f"source model changed ({model_dir})"
+    if reason:
+        logger.info(f"[ModelSnapshot] snapshot ignored: {reason}")
+        return None
+    meta["path"] = str(out)
+    return meta
+
+
+def load_state_dict_mmap(path: Path) -> dict[str, Any]:
+    """重みファイルをコピーせずにマップして読む（テンソルはファイルのページを直接参照する）。"""
+
+    import torch
+
+    return torch.load(str(path), mmap=True, weights_only=True, map_location="cpu")
+
+
+def assign_state_dict(model: Any, state: dict[str, Any]) -> None:
+    """mmap したテンソルをそのままパラメータとして差し込む（派生キー以外の過不足はエラー）。"""
+
+    result = model.load_state_dict(state, strict=False, assign=True)
+    missing = [k for k in result.missing_keys if not k.startswith(_DERIVED_PREFIXES)]
+    if missing or result.unexpected_keys:
+        raise RuntimeError(
+            f"snapshot does not match the model: missing={missing[:5]} unexpected={list(result.unexpected_keys)[:5]}"
+        )
+
+
+def load_tts_from_snapshot(meta: dict[str, Any]) -> Any:
+    """スナップショットから XTTS を組み立て、`TTS(model_name=...)` と同じ形の TTS オブジェクトで返す。"""
+
+    from TTS.api import TTS
+    from TTS.tts.configs.xtts_config import XttsConfig
+    from TTS.tts.layers.xtts.tokenizer import VoiceBpeTokenizer
+    from TTS.tts.models.xtts import Xtts
+    from TTS.utils.synthesizer import Synthesizer
+
+    model_dir = Path(str(meta["model_dir"]))
+    config = XttsConfig()
+    config.load_json(str(model_dir / "config.json"))
+
+    # Xtts.load_checkpoint と同じ順序で組み立て、チェックポイントの unpickle だけを mmap に置き換える
+    model = Xtts.init_from_config(config)
+    model.tokenizer = VoiceBpeTokenizer(vocab_file=str(model_dir / "vocab.json"))
+    model.init_models()
+    assign_state_dict(model, load_state_dict_mmap(Path(str(meta["path"])) / _WEIGHTS_FILE))
+    model.hifigan_decoder.eval()
+    model.gpt.init_gpt_for_inference(kv_cache=model.args.kv_cache, use_deepspeed=False)
+    model.gpt.eval()
+    model.eval()
+
+    synthesizer = Synthesizer()
+    synthesizer.tts_model = model
+    synthesizer.tts_config = config
+    synthesizer.output_sample_rate = config.audio["output_sample_rate"]
+    if hasattr(synthesizer, "_get_segmenter"):
+        synthesizer.seg = synthesizer._get_segmenter("en")
+
+    tts = TTS()
+    tts.model_name = str(meta["model_name"])
+    tts.synthesizer = synthesizer
+    return tts
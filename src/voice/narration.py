@@ -0,0 +1,352 @@
+"""行ごとの MP3 を再エンコードせずに 1 本のナレーションへ連結し、チャプター（開始時刻）を書き出す。
+
+デッキ全体の音声は、これまで別ツールで `voice_XXX.mp3` をすべてデコードして再エンコードしていた。
+MP3 はフレーム単位で独立したストリームなので、ここでは各ファイルのフレーム列をそのまま
+並べて連結する（デコードしない）。
+
+- 各ファイルの ID3 タグと先頭の Xing/Info フレーム（ファイル全体の長さ情報）は除き、
+  連結後の全体に対する Xing フレームを先頭に 1 つだけ書く（プレイヤーの長さ表示・シーク用）
+- 行間の無音は、同じ形式で一度だけエンコードした無音フレーム（ビットリザーバ無し）を並べる
+- 開始時刻はフレームヘッダから数えたサンプル数で計算する（連結後のファイル上の位置と一致する）
+
+フレームヘッダを飛び石に読むだけなので、処理時間は出力サイズにほぼ比例する。
+エンコーダ遅延（ファイル先頭の約 50ms）は行ごとに残る。
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import struct
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from src.logger import setup_logger
+from src.voice.ffmpeg_pool import run_ffmpeg
+
+logger = setup_logger("Narration")
+
+NARRATION_FORMAT = "svm-narration/1"
+
+# Layer III のビットレート（kbps）: MPEG-1 / MPEG-2・2.5
+_BITRATES = {
+    1: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+# バージョンビット → サンプリング周波数
+_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+_SILENCE_ARGS = ["-c:a", "libmp3lame", "-q:a", "3"]
+
+
+def narration_gap_seconds() -> float:
+    """行間の無音（秒）。SVM_NARRATION_GAP_SECONDS（既定 0.5）で変更できる。"""
+    try:
+        return max(0.0, float(os.environ.get("SVM_NARRATION_GAP_SECONDS", "0.5")))
+    except ValueError:
+        return 0.5
+
+
+@dataclass(frozen=True)
+class FrameHeader:
+    version: int  # 3=MPEG-1, 2=MPEG-2, 0=MPEG-2.5
+    sample_rate: int
+    channels: int
+    length: int
+    samples: int
+
+    @property
+    def format(self) -> tuple[int, int, int]:
+        return self.version, self.sample_rate, self.channels
+
+
+def parse_header(data: bytes, pos: int) -> Optional[FrameHeader]:
+    """pos から始まる MPEG Layer III のフレームヘッダを読む（不正なら None）。"""
+
+    if pos + 4 > len(data) or data[pos] != 0xFF or data[pos + 1] & 0xE0 != 0xE0:
+        return None
+    b1, b2, b3 = data[pos + 1], data[pos + 2], data[pos + 3]
+    version = (b1 >> 3) & 3
+    if version == 1 or (b1 >> 1) & 3 != 1:
+        return None
+    bitrate_index, rate_index = b2 >> 4, (b2 >> 2) & 3
+    if bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    bitrate = _BITRATES[1 if version == 3 else 2][bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATES[version][rate_index]
+    padding = (b2 >> 1) & 1
+    coef = 144 if version == 3 else 72
+    return FrameHeader(
+        version=version,
+        sample_rate=sample_rate,
+        channels=1 if b3 >> 6 == 3 else 2,
+        length=coef * bitrate // sample_rate + padding,
+        samples=1152 if version == 3 else 576,
+    )
+
+
+def side_info_size(h: FrameHeader) -> int:
+    if h.version == 3:
+        return 17 if h.channels == 1 else 32
+    return 9 if h.channels == 1 else 17
+
+
+def _is_info_frame(data: bytes, pos: int, h: FrameHeader) -> bool:
+    tag = data[pos + 4 + side_info_size(h) : pos + 8 + side_info_size(h)]
+    return tag in (b"Xing", b"Info") or data[pos + 36 : pos + 40] == b"VBRI"
+
+
+def _skip_id3v2(data: bytes) -> int:
+    if data[:3] != b"ID3" or len(data) < 10:
+        return 0
+    size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+    return 10 + size + (10 if data[5] & 0x10 else 0)
+
+
+@dataclass
+class Mp3Frames:
+    """1 ファイルのうち音声フレームが並ぶ範囲 [start, end) とフレーム数。"""
+
+    path: Path
+    data: bytes
+    start: int
+    end: int
+    frames: int
+    header: FrameHeader
+    info_frame: Optional[bytes]
+
+    @property
+    def samples(self) -> int:
+        return self.frames * self.header.samples
+
+
+def scan_mp3(path: Path) -> Mp3Frames:
+    """フレームヘッダをたどって音声フレームの範囲を求める（デコードしない）。"""
+
+    data = Path(path).read_bytes()
+    end_limit = len(data) - (128 if data[-128:-125] == b"TAG" else 0)
+    pos = _skip_id3v2(data)
+    first: Optional[FrameHeader] = None
+    info_frame: Optional[bytes] = None
+    start = end = -1
+    frames = 0
+    while pos < end_limit:
+        h = parse_header(data, pos)
+        if h is None or pos + h.length > end_limit or (first is not None and h.format != first.format):
+            if start >= 0:
+                break  # 音声フレームの後ろのゴミ・切れたフレームは捨てる
+            # 先頭のゴミは次の同期ワードまで読み飛ばす
+            nxt = data.find(b"\xff", pos + 1, end_limit)
+            if nxt < 0:
+                break
+            pos = nxt
+            continue
+        if first is None:
+            first = h
+            if _is_info_frame(data, pos, h):
+                info_frame = data[pos : pos + h.length]
+                pos += h.length
+                continue
+        if start < 0:
+            start = pos
+        pos += h.length
+        end = pos
+        frames += 1
+    if first is None or frames == 0:
+        raise ValueError(f"MP3 の音声フレームが見つかりません: {path}")
+    return Mp3Frames(path=Path(path), data=data, start=start, end=end, frames=frames, header=first, info_frame=info_frame)
+
+
+_SILENCE_LOCK = threading.Lock()
+_SILENCE: dict[tuple[int, int, tuple[str, ...]], bytes] = {}
+
+
+def silence_frame(header: FrameHeader, encode_args: Optional[list[str]] = None) -> bytes:
+    """header と同じ形式の無音フレームを 1 つ返す（初回だけ ffmpeg でエンコードする）。
+
+    ビットリザーバを使わずにエンコードするため、前後にどのフレームが来ても単独でデコードできる。
+    """
+
+    args = tuple(encode_args or _SILENCE_ARGS)
+    key = (header.sample_rate, header.channels, args)
+    with _SILENCE_LOCK:
+        cached = _SILENCE.get(key)
+    if cached is not None:
+        return cached
+
+    pcm = b"\x00\x00" * header.channels * header.sample_rate
+    with tempfile.TemporaryDirectory(prefix="svm_silence_") as tmp:
+        out = Path(tmp) / "silence.mp3"
+        run_ffmpeg(
+            ["-f", "s16le", "-ar", str(header.sample_rate), "-ac", str(header.channels), "-i", "pipe:0",
+             *args, "-reservoir", "0", str(out)],
+            stdin_bytes=pcm,
+            error_label="FFmpeg silence",
+        )
+        scanned = scan_mp3(out)
+    if scanned.header.format != header.format:
+        raise ValueError(f"無音フレームの形式が一致しません: {scanned.header.format} != {header.format}")
+    # 先頭・末尾のフレームはエンコーダの立ち上がりを含むため、中ほどのフレームを使う
+    pos = scanned.start
+    for _ in range(scanned.frames // 2):
+        pos += parse_header(scanned.data, pos).length  # type: ignore[union-attr]
+    h = parse_header(scanned.data, pos)
+    assert h is not None
+    frame = scanned.data[pos : pos + h.length]
+    with _SILENCE_LOCK:
+        _SILENCE[key] = frame
+    return frame
+
+
+def _info_frame(template: bytes, header: FrameHeader, *, frames: int, nbytes: int) -> bytes:
+    """連結後の全体に対する Xing フレーム（フレーム数・バイト数だけを持つ）を作る。"""
+
+    offset = 4 + side_info_size(header)
+    body = b"Xing" + struct.pack(">III", 0x3, frames, nbytes)
+    out = bytearray(template)
+    out[4:] = bytes(len(out) - 4)
+    out[offset : offset + len(body)] = body
+    return bytes(out)
+
+
+@dataclass
+class Chapter:
+    index: int
+    file: str
+    start_sample: int
+    samples: int
+
+
+def merge_narration(
+    items: list[tuple[int, Path]],
+    dst: Path,
+    *,
+    gap_seconds: Optional[float] = None,
+    manifest_path: Optional[Path] = None,
+    encode_args: Optional[list[str]] = None,
+) -> dict[str, object]:
+    """(index, mp3) を index 順に連結して dst に書き、チャプター情報を返す（manifest_path にも保存する）。"""
+
+    if not items:
+        raise ValueError("連結する MP3 がありません")
+    t0 = time.perf_counter()
+    gap = narration_gap_seconds() if gap_seconds is None else max(0.0, float(gap_seconds))
+    ordered = sorted(items, key=lambda it: it[0])
+
+    # 1) 各ファイルのフレーム範囲（形式が揃っていることを確認する）
+    scans = [scan_mp3(p) for _, p in ordered]
+    header = scans[0].header
+    for (index, path), scan in zip(ordered, scans):
+        if scan.header.format != header.format:
+            raise ValueError(
+                f"MP3 の形式が揃っていません（index={index}: {scan.header.sample_rate}Hz/{scan.header.channels}ch, "
+                f"先頭: {header.sample_rate}Hz/{header.channels}ch）: {path}"
+            )
+
+    silence = silence_frame(header, encode_args) if gap > 0 else b""
+    gap_frames = int(round(gap * header.sample_rate / header.samples)) if silence else 0
+
+    # 2) チャプター（開始サンプル）と全体のフレーム数・バイト数
+    chapters: list[Chapter] = []
+    cursor = 0
+    total_frames = 0
+    total_bytes = 0
+    for i, ((index, path), scan) in enumerate(zip(ordered, scans)):
+        if i > 0 and gap_frames:
+            cursor += gap_frames * header.samples
+            total_frames += gap_frames
+            total_bytes += gap_frames * len(silence)
+        chapters.append(Chapter(index=index, file=path.name, start_sample=cursor, samples=scan.samples))
+        cursor += scan.samples
+        total_frames += scan.frames
+        total_bytes += scan.end - scan.start
+
+    # 3) 書き出し（Xing フレーム → 各ファイルのフレーム列と無音）
+    template = next((s.info_frame for s in scans if s.info_frame), None)
+    info = b""
+    if template is not None:
+        info = _info_frame(template, header, frames=total_frames, nbytes=total_bytes + len(template))
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.with_name(dst.name + ".part")
+    try:
+        with tmp.open("wb") as out:
+            out.write(info)
+            gap_blob = silence * gap_frames
+            for i, scan in enumerate(scans):
+                if i > 0 and gap_blob:
+                    out.write(gap_blob)
+                out.write(memoryview(scan.data)[scan.start : scan.end])
+        os.replace(tmp, dst)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+    sr = header.sample_rate
+    result: dict[str, object] = {
+        "format": NARRATION_FORMAT,
+        "file": dst.name,
+        "sample_rate": sr,
+        "channels": header.channels,
+        "gap_seconds": round(gap_frames * header.samples / sr, 3),
+        "duration_seconds": round(cursor / sr, 3),
+        "bytes": len(info) + total_bytes,
+        "chapters": [
+            {
+                "index": c.index,
+                "file": c.file,
+                "start_seconds": round(c.start_sample / sr, 3),
+                "duration_seconds": round(c.samples / sr, 3),
+                "start_sample": c.start_sample,
+                "samples": c.samples,
+            }
+            for c in chapters
+        ],
+    }
+    if manifest_path is not None:
+        tmp_json = manifest_path.with_name(manifest_path.name + ".tmp")
+        tmp_json.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp_json, manifest_path)
+    logger.info(
+        f"[Narration] merged {len(chapters)} rows -> {dst.name} ({result['duration_seconds']}s, "
+        f"{result['bytes']} bytes) in {time.perf_counter() - t0:.3f}s"
+    )
+    return result
+
+
+def build_narration(
+    out_dir: Path,
+    *,
+    indices: Optional[list[int]] = None,
+    gap_seconds: Optional[float] = None,
+) -> dict[str, object]:
+    """out_dir の voice_XXX.mp3 を連結して narration.mp3 / narration.json を書く。
+
+    indices を渡した場合はその行だけを（MP3 が無い行は "missing" に入れて飛ばす）、
+    省略時は out_dir にある voice_XXX.mp3 をすべて使う。
+    """
+
+    items: list[tuple[int, Path]] = []
+    missing: list[int] = []
+    if indices is None:
+        for p in out_dir.glob("voice_*.mp3"):
+            stem = p.stem[len("voice_") :]
+            if stem.isdigit():
+                items.append((int(stem), p))
+    else:
+        for i in sorted(set(indices)):
+            p = out_dir / f"voice_{i:03d}.mp3"
+            if p.exists():
+                items.append((i, p))
+            else:
+                missing.append(i)
+    result = merge_narration(
+        items,
+        out_dir / "narration.mp3",
+        gap_seconds=gap_seconds,
+        manifest_path=out_dir / "narration.json",
+    )
+    result["missing"] = missing
+    return result
@@ -0,0 +1,328 @@
+"""CPU 推論のチューニングプロファイル（torch スレッド数・ワーカー数・バッチサイズ）。
+
+torch の既定スレッド数は全コアを使おうとするため、推論ワーカーを複数立てたり
+ffmpeg を並行して動かしたりすると過剰なスレッドで取り合いになる。`python src/main.py tune`
+で固定コーパスを各設定で合成して実時間比（RTF = 合成時間 / 音声長）を測り、最速の
+設定を src/voice/models/perf_profile.json に保存する。VoiceGenerator はロード時に
+これを適用する（環境変数 SVM_SYNTH_WORKERS 等の明示指定が優先）。
+
+inter-op スレッド数はプロセス内で最初の並列処理より前に 1 回しか設定できないため、
+計測は inter-op の値ごとに子プロセス（`python -m src.voice.perf_profile`）で行う。
+synth_workers>1 の設定は 1 つずつ別の子プロセスで計測し、本番と同じくモデルのロード直後
+（親で推論する前）にワーカーを fork させる（推論した後の fork は GNU OpenMP でデッドロックしうる）。
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+from src.logger import setup_logger
+
+logger = setup_logger("PerfProfile")
+
+PROFILE_KEYS = ("intra_op_threads", "inter_op_threads", "synth_workers", "batch_size")
+
+# 子プロセスの stdout からログと区別して結果行を拾うための接頭辞
+_RESULT_PREFIX = "SVM_TUNE_RESULT "
+
+# 計測用の固定コーパス（短文〜長文を混ぜる）
+TUNE_CORPUS = [
+    "こんにちは。",
+    "本日はお忙しいところお集まりいただき、ありがとうございます。",
+    "まず、今回のプロジェクトの背景について簡単にご説明します。",
+    "昨年度の売上は前年比で十二パーセント増加し、特に新規顧客の獲得が好調でした。",
+    "次のスライドをご覧ください。",
+    "こちらのグラフは、四半期ごとの推移を示しています。第三四半期に大きく伸びているのが分かります。",
+    "課題としては、サポート体制の強化と、問い合わせへの応答時間の短縮が挙げられます。",
+    "以上で説明を終わります。ご清聴ありがとうございました。",
+]
+
+
+def _repo_root() -> Path:
+    return Path(__file__).resolve().parents[2]
+
+
+def profile_path() -> Path:
+    override = os.environ.get("SVM_PERF_PROFILE", "").strip()
+    if override:
+        p = Path(override)
+        return p if p.is_absolute() else (_repo_root() / p).resolve()
+    return _repo_root() / "src" / "voice" / "models" / "perf_profile.json"
+
+
+def load_profile(path: Optional[Path] = None) -> dict[str, object]:
+    """保存済みプロファイルを読む（無い/壊れている場合は空）。"""
+
+    p = path or profile_path()
+    try:
+        data = json.loads(p.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def save_profile(profile: dict[str, object], path: Optional[Path] = None) -> Path:
+    p = path or profile_path()
+    p.parent.mkdir(parents=True, exist_ok=True)
+    tmp = p.with_suffix(p.suffix + ".tmp")
+    tmp.write_text(json.dumps(profile, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp, p)
+    return p
+
+
+def profile_int(key: str, profile: Optional[dict[str, object]] = None) -> Optional[int]:
+    """プロファイルの整数設定（1 未満や未設定は None）。"""
+
+    data = load_profile() if profile is None else profile
+    try:
+        value = int(data.get(key))  # type: ignore[arg-type]
+    except (TypeError, ValueError):
+        return None
+    return value if value >= 1 else None
+
+
+def apply_torch_threads(intra_op: Optional[int], inter_op: Optional[int]) -> None:
+    """torch のスレッド数を設定する。inter-op は既に並列処理が走っていると設定できない。"""
+
+    import torch
+
+    if intra_op:
+        torch.set_num_threads(intra_op)
+    if inter_op:
+        try:
+            torch.set_num_interop_threads(inter_op)
+        except RuntimeError as e:
+            logger.warning(f"[PerfProfile] inter-op threads not applied: {e}")
+
+
+# --- tune ---
+
+
+def _grid_values(spec: Optional[str], default: list[int]) -> list[int]:
+    if not spec:
+        return default
+    return sorted({max(1, int(v)) for v in spec.split(",") if v.strip()})
+
+
+def _powers_of_two(limit: int) -> list[int]:
+    out, v = [], 1
+    while v <= limit:
+        out.append(v)
+        v *= 2
+    if out[-1] != limit:
+        out.append(limit)
+    return out
+
+
+def build_grid(
+    *,
+    cores: int,
+    intra: Optional[str] = None,
+    inter: Optional[str] = None,
+    workers: Optional[str] = None,
+    batch: Optional[str] = None,
+) -> list[dict[str, int]]:
+    """計測する設定の組み合わせ。コア数を超える（過剰割り当て）組み合わせは除く。"""
+
+    intra_v = _grid_values(intra, _powers_of_two(cores))
+    inter_v = _grid_values(inter, [1, 2])
+    workers_v = _grid_values(workers, [w for w in (1, 2, 4) if w <= cores] or [1])
+    batch_v = _grid_values(batch, [1, 4])
+
+    grid: list[dict[str, int]] = []
+    for i, j, w, b in itertools.product(intra_v, inter_v, workers_v, batch_v):
+        if i * w > cores:
+            continue
+        if w > 1 and b > 1:
+            # バッチ推論は単一プロセスで行うため、ワーカー併用の組み合わせは同じ計測になる
+            continue
+        grid.append({"intra_op_threads": i, "inter_op_threads": j, "synth_workers": w, "batch_size": b})
+    return grid
+
+
+def _load_corpus(script: Optional[Path]) -> list[str]:
+    if script is None:
+        return list(TUNE_CORPUS)
+    from src.voice.voice_generator import load_script_csv
+
+    return [r.script for r in load_script_csv(script) if r.script.strip()]
+
+
+def _voice_args() -> dict[str, object]:
+    """計測に使う話者（保存済み voice を優先し、無ければ既定の話者サンプル）。"""
+
+    from src.voice.voice_generator import pick_default_speaker_wav
+
+    root = _repo_root()
+    try:
+        saved = json.loads((root / "src" / "voice" / "models" / "tts_model.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        saved = {}
+    if saved.get("voice_id") and saved.get("voice_dir"):
+        voice_dir = Path(str(saved["voice_dir"]))
+        voice_dir = voice_dir if voice_dir.is_absolute() else (root / voice_dir).resolve()
+        if (voice_dir / f"{saved['voice_id']}.pth").exists():
+            return {"voice_id": str(saved["voice_id"]), "voice_dir": voice_dir}
+    speaker = pick_default_speaker_wav()
+    if speaker is None:
+        raise RuntimeError("話者サンプルが見つかりません（src/voice/models/samples に sample_01.wav 等を配置してください）")
+    return {"speaker_wav": speaker}
+
+
+def measurement_groups(grid: list[dict[str, int]]) -> list[list[dict[str, int]]]:
+    """子プロセス 1 つで計測する設定のまとまりに分ける。
+
+    inter-op 値ごとに分け、synth_workers>1 の設定はワーカーを fork するため 1 つずつ別にする。
+    """
+
+    groups: list[list[dict[str, int]]] = []
+    by_inter = sorted(grid, key=lambda c: c["inter_op_threads"])
+    for _, group in itertools.groupby(by_inter, key=lambda c: c["inter_op_threads"]):
+        configs = list(group)
+        single = [c for c in configs if c["synth_workers"] <= 1]
+        if single:
+            groups.append(single)
+        groups.extend([c] for c in configs if c["synth_workers"] > 1)
+    return groups
+
+
+def _run_configs(configs: list[dict[str, int]], corpus: list[str]) -> None:
+    """子プロセス側: 設定を順に計測し、結果を 1 行ずつ出力する。
+
+    synth_workers>1 の設定は単独で渡される。ワーカーは VoiceGenerator の初期化（モデルのロード直後）で
+    fork され、ウォームアップを含む推論はすべてその後に行う。
+    """
+
+    os.environ["SVM_SYNTH_CACHE_MAX_MB"] = "0"
+    # 計測中は保存済みプロファイルを適用しない（各設定を明示的に切り替える）
+    os.environ["SVM_PERF_PROFILE"] = os.devnull
+    if not configs:
+        return
+    if len(configs) > 1 and any(c["synth_workers"] > 1 for c in configs):
+        raise ValueError("synth_workers>1 の設定は 1 つずつ別のプロセスで計測してください")
+    apply_torch_threads(configs[0]["intra_op_threads"], configs[0]["inter_op_threads"])
+    os.environ["SVM_SYNTH_WORKERS"] = str(configs[0]["synth_workers"])
+    os.environ["SVM_SYNTH_THREADS"] = str(configs[0]["intra_op_threads"])
+
+    from src.voice.events import subscribe_events
+    from src.voice.voice_generator import ScriptRow, VoiceGenerator
+
+    vg = VoiceGenerator()
+    voice = _voice_args()
+    rows = [ScriptRow(index=i, script=s) for i, s in enumerate(corpus)]
+
+    audio_seconds = 0.0
+
+    def on_event(ev: dict[str, object]) -> None:
+        nonlocal audio_seconds
+        if ev.get("type") == "row" and ev.get("stage") == "wav_done":
+            audio_seconds += float(ev.get("audio_seconds") or 0.0)  # type: ignore[arg-type]
+
+    unsubscribe = subscribe_events(on_event)
+    try:
+        # 初回はモデル/voice のウォームアップとして計測から外す
+        with tempfile.TemporaryDirectory() as tmp:
+            vg.generate_rows(rows[:1], output_dir=Path(tmp), **voice)  # type: ignore[arg-type]
+
+        for cfg in configs:
+            apply_torch_threads(cfg["intra_op_threads"], None)
+            audio_seconds = 0.0
+            with tempfile.TemporaryDirectory() as tmp:
+                t0 = time.perf_counter()
+                vg.generate_rows(
+                    rows, output_dir=Path(tmp), batch_size=cfg["batch_size"], **voice  # type: ignore[arg-type]
+                )
+                wall = time.perf_counter() - t0
+            rtf = wall / audio_seconds if audio_seconds > 0 else None
+            result = {**cfg, "wall_seconds": round(wall, 3), "audio_seconds": round(audio_seconds, 3), "rtf": rtf}
+            print(_RESULT_PREFIX + json.dumps(result), flush=True)
+    finally:
+        unsubscribe()
+        vg.close_synth_pool()
+
+
+def tune(
+    *,
+    script: Optional[Path] = None,
+    intra: Optional[str] = None,
+    inter: Optional[str] = None,
+    workers: Optional[str] = None,
+    batch: Optional[str] = None,
+    save: bool = True,
+) -> list[dict[str, object]]:
+    """グリッドを計測し、RTF の一覧を表示して最速の設定を保存する。"""
+
+    from src.voice.worker_pool import available_cores
+
+    cores = len(available_cores())
+    grid = build_grid(cores=cores, intra=intra, inter=inter, workers=workers, batch=batch)
+    corpus = _load_corpus(script)
+    print(f"tune: cores={cores} configs={len(grid)} corpus_rows={len(corpus)}")
+
+    results: list[dict[str, object]] = []
+    for configs in measurement_groups(grid):
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False, encoding="utf-8") as f:
+            json.dump({"configs": configs, "corpus": corpus}, f, ensure_ascii=False)
+            spec = f.name
+        try:
+            proc = subprocess.run(
+                [sys.executable, "-m", "src.voice.perf_profile", "--run", spec],
+                cwd=str(_repo_root()),
+                stdout=subprocess.PIPE,
+                text=True,
+                encoding="utf-8",
+            )
+        finally:
+            Path(spec).unlink(missing_ok=True)
+        for line in proc.stdout.splitlines():
+            if not line.startswith(_RESULT_PREFIX):
+                continue
+            r = json.loads(line[len(_RESULT_PREFIX) :])
+            results.append(r)
+            rtf = f"{r['rtf']:.3f}" if r.get("rtf") is not None else "n/a"
+            print(
+                f"  intra={r['intra_op_threads']:>2} inter={r['inter_op_threads']} workers={r['synth_workers']} "
+                f"batch={r['batch_size']}: wall={r['wall_seconds']:.2f}s audio={r['audio_seconds']:.2f}s RTF={rtf}"
+            )
+        if proc.returncode != 0:
+            label = " ".join(f"{k}={configs[0][k]}" for k in ("inter_op_threads", "synth_workers"))
+            print(f"  {label}: measurement process failed (code={proc.returncode})")
+
+    measured = [r for r in results if r.get("rtf") is not None]
+    if not measured:
+        print("tune: no successful measurement")
+        return results
+    best = min(measured, key=lambda r: float(r["rtf"]))  # type: ignore[arg-type]
+    print(
+        "tune: best "
+        + " ".join(f"{k}={best[k]}" for k in PROFILE_KEYS)
+        + f" RTF={float(best['rtf']):.3f}"  # type: ignore[arg-type]
+    )
+    if save:
+        profile = {k: best[k] for k in PROFILE_KEYS}
+        profile.update({"rtf": best["rtf"], "cores": cores, "measured_at": time.strftime("%Y-%m-%dT%H:%M:%S")})
+        profile["results"] = results
+        print(f"tune: saved {save_profile(profile)}")
+    return results
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="CPU inference tuning (internal measurement runner).")
+    parser.add_argument("--run", required=True, help="JSON spec written by tune()")
+    args = parser.parse_args(argv)
+    spec = json.loads(Path(args.run).read_text(encoding="utf-8"))
+    _run_configs(spec["configs"], spec["corpus"])
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,131 @@
+"""XTTS の GPT 段を動的 INT8 量子化する CPU 向けモード（opt-in）。
+
+GPU の無いサーバーでは行ごとのレイテンシの大半を GPT（自己回帰のトークン生成）が
+占める。ロード後に GPT の線形層を `torch.ao.quantization.quantize_dynamic` で INT8 化し、
+重みのメモリと行列積のコストを下げる。HiFi-GAN デコーダ（畳み込み）は fp32 のまま。
+
+XTTS の GPT は HuggingFace GPT-2 の Conv1D（転置した重みを持つ線形層）を使っており、
+そのままでは動的量子化の対象にならないため、先に等価な nn.Linear へ置き換える。
+
+有効化: 環境変数 SVM_QUANTIZE=int8、または tts_model.json の "quantize": "int8"
+（環境変数が優先。SVM_QUANTIZE=off で無効化）。
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import os
+import warnings
+from pathlib import Path
+from typing import Any, Optional
+
+from src.logger import setup_logger
+
+logger = setup_logger("Quantize")
+
+QUANTIZE_MODES = ("int8",)
+_OFF = ("", "0", "off", "none", "fp32", "false")
+
+
+def _tts_model_json() -> Path:
+    return Path(__file__).resolve().parent / "models" / "tts_model.json"
+
+
+def resolve_quantize_mode(config_path: Optional[Path] = None) -> Optional[str]:
+    """有効な量子化モード（無効なら None）。SVM_QUANTIZE → tts_model.json の順に見る。"""
+
+    raw = os.environ.get("SVM_QUANTIZE")
+    if raw is None:
+        try:
+            data = json.loads((config_path or _tts_model_json()).read_text(encoding="utf-8"))
+            raw = str(data.get("quantize") or "") if isinstance(data, dict) else ""
+        except (OSError, ValueError):
+            raw = ""
+    mode = raw.strip().lower()
+    if mode in _OFF:
+        return None
+    if mode not in QUANTIZE_MODES:
+        logger.warning(f"[Quantize] unknown quantize mode {raw!r}; using fp32 (supported: {', '.join(QUANTIZE_MODES)})")
+        return None
+    return mode
+
+
+def module_bytes(module: Any) -> int:
+    """state_dict をシリアライズしたサイズ（量子化済みのパック済み重みも含めて測れる）。"""
+
+    import torch
+
+    buf = io.BytesIO()
+    torch.save(module.state_dict(), buf)
+    return buf.tell()
+
+
+def _conv1d_to_linear(module: Any) -> int:
+    """HF の Conv1D を等価な nn.Linear に置き換える（置き換えた数を返す）。"""
+
+    import torch.nn as nn
+
+    try:
+        from transformers.pytorch_utils import Conv1D
+    except Exception:  # transformers が無い/古い場合は Linear だけが対象になる
+        return 0
+
+    replaced = 0
+    for name, child in list(module.named_children()):
+        if isinstance(child, Conv1D):
+            in_features, out_features = child.weight.shape
+            linear = nn.Linear(in_features, out_features, bias=child.bias is not None)
+            linear.weight.data = child.weight.data.t().contiguous()
+            if child.bias is not None:
+                linear.bias.data = child.bias.data
+            setattr(module, name, linear)
+            replaced += 1
+        else:
+            replaced += _conv1d_to_linear(child)
+    return replaced
+
+
+def quantize_dynamic_int8(module: Any) -> dict[str, object]:
+    """module 内の線形層を動的 INT8 量子化する（その場で書き換え、統計を返す）。"""
+
+    import torch
+    import torch.nn as nn
+
+    before = module_bytes(module)
+    converted = _conv1d_to_linear(module)
+    linears = sum(1 for m in module.modules() if isinstance(m, nn.Linear))
+    with warnings.catch_warnings():
+        # torch 2.9 以降は torchao への移行を促す DeprecationWarning が出る（動作は同じ）
+        warnings.simplefilter("ignore", DeprecationWarning)
+        torch.ao.quantization.quantize_dynamic(module, {nn.Linear}, dtype=torch.qint8, inplace=True)
+    after = module_bytes(module)
+    return {
+        "mode": "int8",
+        "linear_layers": linears,
+        "conv1d_converted": converted,
+        "bytes_before": before,
+        "bytes_after": after,
+    }
+
+
+def quantize_xtts(tts_model: Any, mode: str) -> dict[str, object]:
+    """XTTS モデルの GPT 段を量子化する。CPU 以外や GPT を持たないモデルでは何もしない。"""
+
+    if mode != "int8":
+        raise ValueError(f"unsupported quantize mode: {mode}")
+    gpt = getattr(tts_model, "gpt", None)
+    if gpt is None:
+        raise RuntimeError("XTTS モデルに gpt がないため量子化できません")
+    try:
+        device = next(tts_model.parameters()).device
+    except Exception:
+        device = None
+    if device is not None and device.type != "cpu":
+        raise RuntimeError(f"INT8 動的量子化は CPU 専用です（device={device}）")
+    stats = quantize_dynamic_int8(gpt)
+    logger.info(
+        f"[Quantize] GPT quantized to int8: linear={stats['linear_layers']} conv1d->linear={stats['conv1d_converted']} "
+        f"{int(stats['bytes_before']) / 2**20:.1f}MB -> {int(stats['bytes_after']) / 2**20:.1f}MB"  # type: ignore[arg-type]
+    )
+    return stats
@@ -0,0 +1,145 @@
+"""話者サンプルごとの conditioning latent キャッシュと、複数サンプルからの voice 構築。
+
+`clone_voice()` は渡された WAV 全体から latent を計算し直すため、サンプルを 1 つ足すたびに
+全サンプルぶんの計算が走る。ここではサンプル 1 ファイルごとに (gpt latent, speaker embedding) を
+計算して `<voice_dir>/sample_latents/<key>.safetensors` に保存し、voice はそれらを集約して作る。
+キーはサンプルの内容ハッシュ（+ モデル設定）なので、録音を 1 つ追加した場合に計算されるのは
+その 1 ファイルだけになる（ファイル名の変更や並べ替えでは再計算しない）。
+
+集約は XTTS の `get_conditioning_latents` に合わせる:
+- speaker embedding: サンプルごとの埋め込みの平均（XTTS も複数ファイルの平均を取る）
+- gpt latent: サンプルの長さで重み付けした平均（XTTS は参照音声をチャンクに分けて平均するため、
+  長いサンプルほど多く寄与する形に近づける）
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+import wave
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from src.logger import setup_logger
+from src.voice.synth_cache import file_digest
+from src.voice.voice_tensors import read_tensor_file, write_tensor_file
+
+logger = setup_logger("SampleLatents")
+
+SAMPLE_FORMAT = "svm-sample/1"
+
+
+@dataclass
+class SampleLatents:
+    sample: Path
+    key: str
+    gpt: Any
+    spk: Any
+    seconds: float
+    cached: bool
+
+
+def wav_seconds(path: Path) -> float:
+    """WAV の長さ（秒）。読めない形式なら 1.0（等重み）として扱う。"""
+
+    try:
+        with wave.open(str(path), "rb") as wf:
+            rate = wf.getframerate()
+            return wf.getnframes() / rate if rate else 1.0
+    except (wave.Error, EOFError, OSError):
+        return 1.0
+
+
+def aggregate_latents(entries: list[SampleLatents]) -> tuple[Any, Any]:
+    """サンプルごとの latent を 1 つの voice にまとめる（gpt は長さ重み付き平均、speaker は平均）。"""
+
+    import torch
+
+    if not entries:
+        raise ValueError("集約するサンプルがありません")
+    if len(entries) == 1:
+        return entries[0].gpt, entries[0].spk
+    weights = torch.tensor([max(e.seconds, 1e-3) for e in entries], dtype=torch.float32)
+    weights = weights / weights.sum()
+    gpt = sum(w * e.gpt.float() for w, e in zip(weights.tolist(), entries))
+    spk = torch.stack([e.spk.float() for e in entries]).mean(dim=0)
+    return gpt.to(entries[0].gpt.dtype), spk.to(entries[0].spk.dtype)
+
+
+class SampleLatentCache:
+    """サンプル WAV の内容ハッシュ → latent のファイルキャッシュ。
+
+    `model_key` にはモデル名や量子化モードなど latent の値に影響する設定を入れる。
+    """
+
+    def __init__(self, cache_dir: Path, *, model_key: str):
+        self.cache_dir = Path(cache_dir)
+        self.model_key = model_key
+        self._lock = threading.Lock()
+        self.computed = 0
+        self.reused = 0
+
+    def key(self, sample: Path) -> str:
+        raw = f"{file_digest(sample)}\n{self.model_key}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.safetensors"
+
+    def _load(self, key: str, sample: Path) -> Optional[SampleLatents]:
+        path = self._path(key)
+        if not path.exists():
+            return None
+        try:
+            tensors, metadata = read_tensor_file(path)
+        except Exception as e:
+            logger.warning(f"[SampleLatents] cache entry ignored ({path}): {e}")
+            return None
+        if metadata.get("format") != SAMPLE_FORMAT or "gpt" not in tensors or "spk" not in tensors:
+            return None
+        return SampleLatents(
+            sample=sample,
+            key=key,
+            gpt=tensors["gpt"],
+            spk=tensors["spk"],
+            seconds=float(metadata.get("seconds") or 1.0),
+            cached=True,
+        )
+
+    def get(self, sample: Path, compute: Callable[[Path], tuple[Any, Any]]) -> SampleLatents:
+        """キャッシュにあれば返し、無ければ `compute(sample)` で計算して保存する。"""
+
+        key = self.key(sample)
+        entry = self._load(key, sample)
+        if entry is not None:
+            with self._lock:
+                self.reused += 1
+            return entry
+
+        gpt, spk = compute(sample)
+        gpt = gpt.detach().to("cpu").contiguous()
+        spk = spk.detach().to("cpu").contiguous()
+        seconds = wav_seconds(sample)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        write_tensor_file(
+            self._path(key),
+            {"gpt": gpt, "spk": spk},
+            {"format": SAMPLE_FORMAT, "sample": sample.name, "seconds": f"{seconds:.3f}"},
+        )
+        with self._lock:
+            self.computed += 1
+        return SampleLatents(sample=sample, key=key, gpt=gpt, spk=spk, seconds=seconds, cached=False)
+
+    def build(self, samples: list[Path], compute: Callable[[Path], tuple[Any, Any]]) -> tuple[Any, Any, list[SampleLatents]]:
+        """全サンプルの latent を（キャッシュを使って）揃え、集約した (gpt, spk) と各エントリを返す。"""
+
+        entries = [self.get(Path(s), compute) for s in samples]
+        gpt, spk = aggregate_latents(entries)
+        computed = sum(1 for e in entries if not e.cached)
+        logger.info(f"[SampleLatents] built from {len(entries)} samples (computed={computed}, reused={len(entries) - computed})")
+        return gpt, spk, entries
+
+    def stats(self) -> dict[str, object]:
+        with self._lock:
+            return {"dir": str(self.cache_dir), "computed": self.computed, "reused": self.reused}
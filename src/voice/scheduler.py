@@ -0,0 +1,222 @@
+"""生成リクエストの優先度付きスケジューラ（モデル・ffmpeg の同時実行数を制限する）。
+
+`/api/generate_audio` や一括生成は、それぞれ `asyncio.to_thread` で既定のスレッドプールに載り、
+1 つの XTTS モデルを同時に叩いていた。torch のスレッドが過剰に立ち、1 行プレビューが
+一括生成の後ろで待たされる。ここでは
+
+- 優先度クラス: interactive（1 行プレビュー・ストリーミング・モデル構築）と bulk（一括生成）
+- 資源ごとのゲート: モデル推論（SVM_MODEL_CONCURRENCY、既定 1）と ffmpeg エンコード
+  （SVM_FFMPEG_CONCURRENCY、既定は SVM_ENCODE_WORKERS + 1）。空きを待つ間は interactive を先に通す
+- 専用のスレッドプール: クラスごとに分け（SVM_INTERACTIVE_THREADS / SVM_BULK_THREADS）、
+  一括生成のリクエストが溜まってもプレビューのスレッドが枯れないようにする
+- 待ち時間の統計: ゲート・スレッドプールそれぞれのクラス別待ち時間
+
+ゲートは行（バッチ推論ではバッチ、ストリーミングでは波形チャンク）単位で取るため、
+一括生成の途中でもプレビューは実行中の 1 行が終わった時点で割り込める。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional, TypeVar
+
+from src.logger import setup_logger
+
+logger = setup_logger("Scheduler")
+
+T = TypeVar("T")
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+PRIORITIES = (INTERACTIVE, BULK)
+
+
+def _check_priority(priority: str) -> str:
+    if priority not in PRIORITIES:
+        raise ValueError(f"unknown priority: {priority}")
+    return priority
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.environ.get(name, str(default))))
+    except ValueError:
+        return default
+
+
+class _WaitStats:
+    """クラスごとの待ち時間の集計。"""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def to_dict(self) -> dict[str, object]:
+        return {
+            "acquired": self.count,
+            "wait_seconds": round(self.total, 3),
+            "avg_wait_seconds": round(self.total / self.count, 4) if self.count else None,
+            "max_wait_seconds": round(self.max, 3),
+        }
+
+
+class PriorityGate:
+    """同時実行数の上限つきゲート。空きを待つ間は interactive → bulk、同じクラス内は到着順。
+
+    同じスレッドが保持中に再度 slot() に入った場合は新たに枠を取らない（入れ子で詰まらないように）。
+    """
+
+    def __init__(self, name: str, *, capacity: int):
+        self.name = name
+        self.capacity = max(1, int(capacity))
+        self._cond = threading.Condition()
+        self._waiting: dict[str, deque[object]] = {p: deque() for p in PRIORITIES}
+        self._running = 0
+        self._held = threading.local()
+        self._stats = {p: _WaitStats() for p in PRIORITIES}
+
+    def _head(self) -> Optional[object]:
+        for p in PRIORITIES:
+            if self._waiting[p]:
+                return self._waiting[p][0]
+        return None
+
+    @contextmanager
+    def slot(self, priority: str = BULK) -> Iterator[None]:
+        queue = self._waiting[_check_priority(priority)]
+        if getattr(self._held, "depth", 0):
+            self._held.depth += 1
+            try:
+                yield
+            finally:
+                self._held.depth -= 1
+            return
+
+        ticket = object()
+        t0 = time.perf_counter()
+        with self._cond:
+            queue.append(ticket)
+            while self._running >= self.capacity or self._head() is not ticket:
+                self._cond.wait()
+            queue.popleft()
+            self._running += 1
+            waited = time.perf_counter() - t0
+            self._stats[priority].add(waited)
+            # 枠が複数空いていれば次の待ち手も進めるようにする
+            self._cond.notify_all()
+        if waited > 1.0:
+            logger.info(f"[Scheduler] {self.name}: {priority} waited {waited:.3f}s for a slot")
+        self._held.depth = 1
+        try:
+            yield
+        finally:
+            self._held.depth = 0
+            with self._cond:
+                self._running -= 1
+                self._cond.notify_all()
+
+    def stats(self) -> dict[str, object]:
+        with self._cond:
+            return {
+                "capacity": self.capacity,
+                "running": self._running,
+                **{
+                    p: {"waiting": len(self._waiting[p]), **self._stats[p].to_dict()}
+                    for p in PRIORITIES
+                },
+            }
+
+
+class GenerationScheduler:
+    """モデル・ffmpeg のゲートと、優先度クラスごとの専用スレッドプールを持つ。"""
+
+    def __init__(
+        self,
+        *,
+        model_concurrency: int = 1,
+        ffmpeg_concurrency: int = 3,
+        interactive_threads: int = 2,
+        bulk_threads: int = 2,
+    ):
+        self.model = PriorityGate("model", capacity=model_concurrency)
+        self.ffmpeg = PriorityGate("ffmpeg", capacity=ffmpeg_concurrency)
+        self._threads = {INTERACTIVE: max(1, interactive_threads), BULK: max(1, bulk_threads)}
+        self._executors: dict[str, ThreadPoolExecutor] = {}
+        self._lock = threading.Lock()
+        self._queued = {p: 0 for p in PRIORITIES}
+        self._stats = {p: _WaitStats() for p in PRIORITIES}
+
+    def _executor(self, priority: str) -> ThreadPoolExecutor:
+        with self._lock:
+            ex = self._executors.get(priority)
+            if ex is None:
+                ex = ThreadPoolExecutor(max_workers=self._threads[priority], thread_name_prefix=f"svm-{priority}")
+                self._executors[priority] = ex
+            return ex
+
+    def submit(self, priority: str, fn: Callable[..., T], *args: Any, **kwargs: Any) -> "Future[T]":
+        """fn をクラス専用のスレッドプールで実行する（スレッドの空き待ち時間を記録する）。"""
+
+        _check_priority(priority)
+        t0 = time.perf_counter()
+        with self._lock:
+            self._queued[priority] += 1
+
+        def run() -> T:
+            with self._lock:
+                self._queued[priority] -= 1
+                self._stats[priority].add(time.perf_counter() - t0)
+            return fn(*args, **kwargs)
+
+        return self._executor(priority).submit(run)
+
+    async def run(self, priority: str, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """`asyncio.to_thread` の代わりに使う（既定のスレッドプールを使わない）。"""
+
+        return await asyncio.wrap_future(self.submit(priority, functools.partial(fn, *args, **kwargs)))
+
+    def stats(self) -> dict[str, object]:
+        with self._lock:
+            executors = {
+                p: {"threads": self._threads[p], "queued": self._queued[p], **self._stats[p].to_dict()}
+                for p in PRIORITIES
+            }
+        return {"model": self.model.stats(), "ffmpeg": self.ffmpeg.stats(), "executors": executors}
+
+    def close(self) -> None:
+        with self._lock:
+            executors, self._executors = list(self._executors.values()), {}
+        for ex in executors:
+            ex.shutdown(wait=False)
+
+
+_SCHEDULER_LOCK = threading.Lock()
+_SCHEDULER: Optional[GenerationScheduler] = None
+
+
+def get_scheduler() -> GenerationScheduler:
+    """プロセス共通のスケジューラ（初回呼び出し時の環境変数で設定する）。"""
+
+    global _SCHEDULER
+    with _SCHEDULER_LOCK:
+        if _SCHEDULER is None:
+            _SCHEDULER = GenerationScheduler(
+                model_concurrency=_env_int("SVM_MODEL_CONCURRENCY", 1),
+                ffmpeg_concurrency=_env_int("SVM_FFMPEG_CONCURRENCY", _env_int("SVM_ENCODE_WORKERS", 2) + 1),
+                interactive_threads=_env_int("SVM_INTERACTIVE_THREADS", 2),
+                bulk_threads=_env_int("SVM_BULK_THREADS", 2),
+            )
+        return _SCHEDULER
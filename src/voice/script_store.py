@@ -0,0 +1,237 @@
+"""原稿CSVの読み込みと、解析済み行のメモ化ストア。
+
+同じ CSV が upload_csv・generate_from_csv・ジョブ登録・`src/main.py --index` のたびに
+読み直され、毎回バイト列の読み込みと文字コード判定・解析をやり直していた。
+`ScriptStore` は解析済みの `ScriptRow` を
+
+- (パス, サイズ, 更新時刻) … 同じファイルの 2 回目以降は stat だけで返す
+- 内容の sha256 … 別名で保存された同じ内容（原稿_<日時>.csv と 原稿.csv 等）も解析し直さない
+
+の両方で引けるようにして、件数上限つきの LRU で保持する。index → 行の辞書も持つため、
+`row(index)` は O(1)。サーバーと CLI はどちらも `get_script_store()`（`load_script_csv`）を通して読む。
+"""
+
+from __future__ import annotations
+
+import csv
+import hashlib
+import io
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from src.logger import setup_logger
+
+logger = setup_logger("ScriptStore")
+
+# エンコーディング判定に使う先頭部分の大きさ（これ以降はスコアに影響しない）
+_CSV_SNIFF_BYTES = 64 * 1024
+# ひらがな・カタカナ・CJK統合漢字
+_JAPANESE_RE = re.compile("[\u3040-\u30ff\u4e00-\u9fff]")
+
+
+def _decode_csv_bytes(data: bytes) -> str:
+    """CSVの文字化け対策デコード。
+
+    優先順位:
+      1) BOM があればそのエンコーディング
+      2) UTF-8 を strict で試し、成功したらそれを採用（全体を 1 回デコードするだけ）
+      3) CP932 / EUC-JP を先頭部分（_CSV_SNIFF_BYTES）だけでスコアリングし、勝った方で全体を復号
+
+    NOTE:
+      CP932 は多くのバイト列を「それっぽく」復号できてしまうため、
+      UTF-8のデータでも置換文字(U+FFFD)が出ずに文字化けするケースがある。
+      そのため「置換文字率比較」ではなく strict デコードの成否で判定する。
+    """
+    # BOMがある場合のみUTF-16/32を採用する。
+    # UTF-16LE/BE は「どんな偶数長バイト列でも復号できてしまう」ため、
+    # BOM無しで試すと誤判定の原因になる。
+    if data.startswith(b"\xef\xbb\xbf"):
+        return data.decode("utf-8-sig", errors="strict")
+    if data.startswith((b"\xff\xfe\x00\x00", b"\x00\x00\xfe\xff")):
+        return data.decode("utf-32", errors="strict")
+    if data.startswith((b"\xff\xfe", b"\xfe\xff")):
+        return data.decode("utf-16", errors="strict")
+
+    try:
+        return data.decode("utf-8", errors="strict")
+    except UnicodeDecodeError:
+        pass
+
+    # それ以外はヒューリスティックで最も「それっぽい」ものを採用する。
+    # 判定は先頭部分だけで行う（行の途中で切らないよう最後の改行までにする。
+    # CP932 / EUC-JP の 2 バイト目に 0x0A は現れないため文字の途中でも切れない）。
+    sample = data[:_CSV_SNIFF_BYTES]
+    if len(data) > len(sample):
+        cut = sample.rfind(b"\n")
+        if cut > 0:
+            sample = sample[: cut + 1]
+
+    def score(enc: str) -> float:
+        s = sample.decode(enc, errors="replace")
+        repl = s.count("\ufffd")
+        nul = s.count("\x00")
+        jp = len(_JAPANESE_RE.findall(s))
+        lower = s.lower()
+        header_bonus = 200.0 if ("index" in lower and "script" in lower) else 0.0
+        # replacement / NUL を強く罰し、日本語文字を強く報酬
+        return header_bonus + (jp * 3.0) - (repl * 100.0) - (nul * 50.0)
+
+    best_val = float("-inf")
+    best_enc = "utf-8"
+    for enc in ("cp932", "euc-jp"):
+        val = score(enc)
+        if val > best_val:
+            best_val = val
+            best_enc = enc
+    return data.decode(best_enc, errors="replace")
+
+
+@dataclass(frozen=True)
+class ScriptRow:
+    index: int
+    script: str
+
+
+def parse_script_csv(raw: bytes) -> list[ScriptRow]:
+    """CSV のバイト列を復号して index 順の行にする。"""
+
+    text = _decode_csv_bytes(raw)
+
+    # DictReader は行ごとに dict を作るため、ヘッダから列位置を決めて 1 パスで読む
+    reader = csv.reader(io.StringIO(text, newline=""))
+    header = next(reader, None)
+    if not header:
+        raise ValueError("CSVヘッダが読み取れません")
+
+    columns = {name.strip().lower(): i for i, name in enumerate(header) if name}
+    if "index" not in columns or "script" not in columns:
+        raise ValueError("CSVヘッダが不正です（index,script が必要）")
+    idx_col = columns["index"]
+    script_col = columns["script"]
+
+    rows: list[ScriptRow] = []
+    ordered = True
+    last = None
+    for r in reader:
+        if len(r) <= idx_col:
+            continue
+        raw_idx = r[idx_col].strip()
+        if not raw_idx:
+            continue
+        try:
+            idx = int(raw_idx)
+        except ValueError:
+            continue
+        raw_script = r[script_col].strip() if len(r) > script_col else ""
+        rows.append(ScriptRow(index=idx, script=raw_script))
+        if last is not None and idx < last:
+            ordered = False
+        last = idx
+
+    if not ordered:
+        rows.sort(key=lambda x: x.index)
+    return rows
+
+
+@dataclass
+class ParsedScript:
+    """解析済みの原稿（行は index 順、同じ index が複数ある場合 `row()` は先頭の行）。"""
+
+    digest: str
+    rows: tuple[ScriptRow, ...]
+    by_index: dict[int, ScriptRow] = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        if not self.by_index:
+            for r in self.rows:
+                self.by_index.setdefault(r.index, r)
+
+    def row(self, index: int) -> Optional[ScriptRow]:
+        return self.by_index.get(index)
+
+
+class ScriptStore:
+    """解析済み原稿の LRU（スレッドセーフ）。"""
+
+    def __init__(self, *, max_entries: int = 8):
+        self.max_entries = max(1, int(max_entries))
+        self._lock = threading.Lock()
+        self._by_digest: OrderedDict[str, ParsedScript] = OrderedDict()
+        self._by_stamp: dict[tuple[str, int, int], str] = {}
+        self.hits = 0
+        self.content_hits = 0
+        self.parses = 0
+        self.evictions = 0
+
+    def load(self, path: Path) -> ParsedScript:
+        p = Path(path).resolve()
+        st = p.stat()
+        stamp = (str(p), st.st_size, st.st_mtime_ns)
+        with self._lock:
+            digest = self._by_stamp.get(stamp)
+            entry = self._by_digest.get(digest) if digest else None
+            if entry is not None:
+                self._by_digest.move_to_end(digest)  # type: ignore[arg-type]
+                self.hits += 1
+                return entry
+
+        raw = p.read_bytes()
+        digest = hashlib.sha256(raw).hexdigest()
+        with self._lock:
+            entry = self._by_digest.get(digest)
+            if entry is not None:
+                self._by_digest.move_to_end(digest)
+                self._remember(stamp, digest)
+                self.content_hits += 1
+                return entry
+
+        # 解析はロックの外で行う（同じ内容を同時に読んだ場合は後勝ちで登録）
+        entry = ParsedScript(digest=digest, rows=tuple(parse_script_csv(raw)))
+        with self._lock:
+            self.parses += 1
+            self._by_digest[digest] = entry
+            self._remember(stamp, digest)
+            while len(self._by_digest) > self.max_entries:
+                old, _ = self._by_digest.popitem(last=False)
+                self._by_stamp = {k: v for k, v in self._by_stamp.items() if v != old}
+                self.evictions += 1
+        logger.info(f"[ScriptStore] parsed {p.name}: {len(entry.rows)} rows")
+        return entry
+
+    def _remember(self, stamp: tuple[str, int, int], digest: str) -> None:
+        # 同じパスの古い (サイズ, 更新時刻) は不要になるので外す
+        self._by_stamp = {k: v for k, v in self._by_stamp.items() if k[0] != stamp[0]}
+        self._by_stamp[stamp] = digest
+
+    def stats(self) -> dict[str, object]:
+        with self._lock:
+            return {
+                "entries": len(self._by_digest),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "content_hits": self.content_hits,
+                "parses": self.parses,
+                "evictions": self.evictions,
+            }
+
+
+_STORE: Optional[ScriptStore] = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_script_store() -> ScriptStore:
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            _STORE = ScriptStore()
+        return _STORE
+
+
+def load_script_csv(script_csv_path: Path) -> list[ScriptRow]:
+    """原稿CSVを index 順の行で返す（ストアにあれば解析し直さない）。"""
+
+    return list(get_script_store().load(script_csv_path).rows)
@@ -0,0 +1,64 @@
+"""同じ生成リクエストの同時実行をまとめる（single-flight）。
+
+ダブルクリックや 2 つのタブから同じスライドを再生成すると、同じ index・原稿の
+`generate_one` が同時に走り、同じ `voice_XXX.mp3` に書き込み合う。ここではキーが同じ
+呼び出しが実行中なら新たに実行せず、先行する呼び出しの完了を待って同じ結果（例外も同じ）を返す。
+完了したキーは忘れる（結果のキャッシュは合成キャッシュの役割）。
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Callable, Generic, Hashable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class _Call(Generic[T]):
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Optional[T] = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight(Generic[T]):
+    """キーごとに実行中の呼び出しを 1 つに保つ（スレッドセーフ）。"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _Call[T]] = {}
+        self.executed = 0
+        self.shared = 0
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> tuple[T, bool]:
+        """fn() の結果と、先行する呼び出しの結果を共有したかどうかを返す。"""
+
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if call is None:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True  # type: ignore[return-value]
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result, False
+
+    def stats(self) -> dict[str, object]:
+        with self._lock:
+            return {"in_flight": len(self._calls), "executed": self.executed, "shared": self.shared}
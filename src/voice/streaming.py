@@ -0,0 +1,192 @@
+"""推論しながら MP3 を逐次返すストリーミング合成の部品。
+
+通常の生成は「XTTS が行全体を推論 → MP3 エンコード → ファイル置換」が終わるまで
+何も再生できない。ストリーミングでは XTTS の `inference_stream` が返す波形チャンクを
+そのまま常駐させた ffmpeg の stdin へ流し、stdout に出てきた MP3 フレームを HTTP の
+チャンク転送で返す。最初の音が届くまでの時間（time to first audio）が主な指標。
+
+- `Mp3StreamEncoder`: s16le PCM を受け取り MP3 を逐次出力する ffmpeg プロセス
+- `pump_stream`: 波形チャンクの生成（別スレッド）と MP3 の読み出しを繋ぐ
+- `AudioStream`: サーバーへ返すストリーム（出力先パスとキャッシュヒット有無つき）
+"""
+
+from __future__ import annotations
+
+import subprocess
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, Optional
+
+from src.logger import setup_logger
+from src.voice.ffmpeg_pool import ffmpeg_exe
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = setup_logger("Streaming")
+
+# stdout から 1 回に読む最大バイト数（来た分だけ返すので小さいフレームもすぐ流れる）
+_READ_SIZE = 16 * 1024
+
+
+class Mp3StreamEncoder:
+    """PCM を stdin に書くと、エンコード済みの MP3 フレームが stdout から逐次読める ffmpeg。"""
+
+    def __init__(self, sample_rate: int, mp3_args: list[str]):
+        self.sample_rate = int(sample_rate)
+        self._proc = subprocess.Popen(
+            [
+                ffmpeg_exe(),
+                "-hide_banner",
+                "-loglevel",
+                "error",
+                "-nostats",
+                "-f",
+                "s16le",
+                "-ar",
+                str(self.sample_rate),
+                "-ac",
+                "1",
+                "-i",
+                "pipe:0",
+                *mp3_args,
+                # パケットごとに stdout へ書き出す（ffmpeg 側でまとめて溜め込まない）
+                "-flush_packets",
+                "1",
+                "-f",
+                "mp3",
+                "pipe:1",
+            ],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+
+    def write(self, pcm: bytes) -> None:
+        assert self._proc.stdin is not None
+        self._proc.stdin.write(pcm)
+        self._proc.stdin.flush()
+
+    def finish_input(self) -> None:
+        """入力の終端を伝える（ffmpeg は残りをエンコードして stdout を閉じる）。"""
+        try:
+            if self._proc.stdin is not None and not self._proc.stdin.closed:
+                self._proc.stdin.close()
+        except OSError:
+            pass
+
+    def iter_output(self) -> Iterator[bytes]:
+        assert self._proc.stdout is not None
+        while True:
+            data = self._proc.stdout.read1(_READ_SIZE)  # type: ignore[attr-defined]
+            if not data:
+                return
+            yield data
+
+    def wait(self) -> None:
+        code = self._proc.wait()
+        if code != 0:
+            err = (self._proc.stderr.read() if self._proc.stderr is not None else b"").decode("utf-8", errors="replace")
+            raise RuntimeError(f"FFmpeg stream encode failed (code={code}): {err}")
+
+    def kill(self) -> None:
+        self.finish_input()
+        if self._proc.poll() is None:
+            self._proc.kill()
+        self._proc.wait()
+
+
+@dataclass
+class StreamResult:
+    """ストリーム終了後の集計（全波形は保存用のエンコードに使う）。"""
+
+    chunks: list["np.ndarray"] = field(default_factory=list)
+    first_audio_seconds: Optional[float] = None
+    synth_seconds: float = 0.0
+    error: Optional[BaseException] = None
+    cancelled: bool = False
+
+
+def pump_stream(
+    waveforms: Iterable["np.ndarray"],
+    encoder: Mp3StreamEncoder,
+    result: StreamResult,
+    *,
+    to_pcm: Callable[["np.ndarray"], bytes],
+    on_first_audio: Optional[Callable[[float], None]] = None,
+) -> Iterator[bytes]:
+    """波形チャンクを別スレッドで生成・エンコーダへ投入し、出てきた MP3 バイト列を返す。
+
+    呼び出し側が途中でイテレーションをやめた場合（クライアント切断）は推論とエンコーダを止め、
+    `result.cancelled` を立てる。推論側の例外は `result.error` に入れ、MP3 を出し切った後に送出する。
+    """
+
+    stop = threading.Event()
+    t0 = time.perf_counter()
+
+    def produce() -> None:
+        try:
+            for wav in waveforms:
+                if stop.is_set():
+                    return
+                if wav.size == 0:
+                    continue
+                result.chunks.append(wav)
+                encoder.write(to_pcm(wav))
+        except BaseException as e:  # noqa: BLE001
+            if not stop.is_set():
+                result.error = e
+        finally:
+            result.synth_seconds = time.perf_counter() - t0
+            encoder.finish_input()
+
+    def abort() -> None:
+        stop.set()
+        encoder.kill()
+        producer.join(timeout=5)
+
+    producer = threading.Thread(target=produce, name="svm-stream-synth", daemon=True)
+    producer.start()
+    try:
+        for data in encoder.iter_output():
+            if result.first_audio_seconds is None:
+                result.first_audio_seconds = time.perf_counter() - t0
+                if on_first_audio is not None:
+                    on_first_audio(result.first_audio_seconds)
+            yield data
+    except GeneratorExit:
+        result.cancelled = True
+        logger.info("[Streaming] client stopped reading; synthesis cancelled")
+        abort()
+        raise
+    except BaseException:
+        abort()
+        raise
+    producer.join()
+    encoder.wait()
+    if result.error is not None:
+        raise result.error
+
+
+def iter_file(path: Path, *, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    with path.open("rb") as f:
+        while True:
+            data = f.read(chunk_size)
+            if not data:
+                return
+            yield data
+
+
+@dataclass
+class AudioStream:
+    """`VoiceGenerator.open_stream` の戻り値。反復すると MP3 のバイト列が得られる。"""
+
+    index: int
+    path: Path
+    cached: bool
+    chunks: Iterator[bytes]
+
+    def __iter__(self) -> Iterator[bytes]:
+        return self.chunks
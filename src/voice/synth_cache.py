@@ -0,0 +1,222 @@
+"""合成結果（MP3）のコンテンツアドレスキャッシュ。
+
+同じ原稿・同じ話者・同じモデル設定なら XTTS 推論と MP3 エンコードの結果は
+再利用できるため、入力一式のハッシュをキーにして MP3 をディスクへ保存しておく。
+
+- キー: 正規化済み原稿 / voice_id / 話者キャッシュ(.pth)のハッシュ / モデル名 / 言語 / 推論パラメータ
+- ヒット時: キャッシュ済み MP3 を出力先へハードリンク（不可ならコピー）する
+- 容量: 合計サイズが上限を超えたら、最後に使われた時刻が古いものから削除する（LRU）
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+from src.logger import setup_logger
+
+logger = setup_logger("SynthCache")
+
+
+_DIGEST_LOCK = threading.Lock()
+# 最近使ったファイルのハッシュだけを残す（タイムスタンプ付きのアップロードや一時ファイルで増え続けないように）
+_DIGEST_MEMO_MAX = 256
+_DIGEST_MEMO: OrderedDict[str, tuple[int, int, str]] = OrderedDict()
+
+
+def normalize_script(script: str) -> str:
+    """キャッシュキー用の原稿正規化（NFKC + 空白の畳み込み）。"""
+
+    s = unicodedata.normalize("NFKC", script or "")
+    s = re.sub(r"\s+", " ", s)
+    return s.strip()
+
+
+def file_digest(path: Path) -> str:
+    """ファイル内容の sha256。(path, size, mtime) が同じ間はメモ化した値を返す（直近 256 ファイルまで）。"""
+
+    p = Path(path).resolve()
+    st = p.stat()
+    key = str(p)
+    with _DIGEST_LOCK:
+        memo = _DIGEST_MEMO.get(key)
+        if memo and memo[0] == st.st_size and memo[1] == st.st_mtime_ns:
+            _DIGEST_MEMO.move_to_end(key)
+            return memo[2]
+
+    h = hashlib.sha256()
+    with p.open("rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+    with _DIGEST_LOCK:
+        _DIGEST_MEMO[key] = (st.st_size, st.st_mtime_ns, digest)
+        _DIGEST_MEMO.move_to_end(key)
+        while len(_DIGEST_MEMO) > _DIGEST_MEMO_MAX:
+            _DIGEST_MEMO.popitem(last=False)
+    return digest
+
+
+def make_cache_key(
+    *,
+    script: str,
+    voice_id: str,
+    voice_digest: str,
+    model_name: str,
+    language: str,
+    params: Optional[dict[str, object]] = None,
+) -> str:
+    payload = {
+        "script": normalize_script(script),
+        "voice_id": voice_id,
+        "voice_digest": voice_digest,
+        "model_name": model_name,
+        "language": language,
+        "params": params or {},
+    }
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _link_or_copy(src: Path, dst: Path) -> None:
+    """src を dst へハードリンク（失敗時はコピー）し、tmp 経由で置換する。
+
+    出力側の MP3 は常に os.replace で差し替えられる（inode を書き換えない）ため、
+    キャッシュ実体とハードリンクを共有しても内容が壊れることはない。
+    """
+
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.with_name(dst.stem + ".cache" + dst.suffix)
+    try:
+        if tmp.exists():
+            tmp.unlink(missing_ok=True)
+        try:
+            os.link(str(src), str(tmp))
+        except OSError:
+            shutil.copyfile(str(src), str(tmp))
+        os.replace(str(tmp), str(dst))
+    finally:
+        try:
+            if tmp.exists():
+                tmp.unlink(missing_ok=True)
+        except Exception:
+            pass
+
+
+class SynthCache:
+    """サイズ上限付き LRU のディスクキャッシュ（スレッドセーフ）。"""
+
+    def __init__(self, cache_dir: Path, *, max_bytes: int):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = int(max_bytes)
+        self._lock = threading.Lock()
+        # key -> size（先頭が最も古い）
+        self._entries: Optional[OrderedDict[str, int]] = None
+        self._total = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.mp3"
+
+    def _ensure_index(self) -> OrderedDict[str, int]:
+        # 初回アクセス時にディスクを走査し、mtime 順（= 最終利用順）で索引を組み立てる
+        if self._entries is not None:
+            return self._entries
+        found: list[tuple[int, str, int]] = []
+        if self.cache_dir.exists():
+            for p in self.cache_dir.glob("*.mp3"):
+                try:
+                    st = p.stat()
+                except OSError:
+                    continue
+                found.append((st.st_mtime_ns, p.stem, st.st_size))
+        found.sort()
+        self._entries = OrderedDict((k, size) for _, k, size in found)
+        self._total = sum(size for _, _, size in found)
+        return self._entries
+
+    def fetch(self, key: str, dst: Path) -> bool:
+        """ヒットしたら dst に配置して True を返す。"""
+
+        with self._lock:
+            entries = self._ensure_index()
+            src = self._path(key)
+            if key not in entries or not src.exists():
+                if key in entries:
+                    self._total -= entries.pop(key)
+                self.misses += 1
+                return False
+            entries.move_to_end(key)
+            try:
+                os.utime(str(src), None)
+            except OSError:
+                pass
+
+        # ヒットは dst に配置できてから数える（配置できなければ呼び出し側は合成するためミス）
+        try:
+            _link_or_copy(src, dst)
+        except Exception as e:
+            logger.warning(f"[SynthCache] fetch failed key={key[:12]}: {e}")
+            with self._lock:
+                self.misses += 1
+            return False
+        with self._lock:
+            self.hits += 1
+        return True
+
+    def store(self, key: str, src: Path) -> None:
+        """生成済み MP3 をキャッシュへ登録し、必要なら古いものから追い出す。"""
+
+        if self.max_bytes <= 0:
+            return
+        try:
+            size = src.stat().st_size
+        except OSError:
+            return
+        if size == 0 or size > self.max_bytes:
+            return
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            _link_or_copy(src, self._path(key))
+        except Exception as e:
+            logger.warning(f"[SynthCache] store failed key={key[:12]}: {e}")
+            return
+
+        with self._lock:
+            entries = self._ensure_index()
+            if key in entries:
+                self._total -= entries.pop(key)
+            entries[key] = size
+            self._total += size
+            while self._total > self.max_bytes and entries:
+                old_key, old_size = entries.popitem(last=False)
+                self._total -= old_size
+                self.evictions += 1
+                try:
+                    self._path(old_key).unlink(missing_ok=True)
+                except OSError:
+                    pass
+
+    def stats(self) -> dict[str, object]:
+        with self._lock:
+            entries = self._ensure_index()
+            return {
+                "dir": str(self.cache_dir),
+                "entries": len(entries),
+                "bytes": self._total,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
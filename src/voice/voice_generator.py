@@ -1,22 +1,55 @@
-import csv
-import io
 import json
 import os
 import re
+import shutil
 import threading
 import asyncio
 import time
+from collections import deque
+from concurrent.futures import Future, wait
+from contextlib import nullcontext
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
-
-import imageio_ffmpeg
+from typing import TYPE_CHECKING, Callable, Iterator, Optional
 
 from src.logger import setup_logger
+from src.voice.batching import Chunk, RowAssembler, XttsBatchRunner, plan_batches, split_chunks, split_sentences
+from src.voice.events import publish_event
+from src.voice.inference_plan import LatentInferencePlan, model_device, pin_to_device, waveform_from_output
+from src.voice.ffmpeg_pool import get_encoder_pool, run_ffmpeg
+from src.voice.lame import encode_pcm16, mp3_encoder
+from src.voice.perf_profile import apply_torch_threads, load_profile, profile_int
+from src.voice.manifest import ScriptDiff, diff_rows, forget_rows, load_manifest, record_rows, script_digest
+from src.voice.model_snapshot import (
+    find_model_dir,
+    load_snapshot_meta,
+    load_tts_from_snapshot,
+    save_snapshot,
+    snapshot_enabled,
+)
+from src.voice.quantize import quantize_xtts, resolve_quantize_mode
+from src.voice.sample_latents import SampleLatentCache
+from src.voice.scheduler import BULK, INTERACTIVE, get_scheduler
+from src.voice.script_store import ScriptRow, load_script_csv
+from src.voice.single_flight import SingleFlight
+from src.voice.streaming import AudioStream, Mp3StreamEncoder, StreamResult, iter_file, pump_stream
+from src.voice.synth_cache import SynthCache, file_digest, make_cache_key
+from src.voice.voice_registry import VoiceEntry, VoiceRegistry
+from src.voice.voice_tensors import compact_path, load_compact_voice, save_compact_voice
+from src.voice.worker_pool import SynthWorkerPool, fork_supported
+
+if TYPE_CHECKING:
+    import numpy as np
 
 logger = setup_logger("VoiceGenerator")
 
 
+_MODEL_NAME = "tts_models/multilingual/multi-dataset/xtts_v2"
+_LANGUAGE = "ja"
+# 推論パラメータ（合成キャッシュのキーにも含める）
+_INFERENCE_PARAMS: dict[str, object] = {"enable_text_splitting": True}
+
+
 _INIT_STATE_LOCK = threading.Lock()
 _INIT_STATE: dict[str, object] = {
     "ready": False,
@@ -29,7 +62,10 @@ _INIT_STATE: dict[str, object] = {
 
 
 def _set_init_state(stage: str, *, message: str = "", error: str | None = None, ready: bool | None = None) -> None:
-    """モデル初期化の進捗を共有状態として更新する（UI/診断向け）。"""
+    """モデル初期化の進捗を共有状態として更新する（UI/診断向け）。
+
+    段階遷移は "init" イベントとしても配信する（/api/events）。
+    """
 
     with _INIT_STATE_LOCK:
         _INIT_STATE["stage"] = stage
@@ -42,6 +78,9 @@ def _set_init_state(stage: str, *, message: str = "", error: str | None = None,
         _INIT_STATE["updated_at"] = time.time()
         if error is not None:
             _INIT_STATE["error"] = error
+        snapshot = dict(_INIT_STATE)
+
+    publish_event("init", **snapshot)
 
 
 def get_tts_init_state() -> dict[str, object]:
@@ -73,6 +112,32 @@ def _voice_model_json_path() -> Path:
     return _repo_root() / "src" / "voice" / "models" / "tts_model.json"
 
 
+def _synth_cache_dir() -> Path:
+    """合成キャッシュ（MP3）の保存先。SVM_SYNTH_CACHE_DIR で差し替え可能。"""
+    env = os.environ.get("SVM_SYNTH_CACHE_DIR")
+    if env:
+        return Path(env).resolve()
+    return _repo_root() / "src" / "voice" / "models" / "synth_cache"
+
+
+def _synth_cache_max_bytes() -> int:
+    """合成キャッシュの容量上限。SVM_SYNTH_CACHE_MAX_MB=0 でキャッシュ無効。"""
+    try:
+        mb = float(os.environ.get("SVM_SYNTH_CACHE_MAX_MB", "1024"))
+    except ValueError:
+        mb = 1024.0
+    return int(mb * 1024 * 1024)
+
+
+def _voice_cache_max_bytes() -> int:
+    """voice レジストリ（話者 latent）のメモリ上限。SVM_VOICE_CACHE_MAX_MB で変更できる。"""
+    try:
+        mb = float(os.environ.get("SVM_VOICE_CACHE_MAX_MB", "256"))
+    except ValueError:
+        mb = 256.0
+    return int(mb * 1024 * 1024)
+
+
 def _load_voice_file(voice_file: Path, *, map_location: str | object):
     """PyTorch 2.6+ でデフォルトになった ``weights_only=True`` を避けて読み込む。
 
@@ -164,148 +229,178 @@ def pick_default_speaker_wav(samples_dir: Optional[Path] = None) -> Optional[Pat
     return sorted(wavs, key=lambda p: p.stat().st_mtime)[-1]
 
 
-def _decode_csv_bytes(data: bytes) -> str:
-    """CSVの文字化け対策デコード。
+# 行単位の進捗通知: (event, index, info)
+RowCallback = Callable[[str, int, dict[str, object]], None]
 
-    優先順位:
-      1) UTF-8 (BOM付き含む) を strict で試し、成功したらそれを採用
-      2) CP932 を strict で採用
-
-    NOTE:
-      CP932 は多くのバイト列を「それっぽく」復号できてしまうため、
-      UTF-8のデータでも置換文字(U+FFFD)が出ずに文字化けするケースがある。
-      そのため「置換文字率比較」ではなく strict デコードの成否で判定する。
-    """
-    # BOMがある場合のみUTF-16/32を採用する。
-    # UTF-16LE/BE は「どんな偶数長バイト列でも復号できてしまう」ため、
-    # BOM無しで試すと誤判定の原因になる。
-    if data.startswith(b"\xef\xbb\xbf"):
-        return data.decode("utf-8-sig", errors="strict")
-    if data.startswith((b"\xff\xfe\x00\x00", b"\x00\x00\xfe\xff")):
-        return data.decode("utf-32", errors="strict")
-    if data.startswith((b"\xff\xfe", b"\xfe\xff")):
-        return data.decode("utf-16", errors="strict")
-
-    # それ以外はヒューリスティックで最も「それっぽい」ものを採用する。
-    # CP932は誤判定しやすいので、スコアリングで抑制する。
-    candidates = [
-        "utf-8-sig",
-        "cp932",
-        "euc-jp",
-    ]
-
-    def japanese_count(s: str) -> int:
-        n = 0
-        for ch in s:
-            o = ord(ch)
-            if 0x3040 <= o <= 0x309F:  # Hiragana
-                n += 1
-            elif 0x30A0 <= o <= 0x30FF:  # Katakana
-                n += 1
-            elif 0x4E00 <= o <= 0x9FFF:  # CJK Unified Ideographs
-                n += 1
-        return n
-
-    def score(enc: str) -> tuple[float, str]:
-        s = data.decode(enc, errors="replace")
-        repl = s.count("\ufffd")
-        nul = s.count("\x00")
-        jp = japanese_count(s)
-        header_bonus = 200.0 if ("index" in s.lower() and "script" in s.lower()) else 0.0
-        # replacement / NUL を強く罰し、日本語文字を強く報酬
-        val = header_bonus + (jp * 3.0) - (repl * 100.0) - (nul * 50.0)
-        return val, s
-
-    best_val = float("-inf")
-    best_text = None
-    for enc in candidates:
-        try:
-            val, s = score(enc)
-            if val > best_val:
-                best_val = val
-                best_text = s
-        except Exception:
-            continue
 
-    if best_text is not None:
-        return best_text
+class GenerationCancelled(RuntimeError):
+    """一括生成が途中でキャンセルされた。"""
 
-    return data.decode("utf-8-sig", errors="replace")
 
+@dataclass
+class _RowTask:
+    """1行ぶんの生成状態（推論段とエンコード段の受け渡し用）。"""
 
-@dataclass(frozen=True)
-class ScriptRow:
     index: int
     script: str
+    out_dir: Path
+    mp3_path: Path
+    wav_path: Path
+    speaker_wav: Optional[Path]
+    voice_id: Optional[str]
+    voice_dir: Optional[Path]
+    cache_key: Optional[str] = None
+    cached: bool = False
+    audio: Optional["np.ndarray"] = None
+    sample_rate: int = 24000
+    synth_seconds: float = 0.0
+    encode_seconds: float = 0.0
+    audio_seconds: float = 0.0
+    priority: str = BULK  # スケジューラの優先度クラス（モデル・ffmpeg の空き待ちで使う）
+
+
+def _env_or_profile(name: str, key: str) -> Optional[int]:
+    """環境変数の明示指定を優先し、無ければ perf_profile.json（`main.py tune` の結果）の値を使う。"""
+    raw = os.environ.get(name, "").strip()
+    if raw:
+        try:
+            value = int(raw)
+        except ValueError:
+            return None
+        return value if value > 0 else None
+    return profile_int(key)
 
 
-def load_script_csv(script_csv_path: Path) -> list[ScriptRow]:
-    raw = script_csv_path.read_bytes()
-    text = _decode_csv_bytes(raw)
+def _synth_workers() -> int:
+    """推論ワーカープロセス数（SVM_SYNTH_WORKERS → プロファイル → 既定 1 = 親プロセスのみで推論）。"""
+    return _env_or_profile("SVM_SYNTH_WORKERS", "synth_workers") or 1
 
-    reader = csv.DictReader(io.StringIO(text))
-    if not reader.fieldnames:
-        raise ValueError("CSVヘッダが読み取れません")
 
-    field_map = {f.strip().lower(): f for f in reader.fieldnames if f}
-    if "index" not in field_map or "script" not in field_map:
-        raise ValueError("CSVヘッダが不正です（index,script が必要）")
+def _synth_threads() -> Optional[int]:
+    """ワーカー 1 つあたりの torch スレッド数（SVM_SYNTH_THREADS → プロファイル → 割り当てコア数）。"""
+    return _env_or_profile("SVM_SYNTH_THREADS", "intra_op_threads")
 
-    rows: list[ScriptRow] = []
-    for r in reader:
-        raw_idx = (r.get(field_map["index"]) or "").strip()
-        raw_script = (r.get(field_map["script"]) or "").strip()
-        if not raw_idx:
-            continue
-        try:
-            idx = int(raw_idx)
-        except Exception:
-            continue
-        rows.append(ScriptRow(index=idx, script=raw_script))
 
-    rows.sort(key=lambda x: x.index)
-    return rows
+def _tts_batch_size() -> int:
+    """一括生成のバッチ推論サイズ（SVM_TTS_BATCH_SIZE → プロファイル → 既定 1 = 行ごとの推論）。"""
+    return _env_or_profile("SVM_TTS_BATCH_SIZE", "batch_size") or 1
 
 
-def _ffmpeg_encode_to_mp3(src_wav: Path, dst_mp3: Path) -> None:
-    ffmpeg = imageio_ffmpeg.get_ffmpeg_exe()
-    dst_mp3.parent.mkdir(parents=True, exist_ok=True)
+def _publish_wav_done(task: "_RowTask") -> None:
+    audio_seconds = (task.audio.size / task.sample_rate) if task.audio is not None and task.sample_rate else 0.0
+    publish_event(
+        "row",
+        stage="wav_done",
+        index=task.index,
+        synth_seconds=round(task.synth_seconds, 3),
+        audio_seconds=round(audio_seconds, 3),
+    )
+
+
+def _stream_chunk_size() -> int:
+    """ストリーミング推論で 1 チャンクにまとめる GPT トークン数（小さいほど最初の音が早いが継ぎ目が増える）。"""
+    raw = os.environ.get("SVM_STREAM_CHUNK_SIZE", "").strip()
+    try:
+        return max(1, int(raw)) if raw else 20
+    except ValueError:
+        return 20
+
+
+def _fake_audio_seconds(script: str) -> float:
+    """フェイクTTSの無音の長さ（script長に応じて最短0.4秒〜最長8秒）。"""
+    return min(8.0, max(0.4, 0.06 * len(script)))
+
+
+def _keep_wav() -> bool:
+    """SVM_KEEP_WAV=1 のときは従来どおり temp/ に WAV を書き出してから MP3 化する（デバッグ用）。"""
+    return os.environ.get("SVM_KEEP_WAV", "").strip() == "1"
+
+
+def _as_mono_float32(wav: object) -> "np.ndarray":
+    """Tensor/list/ndarray の波形を float32 の 1 次元配列にする。"""
+
+    import numpy as np
+
+    try:
+        import torch
+
+        if isinstance(wav, torch.Tensor):
+            wav = wav.detach().cpu().float().numpy()
+    except Exception:
+        pass
+
+    arr = np.asarray(wav, dtype=np.float32)
+    if arr.ndim > 1:
+        # 念のため mono 化
+        arr = arr.reshape(-1)
+    return arr
+
+
+def _pcm16_bytes(audio: "np.ndarray") -> bytes:
+    """float 波形（-1..1）を little-endian int16 PCM のバイト列にする。"""
 
+    import numpy as np
+
+    pcm = np.clip(audio, -1.0, 1.0)
+    return (pcm * 32767.0).astype("<i2").tobytes()
+
+
+_MP3_ARGS = ["-vn", "-c:a", "libmp3lame", "-q:a", "3"]
+
+
+def _tmp_mp3_path(dst_mp3: Path) -> Path:
     # 直接 dst_mp3 に書くと、Windows でブラウザ再生中のファイルがロックされて
     # 上書きできないことがあるため、一旦テンポラリに出してから置換する。
     # 拡張子が .mp3 でないと FFmpeg が出力形式を判定できず失敗するため、必ず .tmp.mp3 にする。
-    tmp_mp3 = dst_mp3.with_name(dst_mp3.stem + ".tmp" + dst_mp3.suffix)
-
-    args = [
-        ffmpeg,
-        "-y",
-        "-hide_banner",
-        "-loglevel",
-        "error",
-        "-nostats",
-        "-i",
-        str(src_wav),
-        "-vn",
-        "-c:a",
-        "libmp3lame",
-        "-q:a",
-        "3",
-        str(tmp_mp3),
-    ]
-
-    import subprocess
-
-    proc = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    if proc.returncode != 0:
-        stderr = proc.stderr or b""
-        msg = stderr.decode("utf-8", errors="replace")
+    return dst_mp3.with_name(dst_mp3.stem + ".tmp" + dst_mp3.suffix)
+
+
+def _run_ffmpeg_to_mp3(args: list[str], tmp_mp3: Path, *, stdin_bytes: Optional[bytes] = None) -> None:
+    try:
+        run_ffmpeg(args, stdin_bytes=stdin_bytes, error_label="FFmpeg MP3 encode")
+    except Exception:
         try:
             if tmp_mp3.exists():
                 tmp_mp3.unlink(missing_ok=True)
         except Exception:
             pass
-        raise RuntimeError(f"FFmpeg MP3 encode failed (code={proc.returncode}): {msg}")
+        raise
+
+
+def _ffmpeg_encode_to_mp3(src_wav: Path, dst_mp3: Path) -> None:
+    dst_mp3.parent.mkdir(parents=True, exist_ok=True)
+    tmp_mp3 = _tmp_mp3_path(dst_mp3)
+    _run_ffmpeg_to_mp3(["-i", str(src_wav), *_MP3_ARGS, str(tmp_mp3)], tmp_mp3)
+    _replace_with_retry(tmp_mp3, dst_mp3)
+
+
+def _ffmpeg_encode_pcm_to_mp3(audio: "np.ndarray", sample_rate: int, dst_mp3: Path) -> None:
+    """メモリ上の波形を int16 PCM として ffmpeg の stdin へ流し込み、MP3 にする（中間WAVなし）。"""
+
+    dst_mp3.parent.mkdir(parents=True, exist_ok=True)
+    tmp_mp3 = _tmp_mp3_path(dst_mp3)
+    args = ["-f", "s16le", "-ar", str(int(sample_rate)), "-ac", "1", "-i", "pipe:0", *_MP3_ARGS, str(tmp_mp3)]
+    _run_ffmpeg_to_mp3(args, tmp_mp3, stdin_bytes=_pcm16_bytes(audio))
+    _replace_with_retry(tmp_mp3, dst_mp3)
+
+
+def _encode_pcm_to_mp3(audio: "np.ndarray", sample_rate: int, dst_mp3: Path) -> None:
+    """波形を MP3 にする。lameenc があればプロセス内でエンコードし、無ければ ffmpeg を起動する。"""
 
+    if mp3_encoder() != "lame":
+        _ffmpeg_encode_pcm_to_mp3(audio, sample_rate, dst_mp3)
+        return
+    dst_mp3.parent.mkdir(parents=True, exist_ok=True)
+    tmp_mp3 = _tmp_mp3_path(dst_mp3)
+    try:
+        tmp_mp3.write_bytes(encode_pcm16(_pcm16_bytes(audio), sample_rate=int(sample_rate)))
+    except Exception:
+        tmp_mp3.unlink(missing_ok=True)
+        raise
+    _replace_with_retry(tmp_mp3, dst_mp3)
+
+
+def _replace_with_retry(tmp_mp3: Path, dst_mp3: Path) -> None:
     # 置換（リトライ付き）
     last: Exception | None = None
     for _ in range(6):
@@ -360,6 +455,9 @@ class VoiceGenerator:
         self._fake_tts = os.environ.get("SVM_FAKE_TTS", "0") == "1"
 
         self._tts = None
+        self._load_mode: Optional[str] = None  # "snapshot" / "cold"
+        self._quantize: Optional[str] = None
+        self._quantize_stats: Optional[dict[str, object]] = None
         if not self._fake_tts:
             logger.info("[VoiceGenerator] init: start real TTS (XTTS v2)")
             try:
@@ -374,6 +472,7 @@ class VoiceGenerator:
 
                 device = "cuda" if torch.cuda.is_available() else "cpu"
                 self._device = device
+                self._apply_perf_profile()
                 logger.info(
                     f"[VoiceGenerator] init: torch ready in {(time.perf_counter() - t1):.3f}s (device={device})"
                 )
@@ -384,12 +483,24 @@ class VoiceGenerator:
 
                 logger.info(f"[VoiceGenerator] init: imported TTS.api in {(time.perf_counter() - t2):.3f}s")
 
-                # ここが最も時間がかかる: モデルのDL/ロード
+                # ここが最も時間がかかる: モデルのDL/ロード（2回目以降は mmap スナップショットから）
                 t3 = time.perf_counter()
-                _set_init_state("load_xtts_model", message="loading XTTS model")
-                logger.info("[VoiceGenerator] init: loading XTTS model... (this can take several minutes on first run)")
-                self._tts = TTS(model_name="tts_models/multilingual/multi-dataset/xtts_v2").to(device)
-                logger.info(f"[VoiceGenerator] init: XTTS model ready in {(time.perf_counter() - t3):.3f}s")
+                self._tts = self._load_xtts(TTS, device)
+                logger.info(
+                    f"[VoiceGenerator] init: XTTS model ready in {(time.perf_counter() - t3):.3f}s (load={self._load_mode})"
+                )
+
+                self._quantize = resolve_quantize_mode()
+                if self._quantize:
+                    t4 = time.perf_counter()
+                    _set_init_state("quantize_model", message=f"quantizing XTTS GPT ({self._quantize})")
+                    try:
+                        self._quantize_stats = quantize_xtts(self._tts.synthesizer.tts_model, self._quantize)
+                        logger.info(f"[VoiceGenerator] init: quantized in {(time.perf_counter() - t4):.3f}s")
+                    except Exception as e:
+                        # 量子化できない環境（CUDA 等）では fp32 のまま続行する
+                        logger.warning(f"[VoiceGenerator] init: quantization skipped, using fp32: {e}")
+                        self._quantize = None
             except Exception:
                 _set_init_state("init_error", message="XTTS init failed", error="exception", ready=False)
                 logger.exception("[VoiceGenerator] init: failed to initialize XTTS model")
@@ -399,9 +510,24 @@ class VoiceGenerator:
             logger.info("[VoiceGenerator] init: fake TTS mode enabled (SVM_FAKE_TTS=1)")
             _set_init_state("fake_tts", message="fake TTS mode", ready=True)
 
-        # voice キャッシュ（.pth）から読み込んだ latent をメモリに保持して再利用する
-        # これにより、生成ごとに .pth を読む/latent を計算する経路を避ける。
-        self._voice_latents: dict[str, dict[str, object]] = {}
+        # 同一入力の再生成を避けるための合成キャッシュ（推論 + MP3 エンコードを丸ごと省略）
+        self._synth_cache = SynthCache(_synth_cache_dir(), max_bytes=_synth_cache_max_bytes())
+
+        # 複数プロセス推論（SVM_SYNTH_WORKERS>1）。親で推論する前に fork するため、ロードの最後に作る
+        self._procs: Optional[SynthWorkerPool] = None
+        self._procs_disabled = False
+        self._procs_lock = threading.Lock()
+
+        # voice キャッシュ（.pth）から読み込んだ latent と推論プランを voice_id ごとに保持して再利用する
+        # （複数話者を 1 つのモデルで扱う。上限を超えたら使われていないものから外す）
+        self._voices = VoiceRegistry(max_bytes=_voice_cache_max_bytes())
+
+        # モデル推論と ffmpeg の同時実行数を制限し、1 行プレビューを一括生成より先に通す
+        self._scheduler = get_scheduler()
+
+        # 同じ出力・原稿・話者の生成が同時に来たら 1 回の推論にまとめる
+        self._flights: SingleFlight[Path] = SingleFlight()
+        self._rows_copied = 0
 
         # サーバー再起動後でも、既に構築済みの voice キャッシュがあれば自動で読み込む
         if not self._fake_tts:
@@ -432,17 +558,55 @@ class VoiceGenerator:
             except Exception as e:
                 logger.warning(f"[VoiceGenerator] voice cache auto-load (tts_model.json) skipped: {e}")
 
+        # 親で OpenMP の並列区間を実行した後の fork は子がデッドロックしうるため、ここで fork しておく
+        self._synth_pool()
+
         logger.info(f"[VoiceGenerator] init: done in {(time.perf_counter() - t_init0):.3f}s")
         if not self._fake_tts:
             _set_init_state("ready", message="XTTS ready", ready=True)
 
+    def _load_xtts(self, tts_cls: type, device: str) -> object:
+        """XTTS をロードする。使えるスナップショットがあれば mmap で組み立て、無ければ通常ロード後に書き出す。"""
+
+        if snapshot_enabled():
+            meta = load_snapshot_meta(_MODEL_NAME)
+            if meta is not None:
+                t0 = time.perf_counter()
+                _set_init_state("load_xtts_snapshot", message="loading XTTS from mmap snapshot")
+                logger.info(f"[VoiceGenerator] init: loading XTTS snapshot {meta['path']}")
+                try:
+                    tts = load_tts_from_snapshot(meta).to(device)
+                    self._load_mode = "snapshot"
+                    logger.info(f"[VoiceGenerator] init: snapshot loaded in {(time.perf_counter() - t0):.3f}s")
+                    return tts
+                except Exception as e:
+                    logger.warning(f"[VoiceGenerator] init: snapshot load failed, falling back to cold load: {e}")
+
+        _set_init_state("load_xtts_model", message="loading XTTS model (cold)")
+        logger.info("[VoiceGenerator] init: loading XTTS model... (this can take several minutes on first run)")
+        tts = tts_cls(model_name=_MODEL_NAME).to(device)
+        self._load_mode = "cold"
+
+        if snapshot_enabled():
+            t0 = time.perf_counter()
+            _set_init_state("write_xtts_snapshot", message="writing XTTS mmap snapshot")
+            try:
+                model_dir = find_model_dir(tts, _MODEL_NAME)
+                if model_dir is None:
+                    raise RuntimeError("model directory (config.json / vocab.json) not found")
+                out = save_snapshot(tts.synthesizer.tts_model, model_dir=model_dir, model_name=_MODEL_NAME)
+                logger.info(f"[VoiceGenerator] init: snapshot written to {out} in {(time.perf_counter() - t0):.3f}s")
+            except Exception as e:
+                logger.warning(f"[VoiceGenerator] init: snapshot not written: {e}")
+        return tts
+
     def load_voice_cache(
         self,
         *,
         voice_id: str = "myvoice",
         voice_dir: Optional[Path] = None,
     ) -> bool:
-        """voice キャッシュ(.pth)を読み込んで、生成時にメモリ再利用できる状態にする。"""
+        """voice キャッシュ(.pth)を読み込んでレジストリに登録する（登録済みでも読み直す）。"""
 
         if self._fake_tts:
             # フェイク実装では latent は使わないため、存在確認だけでOK
@@ -451,16 +615,51 @@ class VoiceGenerator:
         if self._tts is None or self._tts.synthesizer is None or self._tts.synthesizer.tts_model is None:
             raise RuntimeError("TTSモデルが初期化されていません")
 
-        out_dir = (voice_dir or _voices_dir()).resolve()
-        voice_file = out_dir / f"{voice_id}.pth"
-        if not voice_file.exists() or voice_file.stat().st_size == 0:
+        voice_file = (voice_dir or _voices_dir()).resolve() / f"{voice_id}.pth"
+        latents = self._read_voice_latents(voice_file)
+        if latents is None:
             return False
+        self._voices.put(voice_id, latents, source=voice_file)
+        # 行ごとに繰り返していた引数解決・デバイス転送はここで 1 回だけ行う
+        self._inference_plan(voice_id)
+        return True
+
+    def _read_voice_latents(self, voice_file: Path) -> Optional[dict[str, object]]:
+        """gpt latent と speaker embedding を取り出す（読めない・見つからない場合は None）。
+
+        軽量ファイル（`<voice_id>.safetensors`）があれば mmap で読み、無ければ .pth を unpickle する。
+        """
+
+        if not voice_file.exists() or voice_file.stat().st_size == 0:
+            return None
+
+        compact = load_compact_voice(voice_file)
+        if compact is not None:
+            return {
+                "gpt": compact["gpt_cond_latent"],
+                "spk": compact["speaker_embedding"],
+                "source": str(voice_file),
+                "gpt_key": "gpt_cond_latent",
+                "spk_key": "speaker_embedding",
+                "content_hash": compact["content_hash"],
+            }
+        latents = self._read_legacy_voice_latents(voice_file)
+        if latents is not None:
+            # 次回から unpickle せずに読めるよう軽量ファイルを（書き直して）用意する
+            try:
+                save_compact_voice(voice_file, gpt=latents["gpt"], spk=latents["spk"])
+            except Exception as e:
+                logger.warning(f"[VoiceGenerator] compact voice not written ({voice_file}): {e}")
+        return latents
+
+    def _read_legacy_voice_latents(self, voice_file: Path) -> Optional[dict[str, object]]:
+        """`clone_voice()` が書いた .pth（ピクル）から latent を探して取り出す。"""
 
         try:
             data = _load_voice_file(voice_file, map_location=self._device)
         except Exception as e:
             logger.error(f"[VoiceGenerator] voice cache load failed ({voice_file}): {e}")
-            return False
+            return None
 
         # Coqui TTS/XTTS のバージョン差分で、.pth の構造が「トップレベルdict」と限らないことがある。
         # そのため、キーを“再帰的”に探索して latent を抽出する。
@@ -501,7 +700,7 @@ class VoiceGenerator:
         gpt_val, gpt_key = _deep_find(data, gpt_candidates)
         spk_val, spk_key = _deep_find(data, spk_candidates)
         if gpt_val is None or spk_val is None:
-            return False
+            return None
 
         # 互換: list/tuple で 1要素だけ包まれている場合は剥がす
         if isinstance(gpt_val, (list, tuple)) and len(gpt_val) == 1:
@@ -509,139 +708,75 @@ class VoiceGenerator:
         if isinstance(spk_val, (list, tuple)) and len(spk_val) == 1:
             spk_val = spk_val[0]
 
-        self._voice_latents[voice_id] = {
+        return {
             "gpt": gpt_val,
             "spk": spk_val,
             "source": str(voice_file),
             "gpt_key": gpt_key or "",
             "spk_key": spk_key or "",
         }
-        return True
 
-    def _try_generate_wav_with_latents(self, *, voice_id: str, script: str, wav_path: Path) -> bool:
-        """XTTSの latent を直接渡して WAV を生成する（対応していない環境では False）。"""
+    def _voice_entry(self, voice_id: str, voice_dir: Optional[Path] = None) -> Optional[VoiceEntry]:
+        """voice_dir 指定時はレジストリ経由で取得し（未登録・更新済みなら遅延ロード）、未指定なら登録済みのものだけ返す。"""
 
-        if self._fake_tts:
-            return False
-        if self._tts is None or self._tts.synthesizer is None or self._tts.synthesizer.tts_model is None:
-            return False
+        if voice_dir is None:
+            return self._voices.peek(voice_id)
+        voice_file = Path(voice_dir).resolve() / f"{voice_id}.pth"
+        return self._voices.get(voice_id, source=voice_file, loader=lambda: self._read_voice_latents(voice_file))
 
-        lat = self._voice_latents.get(voice_id)
-        if not lat:
-            return False
+    def voice_registry_stats(self) -> dict[str, object]:
+        return self._voices.stats()
 
+    def _inference_plan(self, voice_id: str, voice_dir: Optional[Path] = None) -> Optional[LatentInferencePlan]:
+        """voice の推論呼び出しプラン（voice ごとに初回のみ引数解決と latent のデバイス転送を行う）。"""
+
+        if self._tts is None or self._tts.synthesizer is None or self._tts.synthesizer.tts_model is None:
+            return None
         tts_model = self._tts.synthesizer.tts_model
         if not hasattr(tts_model, "inference"):
-            return False
-
-        gpt = lat.get("gpt")
-        spk = lat.get("spk")
-        if gpt is None or spk is None:
-            return False
-
-        # inference はモデルと同じ device 上の Tensor を期待する（特に CUDA 時）
-        try:
-            import torch
-
-            target_device = None
-            try:
-                # nn.Module 由来なら parameters() から device を取得できる
-                target_device = next(tts_model.parameters()).device  # type: ignore[attr-defined]
-            except Exception:
-                # fallback
-                target_device = torch.device(self._device)
-
-            if isinstance(gpt, torch.Tensor) and gpt.device != target_device:
-                gpt = gpt.to(target_device)
-            if isinstance(spk, torch.Tensor) and spk.device != target_device:
-                spk = spk.to(target_device)
-        except Exception:
-            # device 整合に失敗しても、後段で動く可能性があるため続行
-            pass
-
-        # 返却値/引数はバージョン差分があるため、signature を見て適応する
-        out = None
-        try:
-            import inspect
-
-            sig = inspect.signature(tts_model.inference)
-            params = sig.parameters
-
-            kwargs: dict[str, object] = {}
-
-            if "text" in params:
-                kwargs["text"] = script
-            if "language" in params:
-                kwargs["language"] = "ja"
-            if "lang" in params and "language" not in params:
-                kwargs["lang"] = "ja"
-
-            # gpt latent
-            for name in ("gpt_cond_latent", "gpt_conditioning_latents", "gpt_cond_latents", "gpt_latent"):
-                if name in params:
-                    kwargs[name] = gpt
-                    break
-
-            # speaker embedding
-            for name in ("speaker_embedding", "spk_embedding", "speaker_emb", "embedding"):
-                if name in params:
-                    kwargs[name] = spk
-                    break
-
-            if "enable_text_splitting" in params:
-                kwargs["enable_text_splitting"] = True
-
-            if "text" in kwargs:
-                out = tts_model.inference(**kwargs)
-            else:
-                # どうしても text 引数名が見つからない場合は positional で試す
-                out = tts_model.inference(script, "ja", gpt, spk)
-        except Exception:
-            return False
-
-        if out is None:
-            return False
-
-        # out から波形とサンプルレートを抽出
-        wav = None
-        sr = 24000
+            return None
+        entry = self._voice_entry(voice_id, voice_dir)
+        if entry is None:
+            return None
+        if entry.plan is not None:
+            return entry.plan
+        lat = entry.latents
+        if lat.get("gpt") is None or lat.get("spk") is None:
+            return None
         try:
-            if isinstance(out, dict):
-                wav = out.get("wav") or out.get("audio")
-                sr = int(out.get("sample_rate") or out.get("sr") or sr)
-            elif isinstance(out, tuple) and len(out) >= 1:
-                wav = out[0]
-                if len(out) >= 2:
-                    try:
-                        sr = int(out[1])
-                    except Exception:
-                        pass
-            else:
-                wav = out
-        except Exception:
-            return False
-
-        if wav is None:
-            return False
+            plan = LatentInferencePlan.build(
+                tts_model,
+                gpt_cond_latent=lat["gpt"],
+                speaker_embedding=lat["spk"],
+                language=_LANGUAGE,
+                params=_INFERENCE_PARAMS,
+                fallback_device=self._device,
+            )
+        except Exception as e:
+            logger.warning(f"[VoiceGenerator] inference plan unavailable for voice_id={voice_id}: {e}")
+            return None
+        entry.plan = plan
+        return plan
 
-        import numpy as np
-        import soundfile as sf
+    def _try_infer_with_latents(
+        self, *, voice_id: str, script: str, voice_dir: Optional[Path] = None
+    ) -> Optional[tuple["np.ndarray", int]]:
+        """XTTSの latent を直接渡して波形 (float32 mono, sample_rate) を得る（対応していない環境では None）。"""
 
+        if self._fake_tts:
+            return None
+        plan = self._inference_plan(voice_id, voice_dir)
+        if plan is None:
+            return None
         try:
-            import torch
-
-            if isinstance(wav, torch.Tensor):
-                wav = wav.detach().cpu().float().numpy()
-        except Exception:
-            pass
-
-        wav = np.asarray(wav, dtype=np.float32)
-        if wav.ndim > 1:
-            # 念のため mono 化
-            wav = wav.reshape(-1)
-
-        sf.write(str(wav_path), wav, sr)
-        return True
+            result = waveform_from_output(plan(script))
+        except Exception as e:
+            logger.warning(f"[VoiceGenerator] latent inference failed: {e}")
+            return None
+        if result is None:
+            return None
+        wav, sr = result
+        return _as_mono_float32(wav), sr
 
     def build_voice_cache(
         self,
@@ -649,6 +784,7 @@ class VoiceGenerator:
         speaker_wav: Path,
         voice_id: str = "myvoice",
         voice_dir: Optional[Path] = None,
+        samples: Optional[list[Path]] = None,
     ) -> Path:
         """話者埋め込み（XTTS v2 の conditioning latents 等）を事前計算して保存する。
 
@@ -656,12 +792,19 @@ class VoiceGenerator:
         `clone_voice()` で `voice_dir/<voice_id>.pth` にキャッシュとして保存できる。
         生成時は `speaker=<voice_id>` + `voice_dir=...` + `speaker_wav=None` として
         読み込ませる。
+
+        `samples` を渡した場合は、サンプルごとの latent（内容ハッシュでキャッシュ）を
+        集約して voice を作る（`speaker_wav` は使わない）。
         """
 
-        if not speaker_wav.exists():
+        out_dir = (voice_dir or _voices_dir()).resolve()
+        if samples:
+            missing = [p for p in samples if not Path(p).exists()]
+            if missing:
+                raise FileNotFoundError(f"話者サンプルが見つかりません: {missing[0]}")
+        elif not speaker_wav.exists():
             raise FileNotFoundError(f"speaker_wav が見つかりません: {speaker_wav}")
 
-        out_dir = (voice_dir or _voices_dir()).resolve()
         out_dir.mkdir(parents=True, exist_ok=True)
         voice_file = out_dir / f"{voice_id}.pth"
 
@@ -677,22 +820,156 @@ class VoiceGenerator:
         # Coqui TTS の CloningMixin により `<voice_dir>/<speaker_id>.pth` が保存される。
         # XTTS v2 の `_clone_voice()` が `gpt_conditioning_latents` と `speaker_embedding` を生成する。
         tts_model = self._tts.synthesizer.tts_model
-        tts_model.clone_voice(
-            speaker_wav=str(speaker_wav),
-            speaker_id=voice_id,
-            voice_dir=str(out_dir),
-        )
+        # 作り直す前の軽量ファイルは使わせない（読み込み時に新しい .pth から書き直す）
+        compact_path(voice_file).unlink(missing_ok=True)
+        with self._scheduler.model.slot(INTERACTIVE):
+            if samples:
+                self._build_voice_from_samples(tts_model, [Path(p) for p in samples], voice_file)
+            else:
+                tts_model.clone_voice(
+                    speaker_wav=str(speaker_wav),
+                    speaker_id=voice_id,
+                    voice_dir=str(out_dir),
+                )
 
         if not voice_file.exists() or voice_file.stat().st_size == 0:
             raise RuntimeError(f"voice キャッシュ保存に失敗しました: {voice_file}")
 
         # 生成時の再計算を避けるため、保存した .pth を即ロードしてメモリに保持する
+        # （この読み込みで軽量ファイル `<voice_id>.safetensors` も書き出される）
         try:
             self.load_voice_cache(voice_id=voice_id, voice_dir=out_dir)
         except Exception as e:
             logger.warning(f"[VoiceGenerator] voice cache load failed (non-fatal): {e}")
         return voice_file
 
+    def _build_voice_from_samples(self, tts_model: object, samples: list[Path], voice_file: Path) -> None:
+        """サンプルごとの latent を集約し、`clone_voice()` と同じキー名の .pth として保存する。"""
+
+        import torch
+
+        cache = SampleLatentCache(
+            voice_file.parent / "sample_latents",
+            model_key=f"{_MODEL_NAME}:{self._quantize or 'fp32'}",
+        )
+
+        def compute(sample: Path) -> tuple[object, object]:
+            logger.info(f"[VoiceGenerator] computing conditioning latents: {sample.name}")
+            return tts_model.get_conditioning_latents(audio_path=[str(sample)])  # type: ignore[attr-defined]
+
+        gpt, spk, entries = cache.build(samples, compute)
+        tmp = voice_file.with_name(voice_file.name + ".tmp")
+        torch.save(
+            {
+                "gpt_conditioning_latents": gpt,
+                "speaker_embedding": spk,
+                "metadata": {"samples": [e.sample.name for e in entries], "sample_keys": [e.key for e in entries]},
+            },
+            str(tmp),
+        )
+        os.replace(tmp, voice_file)
+
+    def synth_cache_stats(self) -> dict[str, object]:
+        return self._synth_cache.stats()
+
+    def coalesce_stats(self) -> dict[str, object]:
+        return {**self._flights.stats(), "rows_copied": self._rows_copied}
+
+    def quantize_stats(self) -> Optional[dict[str, object]]:
+        """量子化モードの統計（fp32 のときは None）。"""
+        return dict(self._quantize_stats) if self._quantize and self._quantize_stats else None
+
+    def _voice_digest(
+        self,
+        *,
+        speaker_wav: Optional[Path],
+        voice_id: Optional[str],
+        voice_dir: Optional[Path],
+    ) -> Optional[str]:
+        """話者を特定するハッシュ（voice キャッシュ .pth または speaker_wav の内容）。"""
+
+        if voice_id and voice_dir:
+            voice_file = Path(voice_dir).resolve() / f"{voice_id}.pth"
+            if not voice_file.exists():
+                return None
+            return file_digest(voice_file)
+        if speaker_wav is not None and Path(speaker_wav).exists():
+            return file_digest(Path(speaker_wav))
+        return None
+
+    def _synth_key(
+        self,
+        *,
+        script: str,
+        speaker_wav: Optional[Path],
+        voice_id: Optional[str],
+        voice_dir: Optional[Path],
+    ) -> Optional[str]:
+        """合成条件のキーを返す（話者を特定できない場合は None）。
+
+        script="" で呼ぶと「原稿以外の合成条件」のキーになり、マニフェストの voice_key に使う。
+        """
+
+        voice_digest = self._voice_digest(speaker_wav=speaker_wav, voice_id=voice_id, voice_dir=voice_dir)
+        if not voice_digest:
+            return None
+        return make_cache_key(
+            script=script,
+            voice_id=voice_id or "",
+            voice_digest=voice_digest,
+            model_name="fake" if self._fake_tts else _MODEL_NAME,
+            language=_LANGUAGE,
+            # 量子化モデルの出力は fp32 と一致しないため、別のキャッシュエントリにする
+            params={**_INFERENCE_PARAMS, "quantize": self._quantize} if self._quantize else _INFERENCE_PARAMS,
+        )
+
+    def _record_manifest(
+        self,
+        *,
+        out_dir: Path,
+        index: int,
+        script: str,
+        mp3_path: Path,
+        speaker_wav: Optional[Path],
+        voice_id: Optional[str],
+        voice_dir: Optional[Path],
+    ) -> None:
+        try:
+            voice_key = self._synth_key(script="", speaker_wav=speaker_wav, voice_id=voice_id, voice_dir=voice_dir)
+            record_rows(
+                out_dir,
+                {
+                    index: {
+                        "script_sha": script_digest(script),
+                        "voice_key": voice_key or "",
+                        "file": mp3_path.name,
+                        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    }
+                },
+            )
+        except Exception as e:
+            logger.warning(f"[VoiceGenerator] manifest update failed index={index}: {e}")
+
+    def diff_script_rows(
+        self,
+        rows: list[ScriptRow],
+        *,
+        output_dir: Optional[Path] = None,
+        speaker_wav: Optional[Path] = None,
+        voice_id: Optional[str] = None,
+        voice_dir: Optional[Path] = None,
+    ) -> ScriptDiff:
+        """原稿行と output/manifest.json の差分（空原稿の行は対象外）。"""
+
+        out_dir = output_dir or _output_dir()
+        voice_key = self._synth_key(script="", speaker_wav=speaker_wav, voice_id=voice_id, voice_dir=voice_dir)
+        return diff_rows(
+            [(r.index, r.script) for r in rows if r.script.strip()],
+            load_manifest(out_dir),
+            output_dir=out_dir,
+            voice_key=voice_key,
+        )
+
     def generate_one(
         self,
         *,
@@ -703,7 +980,92 @@ class VoiceGenerator:
         voice_dir: Optional[Path] = None,
         output_dir: Optional[Path] = None,
         overwrite: bool = True,
+        use_cache: bool = True,
+        priority: str = INTERACTIVE,
+    ) -> Path:
+        """1行ぶんの MP3 を生成する。進捗は "row" イベント（started/wav_done/mp3_done/error）で通知する。"""
+
+        publish_event("row", stage="started", index=index)
+        out_key = str((output_dir or _output_dir()).resolve())
+        # use_cache / overwrite が違う呼び出しは結果の意味が違う（新規合成・FileExistsError）ためまとめない
+        key = (
+            out_key,
+            index,
+            script,
+            str(speaker_wav or ""),
+            voice_id or "",
+            str(voice_dir or ""),
+            use_cache,
+            overwrite,
+        )
+        try:
+            path, shared = self._flights.do(
+                key,
+                lambda: self._generate_one(
+                    index=index,
+                    script=script,
+                    speaker_wav=speaker_wav,
+                    voice_id=voice_id,
+                    voice_dir=voice_dir,
+                    output_dir=output_dir,
+                    overwrite=overwrite,
+                    use_cache=use_cache,
+                    priority=priority,
+                ),
+            )
+            if shared:
+                logger.info(f"[VoiceGenerator] coalesced duplicate request index={index} -> {path}")
+                # 先行する呼び出しの mp3_done とは別に、この呼び出しの完了も通知する
+                publish_event("row", stage="mp3_done", index=index, path=str(path), cached=False, coalesced=True)
+            return path
+        except Exception as e:
+            publish_event("row", stage="error", index=index, error=str(e))
+            raise
+
+    def _generate_one(
+        self,
+        *,
+        index: int,
+        script: str,
+        speaker_wav: Optional[Path],
+        voice_id: Optional[str],
+        voice_dir: Optional[Path],
+        output_dir: Optional[Path],
+        overwrite: bool,
+        use_cache: bool,
+        priority: str,
     ) -> Path:
+        task = self._begin_row(
+            index=index,
+            script=script,
+            speaker_wav=speaker_wav,
+            voice_id=voice_id,
+            voice_dir=voice_dir,
+            output_dir=output_dir,
+            overwrite=overwrite,
+            use_cache=use_cache,
+            priority=priority,
+        )
+        if task.cached:
+            return task.mp3_path
+        self._synthesize_row(task)
+        return self._encode_row(task)
+
+    def _begin_row(
+        self,
+        *,
+        index: int,
+        script: str,
+        speaker_wav: Optional[Path],
+        voice_id: Optional[str],
+        voice_dir: Optional[Path],
+        output_dir: Optional[Path],
+        overwrite: bool,
+        use_cache: bool,
+        priority: str = BULK,
+    ) -> "_RowTask":
+        """出力先の決定・上書き確認・合成キャッシュ参照（ヒット時は task.cached=True）。"""
+
         out_dir = output_dir or _output_dir()
         out_dir.mkdir(parents=True, exist_ok=True)
 
@@ -711,86 +1073,412 @@ class VoiceGenerator:
         if mp3_path.exists() and not overwrite:
             raise FileExistsError(f"既存ファイルの上書きは禁止されています: {mp3_path}")
 
-        temp_dir = out_dir / "temp"
-        temp_dir.mkdir(parents=True, exist_ok=True)
-        wav_path = temp_dir / f"voice_{index:03d}.wav"
+        task = _RowTask(
+            index=index,
+            script=script,
+            out_dir=out_dir,
+            mp3_path=mp3_path,
+            wav_path=out_dir / "temp" / f"voice_{index:03d}.wav",
+            speaker_wav=speaker_wav,
+            voice_id=voice_id,
+            voice_dir=voice_dir,
+            priority=priority,
+        )
+
+        if use_cache and self._synth_cache.max_bytes > 0:
+            try:
+                task.cache_key = self._synth_key(
+                    script=script, speaker_wav=speaker_wav, voice_id=voice_id, voice_dir=voice_dir
+                )
+            except Exception as e:
+                logger.warning(f"[VoiceGenerator] synth cache key failed: {e}")
+                task.cache_key = None
+            if task.cache_key and self._synth_cache.fetch(task.cache_key, mp3_path):
+                logger.info(f"[VoiceGenerator] synth cache hit index={index} key={task.cache_key[:12]} -> {mp3_path}")
+                self._record_manifest(
+                    out_dir=out_dir,
+                    index=index,
+                    script=script,
+                    mp3_path=mp3_path,
+                    speaker_wav=speaker_wav,
+                    voice_id=voice_id,
+                    voice_dir=voice_dir,
+                )
+                publish_event("row", stage="mp3_done", index=index, path=str(mp3_path), cached=True)
+                task.cached = True
+        return task
+
+    def open_stream(
+        self,
+        *,
+        index: int,
+        script: str,
+        speaker_wav: Optional[Path] = None,
+        voice_id: Optional[str] = None,
+        voice_dir: Optional[Path] = None,
+        output_dir: Optional[Path] = None,
+        overwrite: bool = True,
+        use_cache: bool = True,
+        priority: str = INTERACTIVE,
+    ) -> AudioStream:
+        """1行ぶんを推論しながら MP3 を逐次返すストリームを開く。
+
+        上書き確認と合成キャッシュ参照はここで行う（ヒット時は保存済み MP3 をそのまま返す）。
+        反復し終えると全体を voice_XXX.mp3 として保存し、キャッシュ・マニフェストも更新する。
+        途中で反復をやめた場合は推論を打ち切り、ファイルは更新しない。
+        """
+
+        publish_event("row", stage="started", index=index)
+        try:
+            task = self._begin_row(
+                index=index,
+                script=script,
+                speaker_wav=speaker_wav,
+                voice_id=voice_id,
+                voice_dir=voice_dir,
+                output_dir=output_dir,
+                overwrite=overwrite,
+                use_cache=use_cache,
+                priority=priority,
+            )
+        except Exception as e:
+            publish_event("row", stage="error", index=index, error=str(e))
+            raise
+        if task.cached:
+            return AudioStream(index=index, path=task.mp3_path, cached=True, chunks=iter_file(task.mp3_path))
+        return AudioStream(index=index, path=task.mp3_path, cached=False, chunks=self._stream_row(task))
+
+    def _stream_row(self, task: "_RowTask") -> Iterator[bytes]:
+        import numpy as np
+
+        index = task.index
+        result = StreamResult()
+        encoder = Mp3StreamEncoder(self._output_sample_rate(), _MP3_ARGS)
+
+        def on_first_audio(seconds: float) -> None:
+            logger.info(f"[VoiceGenerator] stream first audio index={index} in {seconds:.3f}s")
+            publish_event("row", stage="first_audio", index=index, seconds=round(seconds, 3))
 
+        try:
+            yield from pump_stream(
+                self._gated_waveforms(task),
+                encoder,
+                result,
+                to_pcm=_pcm16_bytes,
+                on_first_audio=on_first_audio,
+            )
+        except GeneratorExit:
+            publish_event("row", stage="error", index=index, error="stream cancelled")
+            raise
+        except Exception as e:
+            logger.exception(f"[VoiceGenerator] stream failed index={index}")
+            publish_event("row", stage="error", index=index, error=str(e))
+            raise
+
+        # 送出済みの音声を保存する。ここでの失敗は応答を壊さないようログとイベントで通知する
+        # （MP3 はストリームとは別に通常どおりエンコードし、VBR ヘッダ付きのファイルにする）
+        task.audio = np.concatenate(result.chunks) if result.chunks else np.zeros((0,), dtype=np.float32)
+        task.synth_seconds = result.synth_seconds
         logger.info(
-            f"[VoiceGenerator] start index={index} wav={wav_path.name} mp3={mp3_path.name} "
+            f"[VoiceGenerator] stream done index={index} synth={result.synth_seconds:.3f}s "
+            f"first_audio={result.first_audio_seconds or 0.0:.3f}s samples={task.audio.size}"
+        )
+        try:
+            if task.audio.size == 0:
+                raise RuntimeError(f"音声生成に失敗しました（波形が空です）: index={index}")
+            _publish_wav_done(task)
+            self._encode_row(task)
+        except Exception as e:
+            logger.exception(f"[VoiceGenerator] stream persist failed index={index}")
+            publish_event("row", stage="error", index=index, error=str(e))
+
+    def _gated_waveforms(self, task: "_RowTask") -> Iterator["np.ndarray"]:
+        """ストリーミング推論の波形チャンクを、チャンクごとにモデルの枠を取って進める。
+
+        行全体で枠を持ち続けると、受信側が遅い間もほかの生成を止めてしまうため。
+        推論ワーカープールが動いている場合は、ストリームの間ワーカー 1 つぶんの枠を取る
+        （親とワーカーを合わせた同時推論数をワーカー数に抑える）。
+        """
+
+        procs = self._procs
+        waveforms = self._iter_stream_waveforms(task)
+        try:
+            with procs.reserve(task.priority) if procs is not None else nullcontext():
+                while True:
+                    with self._scheduler.model.slot(task.priority):
+                        chunk = next(waveforms, None)
+                    if chunk is None:
+                        return
+                    yield chunk
+        finally:
+            waveforms.close()
+
+    def _iter_stream_waveforms(self, task: "_RowTask") -> Iterator["np.ndarray"]:
+        """ストリーミング推論の波形チャンクを順に返す。使えない場合は行全体を 1 チャンクで返す。"""
+
+        if self._fake_tts:
+            import numpy as np
+
+            # 0.25 秒ずつ返す（合計の長さは通常生成と同じ）
+            sr = 24000
+            remaining = int(sr * _fake_audio_seconds(task.script))
+            while remaining > 0:
+                n = min(remaining, sr // 4)
+                remaining -= n
+                yield np.zeros((n,), dtype=np.float32)
+            return
+
+        latents = None
+        tts_model = getattr(getattr(self._tts, "synthesizer", None), "tts_model", None)
+        if tts_model is not None and hasattr(tts_model, "inference_stream"):
+            try:
+                latents = self._stream_latents(task, tts_model)
+            except Exception as e:
+                logger.warning(f"[VoiceGenerator] stream latents unavailable: {e}")
+        if latents is None:
+            logger.info(f"[VoiceGenerator] streaming inference unavailable; synthesizing whole row index={task.index}")
+            self._synthesize_local(task)
+            audio, task.audio = task.audio, None
+            if audio is not None:
+                yield audio
+            return
+
+        import inspect
+
+        gpt, spk = latents
+        params = inspect.signature(tts_model.inference_stream).parameters
+        kwargs: dict[str, object] = {k: v for k, v in _INFERENCE_PARAMS.items() if k in params}
+        if "stream_chunk_size" in params:
+            kwargs["stream_chunk_size"] = _stream_chunk_size()
+        logger.info(f"[VoiceGenerator] streaming inference index={task.index} script_len={len(task.script)}")
+        for chunk in tts_model.inference_stream(task.script, _LANGUAGE, gpt, spk, **kwargs):
+            yield _as_mono_float32(chunk)
+
+    def _stream_latents(self, task: "_RowTask", tts_model: object) -> Optional[tuple[object, object]]:
+        """ストリーミング推論に渡す (gpt_cond_latent, speaker_embedding)。
+
+        voice キャッシュがあればレジストリの latent を使い、speaker_wav 指定時は
+        話者サンプルから計算して同じレジストリにメモ化する（ファイルの更新時刻・サイズで読み直す）。
+        """
+
+        if task.voice_id and task.voice_dir:
+            plan = self._inference_plan(task.voice_id, task.voice_dir)
+            if plan is None:
+                return None
+            # プラン作成時にモデルのデバイスへ載せ済み
+            return plan.gpt_cond_latent, plan.speaker_embedding
+        if task.speaker_wav is None:
+            return None
+
+        speaker = task.speaker_wav.resolve()
+
+        def compute() -> dict[str, object]:
+            gpt, spk = tts_model.get_conditioning_latents(audio_path=[str(speaker)])  # type: ignore[attr-defined]
+            return {"gpt": gpt, "spk": spk, "source": str(speaker)}
+
+        entry = self._voices.get(f"speaker_wav:{speaker}", source=speaker, loader=compute)
+        lat = entry.latents if entry is not None else {}
+        if lat.get("gpt") is None or lat.get("spk") is None:
+            return None
+
+        device = model_device(tts_model, self._device)
+        return pin_to_device(lat["gpt"], device), pin_to_device(lat["spk"], device)
+
+    def _synthesize_row(self, task: "_RowTask") -> None:
+        """推論して task.audio / task.sample_rate に波形を載せる（モデルを使う段）。
+
+        ワーカープールが有効ならワーカープロセスで推論し、結果を受け取る（割り当て待ちは
+        優先度順なので、1 行プレビューは一括生成の先行投入分より先にワーカーへ渡る）。
+        """
+
+        procs = self._synth_pool()
+        if procs is not None:
+            self._apply_synth_result(task, procs.submit(task, priority=task.priority).result())
+        else:
+            with self._scheduler.model.slot(task.priority):
+                self._synthesize_local(task)
+        _publish_wav_done(task)
+
+    def _synthesize_in_worker(self, task: "_RowTask") -> tuple["np.ndarray", int, float]:
+        """ワーカープロセス側のエントリ（fork 時に親の self を引き継ぐ）。"""
+        self._synthesize_local(task)
+        assert task.audio is not None
+        return task.audio, task.sample_rate, task.synth_seconds
+
+    @staticmethod
+    def _apply_synth_result(task: "_RowTask", result: tuple["np.ndarray", int, float]) -> None:
+        task.audio, task.sample_rate, task.synth_seconds = result
+
+    def _synth_pool(self) -> Optional[SynthWorkerPool]:
+        """SVM_SYNTH_WORKERS>1 のとき、推論ワーカープールを返す（初回の呼び出しで fork する）。
+
+        通常はモデルのロード直後に VoiceGenerator の初期化から呼ばれ、親で推論する前に fork する。
+        """
+
+        with self._procs_lock:
+            if self._procs is not None or self._procs_disabled:
+                return self._procs
+            self._procs_disabled = True
+            workers, threads = _synth_workers(), _synth_threads()
+            if workers <= 1:
+                return None
+            if not fork_supported():
+                logger.warning("[VoiceGenerator] SVM_SYNTH_WORKERS is ignored: fork is not available on this platform")
+                return None
+            if str(self._device).startswith("cuda"):
+                logger.warning("[VoiceGenerator] SVM_SYNTH_WORKERS is ignored on CUDA (fork cannot share CUDA context)")
+                return None
+            self._procs = SynthWorkerPool(self._synthesize_in_worker, workers=workers, threads_per_worker=threads)
+            return self._procs
+
+    def close_synth_pool(self) -> None:
+        """推論ワーカープールを閉じる（作り直さない。以降の推論は親プロセスで行う）。
+
+        親で推論した後に fork し直すと GNU OpenMP でデッドロックしうるため、ワーカー数を変えるときは
+        プロセスごと作り直す（perf_profile は設定ごとに子プロセスを起動する）。
+        """
+
+        with self._procs_lock:
+            procs, self._procs = self._procs, None
+            self._procs_disabled = True
+        if procs is not None:
+            procs.close()
+
+    def _apply_perf_profile(self) -> None:
+        """perf_profile.json の torch スレッド数を適用する（SVM_TORCH_THREADS 等の明示指定が優先）。"""
+
+        profile = load_profile()
+        intra = _env_or_profile("SVM_TORCH_THREADS", "intra_op_threads")
+        inter = _env_or_profile("SVM_TORCH_INTEROP_THREADS", "inter_op_threads")
+        if profile:
+            logger.info(
+                f"[VoiceGenerator] perf profile: "
+                + " ".join(f"{k}={profile.get(k)}" for k in ("intra_op_threads", "inter_op_threads", "synth_workers", "batch_size"))
+                + f" rtf={profile.get('rtf')}"
+            )
+        if _synth_workers() > 1:
+            # ワーカーは fork 後にそれぞれスレッド数を設定するため、親は inter-op だけ揃える
+            intra = None
+        if intra or inter:
+            apply_torch_threads(intra, inter)
+            logger.info(f"[VoiceGenerator] torch threads: intra_op={intra or 'default'} inter_op={inter or 'default'}")
+
+    def synth_pool_stats(self) -> Optional[dict[str, object]]:
+        return self._procs.stats() if self._procs is not None else None
+
+    def _synthesize_local(self, task: "_RowTask") -> None:
+        index, script = task.index, task.script
+        speaker_wav, voice_id, voice_dir = task.speaker_wav, task.voice_id, task.voice_dir
+
+        logger.info(
+            f"[VoiceGenerator] start index={index} mp3={task.mp3_path.name} "
             f"speaker_wav={speaker_wav} voice_id={voice_id} voice_dir={voice_dir}"
         )
 
+        t0 = time.perf_counter()
         if self._fake_tts:
-            # script長に応じて最短0.4秒〜最長8秒の無音を生成
             import numpy as np
-            import soundfile as sf
 
             sr = 24000
-            seconds = min(8.0, max(0.4, 0.06 * len(script)))
-            samples = int(sr * seconds)
-            audio = np.zeros((samples,), dtype=np.float32)
-            sf.write(str(wav_path), audio, sr)
+            seconds = _fake_audio_seconds(script)
+            task.audio = np.zeros((int(sr * seconds),), dtype=np.float32)
+            task.sample_rate = sr
         else:
             if self._tts is None:
                 raise RuntimeError("TTSモデルが初期化されていません")
 
-            # XTTS は WAV 生成が安定しやすいので一旦 WAV → MP3
-            logger.info(f"[VoiceGenerator] Generating WAV... script_len={len(script)}")
-            t0 = time.perf_counter()
+            # 波形はメモリ上で受け取り、エンコード段で ffmpeg の stdin へ直接流す
+            logger.info(f"[VoiceGenerator] Generating waveform... script_len={len(script)}")
+            result: Optional[tuple["np.ndarray", int]] = None
             if voice_id and voice_dir:
                 # 事前構築済み voice キャッシュを優先利用
-                # 1) 可能なら .pth を明示ロードして latent をメモリ再利用
-                if voice_id not in self._voice_latents:
-                    try:
-                        self.load_voice_cache(voice_id=voice_id, voice_dir=Path(voice_dir).resolve())
-                    except Exception as e:
-                        logger.warning(f"[VoiceGenerator] load_voice_cache failed: {e}")
-
-                # 2) 対応していれば latent を直接渡す経路（最速）
-                used_latents = False
+                # 1) レジストリの latent（未登録なら .pth を遅延ロード）を直接渡す経路（最速）
                 try:
-                    used_latents = self._try_generate_wav_with_latents(voice_id=voice_id, script=script, wav_path=wav_path)
+                    result = self._try_infer_with_latents(voice_id=voice_id, script=script, voice_dir=Path(voice_dir))
                 except Exception as e:
-                    used_latents = False
+                    result = None
                     logger.error(f"[VoiceGenerator] latent inference failed, fallback: {e}")
 
-                if used_latents:
+                if result is not None:
                     logger.info(f"[VoiceGenerator] Using in-memory voice latents: voice_id={voice_id}")
                 else:
-                    # 3) フォールバック: Coqui TTS 側の speaker/voice_dir 経路（.pthを内部で読む）
-                    logger.info(f"[VoiceGenerator] Fallback to tts_to_file (re-loading pth internally)")
-                    self._tts.tts_to_file(
+                    # 2) フォールバック: Coqui TTS 側の speaker/voice_dir 経路（.pthを内部で読む）
+                    logger.info(f"[VoiceGenerator] Fallback to tts() (re-loading pth internally)")
+                    wav = self._tts.tts(
                         text=script,
                         speaker=voice_id,
                         speaker_wav=None,
-                        language="ja",
-                        file_path=str(wav_path),
+                        language=_LANGUAGE,
                         voice_dir=str(Path(voice_dir).resolve()),
                     )
+                    result = (_as_mono_float32(wav), self._output_sample_rate())
             else:
                 if speaker_wav is None:
                     raise ValueError("speaker_wav または (voice_id, voice_dir) のどちらかが必要です")
-                self._tts.tts_to_file(
+                wav = self._tts.tts(
                     text=script,
                     speaker_wav=str(speaker_wav),
-                    language="ja",
-                    file_path=str(wav_path),
+                    language=_LANGUAGE,
                 )
-            t1 = time.perf_counter()
-            
-            if not wav_path.exists() or wav_path.stat().st_size == 0:
-                raise RuntimeError(f"WAV生成に失敗しました（ファイルが存在しないか空です）: {wav_path}")
-            logger.info(f"[VoiceGenerator] WAV generated: {wav_path} (size={wav_path.stat().st_size} bytes)")
-            logger.info(f"[VoiceGenerator] WAV generation time: {(t1 - t0):.3f}s")
-
-        t2 = time.perf_counter()
-        _ffmpeg_encode_to_mp3(wav_path, mp3_path)
-        t3 = time.perf_counter()
+                result = (_as_mono_float32(wav), self._output_sample_rate())
+
+            task.audio, task.sample_rate = result
+            if task.audio.size == 0:
+                raise RuntimeError(f"音声生成に失敗しました（波形が空です）: index={index}")
+            logger.info(
+                f"[VoiceGenerator] waveform generated: samples={task.audio.size} sr={task.sample_rate} index={index}"
+            )
+        task.synth_seconds = time.perf_counter() - t0
+        logger.info(f"[VoiceGenerator] synth time: {task.synth_seconds:.3f}s index={index}")
+
+    def _output_sample_rate(self) -> int:
+        synthesizer = getattr(self._tts, "synthesizer", None)
+        try:
+            return int(getattr(synthesizer, "output_sample_rate", 0) or 24000)
+        except (TypeError, ValueError):
+            return 24000
+
+    def _encode_row(self, task: "_RowTask") -> Path:
+        """波形 → MP3 エンコードと後処理（キャッシュ登録・マニフェスト更新）。モデルは使わない。"""
+
+        index, mp3_path = task.index, task.mp3_path
+        if task.audio is None:
+            raise RuntimeError(f"エンコード対象の波形がありません: index={index}")
+        with self._scheduler.ffmpeg.slot(task.priority):
+            t2 = time.perf_counter()
+            if _keep_wav():
+                import soundfile as sf
+
+                task.wav_path.parent.mkdir(parents=True, exist_ok=True)
+                sf.write(str(task.wav_path), task.audio, task.sample_rate)
+                logger.info(f"[VoiceGenerator] WAV kept: {task.wav_path}")
+                _ffmpeg_encode_to_mp3(task.wav_path, mp3_path)
+            else:
+                _encode_pcm_to_mp3(task.audio, task.sample_rate, mp3_path)
+            t3 = time.perf_counter()
+        task.audio_seconds = len(task.audio) / task.sample_rate if task.sample_rate else 0.0
+        # 大きな波形配列は早めに手放す（パイプライン中は複数行分を保持するため）
+        task.audio = None
         if not mp3_path.exists() or mp3_path.stat().st_size == 0:
              raise RuntimeError(f"MP3変換に失敗しました（ファイルが存在しないか空です）: {mp3_path}")
 
-        logger.info(f"[VoiceGenerator] MP3 encode time: {(t3 - t2):.3f}s")
+        task.encode_seconds = t3 - t2
+        logger.info(f"[VoiceGenerator] MP3 encode time: {task.encode_seconds:.3f}s index={index}")
+        if task.cache_key:
+            self._synth_cache.store(task.cache_key, mp3_path)
+        self._record_manifest(
+            out_dir=task.out_dir,
+            index=index,
+            script=task.script,
+            mp3_path=mp3_path,
+            speaker_wav=task.speaker_wav,
+            voice_id=task.voice_id,
+            voice_dir=task.voice_dir,
+        )
         logger.info(f"[VoiceGenerator] done index={index} -> {mp3_path} (size={mp3_path.stat().st_size} bytes)")
+        publish_event(
+            "row", stage="mp3_done", index=index, path=str(mp3_path), cached=False, encode_seconds=round(task.encode_seconds, 3)
+        )
         return mp3_path
 
     def generate_from_csv(
@@ -802,26 +1490,469 @@ class VoiceGenerator:
         voice_dir: Optional[Path] = None,
         output_dir: Optional[Path] = None,
         overwrite: bool = True,
+        use_cache: bool = True,
+        only_changed: bool = False,
+        on_row: Optional[RowCallback] = None,
+        cancel_event: Optional[threading.Event] = None,
+        batch_size: Optional[int] = None,
     ) -> list[Path]:
         rows = load_script_csv(script_csv_path)
         if not rows:
             raise ValueError("有効な原稿データが見つかりません")
 
-        generated: list[Path] = []
-        for r in rows:
-            if not r.script.strip():
-                continue
-            generated.append(
-                self.generate_one(
-                    index=r.index,
-                    script=r.script,
-                    speaker_wav=speaker_wav,
-                    voice_id=voice_id,
-                    voice_dir=voice_dir,
-                    output_dir=output_dir,
-                    overwrite=overwrite,
+        return self.generate_rows(
+            rows,
+            speaker_wav=speaker_wav,
+            voice_id=voice_id,
+            voice_dir=voice_dir,
+            output_dir=output_dir,
+            overwrite=overwrite,
+            use_cache=use_cache,
+            only_changed=only_changed,
+            on_row=on_row,
+            cancel_event=cancel_event,
+            batch_size=batch_size,
+        )
+
+    def _resolve_batch_size(
+        self, batch_size: Optional[int], *, voice_id: Optional[str], voice_dir: Optional[Path]
+    ) -> int:
+        """実際に使うバッチサイズ。バッチ推論できない条件では 1（従来の行ごとループ）に落とす。"""
+
+        size = _tts_batch_size() if batch_size is None else max(1, int(batch_size))
+        if size == 1 or self._fake_tts:
+            return size
+        if not (voice_id and voice_dir):
+            # speaker_wav 経路は latent をメモリに持たないため、行ごとの推論を使う
+            logger.info("[VoiceGenerator] batch inference needs voice_id/voice_dir; using per-row loop")
+            return 1
+        if self._batch_runner(voice_id=voice_id, voice_dir=Path(voice_dir)) is None:
+            return 1
+        return size
+
+    def _batch_runner(self, *, voice_id: str, voice_dir: Path) -> Optional[XttsBatchRunner]:
+        if self._tts is None or self._tts.synthesizer is None or self._tts.synthesizer.tts_model is None:
+            return None
+        plan = self._inference_plan(voice_id, voice_dir)
+        if plan is None:
+            return None
+        try:
+            return XttsBatchRunner(
+                self._tts.synthesizer.tts_model,
+                gpt_cond_latent=plan.gpt_cond_latent,
+                speaker_embedding=plan.speaker_embedding,
+                language=_LANGUAGE,
+            )
+        except Exception as e:
+            logger.warning(f"[VoiceGenerator] batch inference unavailable, using per-row loop: {e}")
+            return None
+
+    def _infer_chunk_batch(
+        self,
+        runner: Optional[XttsBatchRunner],
+        chunks: list[Chunk],
+        *,
+        voice_id: Optional[str],
+        voice_dir: Optional[Path],
+    ) -> tuple[list["np.ndarray"], int]:
+        if runner is None:
+            # フェイク: 文字数に応じた無音
+            import numpy as np
+
+            sr = 24000
+            return [np.zeros((int(sr * max(0.2, 0.06 * len(c.text))),), dtype=np.float32) for c in chunks], sr
+
+        sr = self._output_sample_rate()
+        try:
+            return runner.run([c.text for c in chunks]), sr
+        except Exception as e:
+            # バッチ経路が使えないモデル/版では、同じ latent でチャンクごとに推論する
+            # （voice_dir も渡し、runner を作った後にレジストリから外れた voice を読み直せるようにする）
+            logger.warning(f"[VoiceGenerator] batched inference failed, fallback to per-chunk: {e}")
+            audios: list["np.ndarray"] = []
+            for c in chunks:
+                result = self._try_infer_with_latents(voice_id=voice_id or "", script=c.text, voice_dir=voice_dir)
+                if result is None:
+                    raise RuntimeError(f"チャンクの推論に失敗しました: index={c.index}") from e
+                audios.append(result[0])
+                sr = result[1]
+            return audios, sr
+
+    def _synthesize_batched(
+        self,
+        tasks: list["_RowTask"],
+        *,
+        batch_size: int,
+        start_row: Callable[[int], float],
+        on_ready: Callable[["_RowTask", float], None],
+        on_error: Callable[[int, BaseException], None],
+        cancel_event: Optional[threading.Event] = None,
+    ) -> None:
+        """文チャンクを長さ順にバッチ推論し、行の全チャンクが揃った順に on_ready へ渡す。"""
+
+        voice_id, voice_dir = tasks[0].voice_id, tasks[0].voice_dir
+        runner = None
+        if not self._fake_tts and voice_id and voice_dir:
+            runner = self._batch_runner(voice_id=voice_id, voice_dir=Path(voice_dir))
+        by_index = {t.index: t for t in tasks}
+        chunks = split_chunks(
+            [(t.index, t.script) for t in tasks],
+            split=runner.split if runner else split_sentences,
+            measure=runner.measure if runner else len,
+        )
+        groups = plan_batches(chunks, batch_size)
+        assembler = RowAssembler(chunks)
+        row_started: dict[int, float] = {}
+        t_batches = time.perf_counter()
+
+        try:
+            for group in groups:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise GenerationCancelled("生成がキャンセルされました（バッチ推論中）")
+                for c in group:
+                    if c.index not in row_started:
+                        row_started[c.index] = start_row(c.index)
+
+                with self._scheduler.model.slot(tasks[0].priority):
+                    t0 = time.perf_counter()
+                    audios, sr = self._infer_chunk_batch(
+                        runner, group, voice_id=voice_id, voice_dir=Path(voice_dir) if voice_dir else None
+                    )
+                    dt = time.perf_counter() - t0
+                total_len = sum(max(1, c.length) for c in group)
+                logger.info(
+                    f"[VoiceGenerator] batch size={len(group)} lengths={[c.length for c in group]} time={dt:.3f}s"
                 )
+
+                for c, audio in zip(group, audios):
+                    task = by_index[c.index]
+                    # バッチの所要時間をチャンク長で按分して行の推論時間とする
+                    task.synth_seconds += dt * max(1, c.length) / total_len
+                    row_audio = assembler.add(c, audio)
+                    if row_audio is None:
+                        continue
+                    task.audio, task.sample_rate = row_audio, sr
+                    _publish_wav_done(task)
+                    on_ready(task, row_started[task.index])
+                    row_started.pop(task.index)
+        except Exception as e:
+            # 推論途中だった行をエラーとして通知してから送出する
+            if not isinstance(e, GenerationCancelled):
+                for index in sorted(row_started):
+                    on_error(index, e)
+            raise
+
+        logger.info(
+            f"[VoiceGenerator] batched inference rows={len(tasks)} chunks={len(chunks)} "
+            f"batches={len(groups)} time={time.perf_counter() - t_batches:.3f}s"
+        )
+
+    def generate_rows(
+        self,
+        rows: list[ScriptRow],
+        *,
+        speaker_wav: Optional[Path] = None,
+        voice_id: Optional[str] = None,
+        voice_dir: Optional[Path] = None,
+        output_dir: Optional[Path] = None,
+        overwrite: bool = True,
+        use_cache: bool = True,
+        only_changed: bool = False,
+        on_row: Optional[RowCallback] = None,
+        cancel_event: Optional[threading.Event] = None,
+        batch_size: Optional[int] = None,
+        priority: str = BULK,
+    ) -> list[Path]:
+        """原稿行をまとめて生成する（空原稿の行はスキップ）。
+
+        only_changed=True の場合は output/manifest.json との差分を取り、追加・変更行だけを
+        再合成する。原稿から消えた index の MP3 は削除する。戻り値は原稿の全行ぶんの出力パス。
+
+        on_row(event, index, info) には "started" / "done" / "skipped" / "error" が通知される。
+        cancel_event がセットされると、次の行に進む前に GenerationCancelled を送出する。
+        batch_size>1（未指定時は SVM_TTS_BATCH_SIZE）で、文チャンクを長さ順にまとめてバッチ推論する。
+        priority はモデル・ffmpeg の空き待ちでの優先度クラス（既定は bulk）。
+        """
+
+        def notify(event: str, index: int, **info: object) -> None:
+            if on_row is None:
+                return
+            try:
+                on_row(event, index, info)
+            except Exception as e:
+                logger.warning(f"[VoiceGenerator] on_row callback failed ({event} index={index}): {e}")
+
+        out_dir = output_dir or _output_dir()
+        targets: Optional[set[int]] = None
+        if only_changed:
+            diff = self.diff_script_rows(
+                rows, output_dir=out_dir, speaker_wav=speaker_wav, voice_id=voice_id, voice_dir=voice_dir
+            )
+            logger.info(
+                f"[VoiceGenerator] only_changed: added={diff.added} changed={diff.changed} "
+                f"removed={diff.removed} unchanged={len(diff.unchanged)}"
             )
+            targets = set(diff.targets)
+            for i in diff.removed:
+                try:
+                    (out_dir / f"voice_{i:03d}.mp3").unlink(missing_ok=True)
+                except OSError as e:
+                    logger.warning(f"[VoiceGenerator] failed to remove stale output index={i}: {e}")
+            if diff.removed:
+                forget_rows(out_dir, diff.removed)
+
+        # 推論（モデル）と MP3 エンコード（ffmpeg）をパイプライン化する:
+        # 行Nのエンコードを常駐ワーカーへ渡している間に、行N+1の推論を始める。
+        # 同時に抱えるエンコード待ちは上限付き（キューが満杯なら推論側が待つ）。
+        encode_pool = get_encoder_pool()
+        pending: list[tuple[int, Future[Path]]] = []
+        generated: list[Path] = []
+        synth_total = 0.0
+        encode_total = 0.0
+        stats_lock = threading.Lock()
+        # 完了コールバックは wait() が返った後に走ることがあるため、全行の通知が済むまで待つ
+        notified = threading.Semaphore(0)
+        t_pipeline = time.perf_counter()
+
+        # 同じ原稿の行は最初の行だけ合成し、その MP3 を複製する。
+        # 原稿 → 最初の行の index、最初の行 → 完了待ちの複製先、完了済みの行 → 結果（失敗時は例外）
+        first_by_script: dict[str, int] = {}
+        waiting_copies: dict[int, list[tuple[ScriptRow, float]]] = {}
+        finished: dict[int, object] = {}
+        copy_errors: list[tuple[int, BaseException]] = []
+        copied = 0
+
+        def copy_row(src: _RowTask, row: ScriptRow, t_row: float) -> None:
+            nonlocal copied
+            dst = out_dir / f"voice_{row.index:03d}.mp3"
+            try:
+                tmp = dst.with_name(dst.name + ".part")
+                shutil.copyfile(src.mp3_path, tmp)
+                os.replace(tmp, dst)
+            except Exception as e:
+                fail_row(row.index, e)
+                with stats_lock:
+                    copy_errors.append((row.index, e))
+                return
+            self._record_manifest(
+                out_dir=out_dir,
+                index=row.index,
+                script=row.script,
+                mp3_path=dst,
+                speaker_wav=speaker_wav,
+                voice_id=voice_id,
+                voice_dir=voice_dir,
+            )
+            with stats_lock:
+                copied += 1
+                self._rows_copied += 1
+            publish_event("row", stage="mp3_done", index=row.index, path=str(dst), cached=False, copied_from=src.index)
+            notify(
+                "done",
+                row.index,
+                path=str(dst),
+                seconds=time.perf_counter() - t_row,
+                cached=False,
+                copied_from=src.index,
+                audio_seconds=src.audio_seconds,
+            )
+
+        def finish_source(task: _RowTask, err: Optional[BaseException] = None) -> None:
+            with stats_lock:
+                finished[task.index] = err if err is not None else task
+                copies = waiting_copies.pop(task.index, [])
+            for row, t_row in copies:
+                if err is not None:
+                    fail_row(row.index, err)
+                else:
+                    copy_row(task, row, t_row)
+
+        def on_encoded(fut: Future[Path], *, task: _RowTask, t_row: float) -> None:
+            nonlocal encode_total
+            try:
+                err = fut.exception()
+                if err is not None:
+                    logger.error(f"[VoiceGenerator] encode failed index={task.index}: {err}")
+                    publish_event("row", stage="error", index=task.index, error=str(err))
+                    notify("error", task.index, error=str(err))
+                    finish_source(task, err)
+                    return
+                with stats_lock:
+                    encode_total += task.encode_seconds
+                notify(
+                    "done",
+                    task.index,
+                    path=str(task.mp3_path),
+                    seconds=time.perf_counter() - t_row,
+                    cached=False,
+                    audio_seconds=task.audio_seconds,
+                    synth_seconds=task.synth_seconds,
+                    encode_seconds=task.encode_seconds,
+                )
+                finish_source(task)
+            finally:
+                notified.release()
+
+        def submit_encode(task: _RowTask, t_row: float) -> None:
+            nonlocal synth_total
+            synth_total += task.synth_seconds
+            fut = encode_pool.submit(self._encode_row, task)
+            fut.add_done_callback(lambda f, task=task, t_row=t_row: on_encoded(f, task=task, t_row=t_row))
+            pending.append((task.index, fut))
+
+        def start_row(index: int) -> float:
+            notify("started", index)
+            publish_event("row", stage="started", index=index)
+            return time.perf_counter()
+
+        def fail_row(index: int, err: BaseException) -> None:
+            publish_event("row", stage="error", index=index, error=str(err))
+            notify("error", index, error=str(err))
+
+        batch = self._resolve_batch_size(batch_size, voice_id=voice_id, voice_dir=voice_dir)
+        deferred: list[_RowTask] = []
+        run_error: Optional[BaseException] = None
+
+        # 推論ワーカープールが有効なら、行をワーカーへ先行投入して並列に推論させる
+        procs = self._synth_pool() if batch == 1 else None
+        in_flight: deque[tuple[_RowTask, float, Future[tuple["np.ndarray", int, float]]]] = deque()
+
+        def harvest() -> None:
+            task, t_row, fut = in_flight.popleft()
+            try:
+                self._apply_synth_result(task, fut.result())
+            except Exception as e:
+                fail_row(task.index, e)
+                finish_source(task, e)
+                raise
+            _publish_wav_done(task)
+            submit_encode(task, t_row)
+
+        try:
+            for r in rows:
+                if not r.script.strip():
+                    notify("skipped", r.index, reason="empty")
+                    continue
+                if targets is not None and r.index not in targets:
+                    path = out_dir / f"voice_{r.index:03d}.mp3"
+                    generated.append(path)
+                    notify("skipped", r.index, reason="unchanged", path=str(path))
+                    continue
+                if cancel_event is not None and cancel_event.is_set():
+                    raise GenerationCancelled(f"生成がキャンセルされました（index={r.index} の手前）")
+
+                source = first_by_script.get(r.script)
+                if source is not None:
+                    t_row = start_row(r.index)
+                    path = out_dir / f"voice_{r.index:03d}.mp3"
+                    if path.exists() and not overwrite:
+                        err = FileExistsError(f"既存ファイルの上書きは禁止されています: {path}")
+                        fail_row(r.index, err)
+                        raise err
+                    generated.append(path)
+                    with stats_lock:
+                        done = finished.get(source)
+                        if done is None:
+                            waiting_copies.setdefault(source, []).append((r, t_row))
+                    if isinstance(done, _RowTask):
+                        copy_row(done, r, t_row)
+                    elif isinstance(done, BaseException):
+                        fail_row(r.index, done)
+                    continue
+
+                # バッチ推論ではキャッシュに無い行の "started" はバッチ投入時に通知する
+                t_row = start_row(r.index) if batch == 1 else time.perf_counter()
+                try:
+                    task = self._begin_row(
+                        index=r.index,
+                        script=r.script,
+                        speaker_wav=speaker_wav,
+                        voice_id=voice_id,
+                        voice_dir=voice_dir,
+                        output_dir=out_dir,
+                        overwrite=overwrite,
+                        use_cache=use_cache,
+                        priority=priority,
+                    )
+                    if not task.cached and batch == 1 and procs is None:
+                        self._synthesize_row(task)
+                # ここで失敗した行はまだ複製元として登録されていない（first_by_script は下で設定する）
+                except Exception as e:
+                    if batch > 1:
+                        start_row(r.index)
+                    fail_row(r.index, e)
+                    raise
+
+                generated.append(task.mp3_path)
+                first_by_script[r.script] = r.index
+                if task.cached:
+                    if batch > 1:
+                        start_row(r.index)
+                    notify("done", r.index, path=str(task.mp3_path), seconds=time.perf_counter() - t_row, cached=True)
+                    finish_source(task)
+                    continue
+                if batch > 1:
+                    deferred.append(task)
+                    continue
+                if procs is not None:
+                    in_flight.append((task, t_row, procs.submit(task, priority=priority)))
+                    # 投入しすぎると取り消しが効きにくいため、ワーカー数の 2 倍までに抑える
+                    while len(in_flight) >= procs.workers * 2:
+                        harvest()
+                    continue
+                submit_encode(task, t_row)
+
+            while in_flight:
+                harvest()
+
+            if deferred:
+                by_index = {t.index: t for t in deferred}
+
+                def fail_batched(index: int, err: BaseException) -> None:
+                    fail_row(index, err)
+                    finish_source(by_index[index], err)
+
+                self._synthesize_batched(
+                    deferred,
+                    batch_size=batch,
+                    start_row=start_row,
+                    on_ready=submit_encode,
+                    on_error=fail_batched,
+                    cancel_event=cancel_event,
+                )
+        except BaseException as e:
+            run_error = e
+            raise
+        finally:
+            # 未着手の推論は取り消す（実行中のものは結果を捨てる）
+            for _, _, fut in in_flight:
+                fut.cancel()
+            # 途中で失敗/キャンセルした場合も、投入済みのエンコードは完了させてから返す
+            wait([fut for _, fut in pending])
+            for _ in pending:
+                notified.acquire()
+            # 複製元の行が推論まで進まなかった（途中で失敗・キャンセルした）複製先も失敗として通知する
+            with stats_lock:
+                leftovers = [row for copies in waiting_copies.values() for row, _ in copies]
+                waiting_copies.clear()
+            for row in sorted(leftovers, key=lambda r: r.index):
+                fail_row(row.index, run_error or RuntimeError("複製元の行が完了しませんでした"))
+
+        wall = time.perf_counter() - t_pipeline
+        overlap = max(0.0, synth_total + encode_total - wall)
+        logger.info(
+            f"[VoiceGenerator] pipeline rows={len(pending)} wall={wall:.3f}s synth={synth_total:.3f}s "
+            f"encode={encode_total:.3f}s overlap={overlap:.3f}s encode_workers={encode_pool.workers} batch={batch} "
+            f"synth_workers={procs.workers if procs is not None else 1} copied={copied}"
+        )
+
+        # エラーは行順で最初のものを、行番号付きで返す
+        for index, fut in pending:
+            err = fut.exception()
+            if err is not None:
+                raise RuntimeError(f"index={index}: {err}") from err
+        for index, err in sorted(copy_errors, key=lambda e: e[0])[:1]:
+            raise RuntimeError(f"index={index}: {err}") from err
         return generated
 
 
@@ -0,0 +1,160 @@
+"""複数話者の latent をメモリ予算つきで保持する voice レジストリ。
+
+1 つのサーバー（= 1 つのロード済み XTTS）で複数のナレーターを扱うため、voice_id ごとの
+conditioning latent と推論プランを LRU で保持する。
+
+- 遅延ロード: 初めて使われた時点で `<voice_dir>/<voice_id>.pth` を読む
+- 更新検知: .pth のサイズ・更新時刻が変わっていれば読み直す（モデル再構築に追従）
+- 容量: latent のテンソルサイズの合計が上限を超えたら、最後に使われたのが古いものから外す
+  （直前に使ったものは上限を超えていても残す）
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from src.logger import setup_logger
+
+logger = setup_logger("VoiceRegistry")
+
+
+def latents_nbytes(latents: dict[str, Any]) -> int:
+    """latent 辞書に含まれるテンソル/配列のバイト数。"""
+
+    total = 0
+    for value in latents.values():
+        nbytes = getattr(value, "nbytes", None)
+        if isinstance(nbytes, int):
+            total += nbytes
+        elif hasattr(value, "element_size") and hasattr(value, "nelement"):
+            total += int(value.element_size() * value.nelement())
+    return total
+
+
+def _stamp(path: Optional[Path]) -> Optional[tuple[int, int]]:
+    if path is None:
+        return None
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+@dataclass
+class VoiceEntry:
+    voice_id: str
+    latents: dict[str, Any]
+    source: Optional[Path]
+    stamp: Optional[tuple[int, int]]
+    nbytes: int
+    plan: Any = None  # LatentInferencePlan（作成済みなら）
+
+
+class VoiceRegistry:
+    """voice_id → latent の LRU（スレッドセーフ）。"""
+
+    def __init__(self, *, max_bytes: int):
+        self.max_bytes = int(max_bytes)
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, VoiceEntry] = OrderedDict()
+        self._total = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.loads = 0
+        self.load_seconds = 0.0
+
+    def __contains__(self, voice_id: str) -> bool:
+        with self._lock:
+            return voice_id in self._entries
+
+    def peek(self, voice_id: str) -> Optional[VoiceEntry]:
+        """統計や LRU 順を変えずに参照する。"""
+
+        with self._lock:
+            return self._entries.get(voice_id)
+
+    def get(
+        self,
+        voice_id: str,
+        *,
+        loader: Callable[[], Optional[dict[str, Any]]],
+        source: Optional[Path] = None,
+    ) -> Optional[VoiceEntry]:
+        """保持していれば返し、無い（または source が更新された）ときは loader で読み込んで登録する。"""
+
+        stamp = _stamp(source)
+        with self._lock:
+            entry = self._entries.get(voice_id)
+            if entry is not None and (source is None or (entry.source == source and entry.stamp == stamp)):
+                self._entries.move_to_end(voice_id)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        # 読み込みはロックの外で行う（同時に同じ voice を読んだ場合は後勝ちで登録）
+        t0 = time.perf_counter()
+        latents = loader()
+        seconds = time.perf_counter() - t0
+        if latents is None:
+            return None
+        with self._lock:
+            self.loads += 1
+            self.load_seconds += seconds
+        logger.info(f"[VoiceRegistry] loaded voice_id={voice_id} in {seconds:.3f}s")
+        return self.put(voice_id, latents, source=source, stamp=stamp)
+
+    def put(
+        self,
+        voice_id: str,
+        latents: dict[str, Any],
+        *,
+        source: Optional[Path] = None,
+        stamp: Optional[tuple[int, int]] = None,
+    ) -> VoiceEntry:
+        entry = VoiceEntry(
+            voice_id=voice_id,
+            latents=latents,
+            source=source,
+            stamp=stamp if stamp is not None else _stamp(source),
+            nbytes=latents_nbytes(latents),
+        )
+        with self._lock:
+            old = self._entries.pop(voice_id, None)
+            if old is not None:
+                self._total -= old.nbytes
+            self._entries[voice_id] = entry
+            self._total += entry.nbytes
+            while self._total > self.max_bytes and len(self._entries) > 1:
+                old_id, evicted = self._entries.popitem(last=False)
+                self._total -= evicted.nbytes
+                self.evictions += 1
+                logger.info(f"[VoiceRegistry] evicted voice_id={old_id} ({evicted.nbytes} bytes)")
+        return entry
+
+    def discard(self, voice_id: str) -> None:
+        with self._lock:
+            entry = self._entries.pop(voice_id, None)
+            if entry is not None:
+                self._total -= entry.nbytes
+
+    def stats(self) -> dict[str, object]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "voices": list(self._entries),
+                "bytes": self._total,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "loads": self.loads,
+                "load_seconds": round(self.load_seconds, 3),
+                "avg_load_seconds": round(self.load_seconds / self.loads, 4) if self.loads else None,
+            }
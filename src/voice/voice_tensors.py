@@ -0,0 +1,176 @@
+"""voice キャッシュの軽量形式（latent テンソルだけを持つ `<voice_id>.safetensors`）。
+
+`clone_voice()` が書く `<voice_id>.pth` は任意のオブジェクトを含むピクルのため
+`weights_only=False` で全体を unpickle し、さらに latent を再帰的に探す必要がある。
+`build_voice_cache` はそれに加えて GPT conditioning latent・speaker embedding・内容ハッシュだけの
+ファイルを書き、読み込みはヘッダ（JSON）を読んでテンソル部分を mmap するだけにする（unpickle しない）。
+
+ファイルは safetensors と同じレイアウト（8 バイトのヘッダ長 + JSON ヘッダ + 生データ）で、
+safetensors パッケージが無くても読み書きできるようここで直接扱う。
+
+- 検証: 読み込んだテンソルからハッシュを計算し直し、保存時の値と一致しなければ使わない
+- 更新検知: 元の .pth のサイズ・更新時刻を記録し、.pth が作り直されていたら使わない
+- 互換: 軽量ファイルが無い・使えない場合は従来どおり .pth を読む（読めたら軽量ファイルを書き直す）
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import struct
+from pathlib import Path
+from typing import Any, Optional
+
+from src.logger import setup_logger
+
+logger = setup_logger("VoiceTensors")
+
+COMPACT_FORMAT = "svm-voice/1"
+_SUFFIX = ".safetensors"
+_GPT = "gpt_cond_latent"
+_SPK = "speaker_embedding"
+# safetensors の dtype 名 → (torch dtype 名, 読み込み時の numpy dtype)。bf16 は uint16 で読んで view する
+_DTYPES = {
+    "F64": ("float64", "<f8"),
+    "F32": ("float32", "<f4"),
+    "F16": ("float16", "<f2"),
+    "BF16": ("bfloat16", "<u2"),
+}
+
+
+def compact_path(voice_file: Path) -> Path:
+    """`<voice_id>.pth` に対応する軽量ファイルのパス。"""
+
+    return voice_file.with_suffix(_SUFFIX)
+
+
+def _source_stamp(voice_file: Path) -> str:
+    try:
+        st = voice_file.stat()
+    except OSError:
+        return ""
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+def content_hash(gpt: Any, spk: Any) -> str:
+    """latent の dtype・形状・値から計算する sha256。"""
+
+    h = hashlib.sha256()
+    for t in (gpt, spk):
+        t = t.detach().to("cpu").contiguous()
+        h.update(f"{t.dtype}:{tuple(t.shape)};".encode("ascii"))
+        h.update(_as_numpy(t))
+    return h.hexdigest()
+
+
+def _as_numpy(t: Any) -> Any:
+    """CPU 上の連続テンソルを同じメモリの ndarray として見る（bf16 は int16 として扱う）。"""
+
+    import torch
+
+    if t.dtype == torch.bfloat16:
+        t = t.view(torch.int16)
+    return t.numpy()
+
+
+def write_tensor_file(path: Path, tensors: dict[str, Any], metadata: dict[str, str]) -> Path:
+    """テンソル（CPU）と文字列メタデータを safetensors レイアウトで書く（一時ファイル経由で置き換える）。"""
+
+    import torch
+
+    names = {str(getattr(torch, torch_name)): st for st, (torch_name, _) in _DTYPES.items()}
+    header: dict[str, Any] = {"__metadata__": metadata}
+    blobs: list[bytes] = []
+    offset = 0
+    for name, t in tensors.items():
+        dtype = names.get(str(t.dtype))
+        if dtype is None:
+            raise ValueError(f"unsupported dtype for tensor file: {t.dtype}")
+        raw = _as_numpy(t.detach().to("cpu").contiguous()).tobytes()
+        header[name] = {"dtype": dtype, "shape": list(t.shape), "data_offsets": [offset, offset + len(raw)]}
+        blobs.append(raw)
+        offset += len(raw)
+
+    encoded = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    encoded += b" " * (-len(encoded) % 8)  # データ部を 8 バイト境界に揃える
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("wb") as f:
+        f.write(struct.pack("<Q", len(encoded)))
+        f.write(encoded)
+        for raw in blobs:
+            f.write(raw)
+    os.replace(tmp, path)
+    return path
+
+
+def save_compact_voice(voice_file: Path, *, gpt: Any, spk: Any) -> Path:
+    """latent だけを軽量ファイルへ書き出す。"""
+
+    tensors = {_GPT: gpt.detach().to("cpu").contiguous(), _SPK: spk.detach().to("cpu").contiguous()}
+    metadata = {
+        "format": COMPACT_FORMAT,
+        "content_hash": content_hash(tensors[_GPT], tensors[_SPK]),
+        "source": _source_stamp(voice_file),
+    }
+    return write_tensor_file(compact_path(voice_file), tensors, metadata)
+
+
+def read_tensor_file(path: Path) -> tuple[dict[str, Any], dict[str, str]]:
+    """ヘッダを読み、各テンソルをファイルの mmap 上のビューとして返す。"""
+
+    import mmap
+
+    import numpy as np
+    import torch
+
+    with path.open("rb") as f:
+        (size,) = struct.unpack("<Q", f.read(8))
+        if size > 1024 * 1024:
+            raise ValueError(f"header too large: {size}")
+        header = json.loads(f.read(size))
+        # ACCESS_COPY（copy-on-write）なら書き込み可能なバッファになり、torch へコピー無しで渡せる
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    base = 8 + size
+    metadata = header.pop("__metadata__", None) or {}
+    tensors: dict[str, Any] = {}
+    for name, spec in header.items():
+        torch_name, np_dtype = _DTYPES[spec["dtype"]]
+        shape = tuple(int(n) for n in spec["shape"])
+        start, end = (int(n) for n in spec["data_offsets"])
+        count = (end - start) // np.dtype(np_dtype).itemsize
+        if count != int(np.prod(shape, dtype=np.int64)) or base + end > len(mapped):
+            raise ValueError(f"{name}: data size does not match shape {shape}")
+        arr = np.frombuffer(mapped, dtype=np_dtype, count=count, offset=base + start)
+        t = torch.from_numpy(arr).reshape(shape)
+        if torch_name == "bfloat16":
+            t = t.view(torch.bfloat16)
+        tensors[name] = t
+    return tensors, metadata
+
+
+def load_compact_voice(voice_file: Path) -> Optional[dict[str, Any]]:
+    """軽量ファイルから latent を読む（無い・古い・壊れている場合は理由をログに出して None）。"""
+
+    path = compact_path(voice_file)
+    if not path.exists():
+        return None
+    try:
+        tensors, metadata = read_tensor_file(path)
+    except Exception as e:
+        logger.warning(f"[VoiceTensors] compact voice ignored ({path}): {e}")
+        return None
+
+    reason = ""
+    if metadata.get("format") != COMPACT_FORMAT:
+        reason = f"format {metadata.get('format')} != {COMPACT_FORMAT}"
+    elif metadata.get("source") != _source_stamp(voice_file):
+        reason = "source .pth changed"
+    elif _GPT not in tensors or _SPK not in tensors:
+        reason = "latents missing"
+    elif content_hash(tensors[_GPT], tensors[_SPK]) != metadata.get("content_hash"):
+        reason = "content hash mismatch"
+    if reason:
+        logger.info(f"[VoiceTensors] compact voice ignored ({path}): {reason}")
+        return None
+    return {_GPT: tensors[_GPT], _SPK: tensors[_SPK], "content_hash": metadata["content_hash"]}
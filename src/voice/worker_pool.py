@@ -0,0 +1,383 @@
+"""fork ベースの推論ワーカープール。
+
+モデルは親プロセスで 1 回だけロードし、そこから N 個のワーカーを fork する。
+重みは copy-on-write で共有されるため、ワーカーを増やしてもモデルのメモリは増えない。
+各ワーカーは CPU コアの部分集合に固定（sched_setaffinity）し、torch のスレッド数も
+その範囲に揃える。1 つの torch インスタンスで全コアを使うより、独立したワーカーを
+並べた方が多コア機ではスケールしやすい。
+
+ワーカーは推論（波形生成）だけを行い、MP3 エンコード・キャッシュ・マニフェスト更新は
+親プロセス側で行う（ファイル更新の競合を避けるため）。
+割り当て待ちのタスクは優先度クラス（interactive → bulk）の順に配る。親プロセスで推論する場合
+（ストリーミング等）は reserve() でワーカー 1 つぶんの枠を取り、同時に推論する数をワーカー数に揃える。
+fork が使えない環境（Windows 等）や CUDA 使用時は呼び出し側で無効化する。
+
+GNU OpenMP（libgomp）は、親が並列区間を一度でも実行した後に fork した子で複数スレッドの
+並列区間に入るとデッドロックしうる。そのためプールはモデルのロード直後（親で推論する前）に
+作り、ワーカーは torch を使う前にスレッド数を設定する。落ちたワーカーの補充は親が推論した後の
+fork になるため、torch を 1 スレッドに制限して起動する（並列区間に入らない）。
+"""
+
+from __future__ import annotations
+
+import multiprocessing as mp
+import multiprocessing.connection as mp_connection
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
+
+from src.logger import setup_logger
+from src.voice.scheduler import BULK, PRIORITIES
+
+logger = setup_logger("WorkerPool")
+
+# reserve() の枠を表す保留タスクの payload（ワーカーへは送らない）
+_RESERVED = object()
+
+
+def fork_supported() -> bool:
+    return "fork" in mp.get_all_start_methods()
+
+
+def available_cores() -> list[int]:
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        return list(range(os.cpu_count() or 1))
+
+
+def split_cores(cores: list[int], workers: int) -> list[list[int]]:
+    """コアを連続した塊に分ける（コア数がワーカー数より少なければ使い回す）。"""
+
+    workers = max(1, workers)
+    if len(cores) < workers:
+        return [[cores[i % len(cores)]] for i in range(workers)]
+    size, extra = divmod(len(cores), workers)
+    out: list[list[int]] = []
+    start = 0
+    for i in range(workers):
+        end = start + size + (1 if i < extra else 0)
+        out.append(cores[start:end])
+        start = end
+    return out
+
+
+def _worker_main(
+    wid: int,
+    cores: list[int],
+    threads: int,
+    fn: Callable[[Any], Any],
+    conn: Any,
+) -> None:
+    try:
+        os.sched_setaffinity(0, cores)
+    except (AttributeError, OSError):
+        pass
+    # この後に初期化されるスレッドプール（MKL/OpenMP）にも同じ上限を使わせる
+    for key in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[key] = str(max(1, threads))
+    # torch は親で読み込み済みの場合だけ設定する（フェイクTTS等で重い import を避ける）
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        try:
+            torch.set_num_threads(max(1, threads))
+        except Exception:
+            pass
+
+    while True:
+        try:
+            item = conn.recv()
+        except (EOFError, OSError):
+            return
+        if item is None:
+            return
+        task_id, payload = item
+        t0 = time.perf_counter()
+        try:
+            out = fn(payload)
+        except BaseException as e:  # noqa: BLE001
+            detail = f"{type(e).__name__}: {e}"
+            logger.error(f"[WorkerPool] worker={wid} task failed: {detail}\n{traceback.format_exc()}")
+            conn.send(("error", task_id, detail, time.perf_counter() - t0))
+        else:
+            conn.send(("done", task_id, out, time.perf_counter() - t0))
+
+
+class _WorkerState:
+    def __init__(self, wid: int, cores: list[int]):
+        self.wid = wid
+        self.cores = cores
+        self.process: Optional[Any] = None
+        self.conn: Any = None  # 親側のパイプ端（タスク送信と結果受信）
+        self.task_id: Optional[int] = None  # 処理中のタスク（None = 待機中）
+        self.threads = 0  # ワーカーの torch スレッド数
+        self.started_at = time.time()
+        self.tasks = 0
+        self.errors = 0
+        self.restarts = 0
+        self.busy_seconds = 0.0
+
+
+class SynthWorkerPool:
+    """fork したワーカーへ fn(payload) を配り、結果を Future で返す。
+
+    ワーカーごとに専用のパイプを持ち、待機中のワーカーへ親が 1 件ずつ割り当てる。
+    プロセス間で共有するキュー（とそのロック）を使わないため、ワーカーが送信途中や
+    受信待ちで落ちても他のワーカーが巻き込まれない。処理中だったタスクだけを失敗させ、
+    ワーカーを補充する。
+    """
+
+    def __init__(self, fn: Callable[[Any], Any], *, workers: int, threads_per_worker: Optional[int] = None):
+        if not fork_supported():
+            raise RuntimeError("この環境では fork が使えないためワーカープールを起動できません")
+        self.workers = max(1, int(workers))
+        layout = split_cores(available_cores(), self.workers)
+        self.threads_per_worker = threads_per_worker or max(1, min(len(c) for c in layout))
+        self._fn = fn
+        self._ctx = mp.get_context("fork")
+        self._lock = threading.Lock()
+        self._futures: dict[int, Future[Any]] = {}
+        self._pending: dict[str, deque[tuple[int, Any]]] = {p: deque() for p in PRIORITIES}
+        self._reservations: dict[int, threading.Event] = {}
+        self._next_id = 0
+        self._closed = False
+        self._states = [_WorkerState(i, cores) for i, cores in enumerate(layout)]
+        with self._lock:
+            for st in self._states:
+                self._spawn(st, self.threads_per_worker)
+        self._collector = threading.Thread(target=self._collect, name="svm-synth-collector", daemon=True)
+        self._collector.start()
+        logger.info(
+            f"[WorkerPool] started workers={self.workers} threads_per_worker={self.threads_per_worker} "
+            f"cores={[st.cores for st in self._states]}"
+        )
+
+    def _spawn(self, st: _WorkerState, threads: int) -> None:
+        parent_conn, child_conn = self._ctx.Pipe(duplex=True)
+        proc = self._ctx.Process(
+            target=_worker_main,
+            args=(st.wid, st.cores, threads, self._fn, child_conn),
+            name=f"svm-synth-{st.wid}",
+            daemon=True,
+        )
+        proc.start()
+        # 親側の子端を閉じておくと、ワーカーが落ちたときに parent_conn が EOF になる
+        child_conn.close()
+        st.process = proc
+        st.conn = parent_conn
+        st.task_id = None
+        st.threads = threads
+        st.started_at = time.time()
+
+    def _pop_pending_locked(self) -> Optional[tuple[str, int, Any]]:
+        for p in PRIORITIES:
+            if self._pending[p]:
+                task_id, payload = self._pending[p].popleft()
+                return p, task_id, payload
+        return None
+
+    def _dispatch_locked(self) -> None:
+        """待機中のワーカーへ保留タスクを優先度順に割り当てる（self._lock を保持して呼ぶ）。"""
+
+        for st in self._states:
+            if not any(self._pending.values()):
+                return
+            if st.task_id is not None or st.process is None or not st.process.is_alive():
+                continue
+            while (item := self._pop_pending_locked()) is not None:
+                priority, task_id, payload = item
+                if payload is _RESERVED:
+                    ready = self._reservations.get(task_id)
+                    if ready is None:
+                        continue  # 割り当て前に取り下げられた
+                    # ワーカーには何も送らず、枠だけを親プロセスへ渡す
+                    st.task_id = task_id
+                    ready.set()
+                    break
+                fut = self._futures.get(task_id)
+                if fut is None or fut.cancelled():
+                    self._futures.pop(task_id, None)
+                    continue
+                try:
+                    st.conn.send((task_id, payload))
+                except (OSError, ValueError):
+                    # 送信先が落ちている: タスクを戻し、補充後に再割り当てする
+                    self._pending[priority].appendleft((task_id, payload))
+                    break
+                st.task_id = task_id
+                break
+
+    def submit(self, payload: Any, *, priority: str = BULK) -> "Future[Any]":
+        fut: Future[Any] = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("SynthWorkerPool is closed")
+            task_id = self._next_id
+            self._next_id += 1
+            self._futures[task_id] = fut
+            self._pending[priority].append((task_id, payload))
+            self._dispatch_locked()
+        return fut
+
+    @contextmanager
+    def reserve(self, priority: str = BULK) -> Iterator[None]:
+        """ワーカー 1 つぶんの枠を取り、保持している間はそのワーカーへタスクを割り当てない。
+
+        親プロセスのモデルで推論する間に使い、ワーカーと合わせた同時推論数をワーカー数に抑える。
+        """
+
+        ready = threading.Event()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("SynthWorkerPool is closed")
+            task_id = self._next_id
+            self._next_id += 1
+            self._reservations[task_id] = ready
+            self._pending[priority].append((task_id, _RESERVED))
+            self._dispatch_locked()
+        try:
+            ready.wait()
+            yield
+        finally:
+            with self._lock:
+                self._reservations.pop(task_id, None)
+                for st in self._states:
+                    if st.task_id == task_id:
+                        st.task_id = None
+                self._dispatch_locked()
+
+    def _collect(self) -> None:
+        while not self._closed:
+            with self._lock:
+                waitables = {st.conn: st for st in self._states if st.conn is not None}
+            try:
+                ready = mp_connection.wait(list(waitables), timeout=1.0)
+            except (OSError, ValueError):
+                ready = []
+            for conn in ready:
+                st = waitables[conn]
+                try:
+                    kind, task_id, data, seconds = conn.recv()
+                except (EOFError, OSError):
+                    continue  # ワーカーが終了した。下の _check_workers で補充する
+                self._finish(st, kind, task_id, data, seconds)
+            self._check_workers()
+
+    def _finish(self, st: _WorkerState, kind: str, task_id: int, data: Any, seconds: float) -> None:
+        with self._lock:
+            st.tasks += 1
+            st.busy_seconds += seconds
+            if kind == "error":
+                st.errors += 1
+            if st.task_id == task_id:
+                st.task_id = None
+            fut = self._futures.pop(task_id, None)
+            self._dispatch_locked()
+        if fut is None or not fut.set_running_or_notify_cancel():
+            return
+        if kind == "done":
+            fut.set_result(data)
+        else:
+            fut.set_exception(RuntimeError(f"worker {st.wid}: {data}"))
+
+    def _check_workers(self) -> None:
+        """落ちたワーカーの処理中タスクを失敗させ、ワーカーを補充する。"""
+
+        for st in self._states:
+            lost: Optional[Future[Any]] = None
+            drained: list[tuple[str, int, Any, float]] = []
+            with self._lock:
+                proc = st.process
+                if proc is None or proc.is_alive() or self._closed:
+                    continue
+                # 終了前に送られた結果は取りこぼさない
+                try:
+                    while st.conn.poll():
+                        drained.append(st.conn.recv())
+                except (EOFError, OSError):
+                    pass
+                finished = {task_id for _, task_id, _, _ in drained}
+                if st.task_id is not None and st.task_id not in finished:
+                    lost = self._futures.pop(st.task_id, None)
+                # reserve() 中の枠は補充したワーカーに引き継ぐ
+                reserved = st.task_id if st.task_id in self._reservations else None
+                st.task_id = None
+                st.restarts += 1
+                st.conn.close()
+                exitcode = proc.exitcode
+                # 親は既に推論（OpenMP の並列区間）を実行しているため、補充分は 1 スレッドで動かす
+                self._spawn(st, 1)
+                st.task_id = reserved
+            for kind, task_id, data, seconds in drained:
+                self._finish(st, kind, task_id, data, seconds)
+            with self._lock:
+                self._dispatch_locked()
+            logger.error(f"[WorkerPool] worker={st.wid} exited (code={exitcode}); restarted with 1 torch thread")
+            if lost is not None and lost.set_running_or_notify_cancel():
+                lost.set_exception(RuntimeError(f"worker {st.wid} exited unexpectedly (code={exitcode})"))
+
+    def stats(self) -> dict[str, object]:
+        now = time.time()
+        with self._lock:
+            workers = [
+                {
+                    "id": st.wid,
+                    "pid": st.process.pid if st.process is not None else None,
+                    "alive": bool(st.process is not None and st.process.is_alive()),
+                    "cores": st.cores,
+                    "threads": st.threads,
+                    "tasks": st.tasks,
+                    "errors": st.errors,
+                    "restarts": st.restarts,
+                    "busy": st.task_id is not None,
+                    "busy_seconds": round(st.busy_seconds, 3),
+                    "utilization": round(st.busy_seconds / max(1e-6, now - st.started_at), 3),
+                }
+                for st in self._states
+            ]
+            pending = len(self._futures)
+            queued = {p: len(self._pending[p]) for p in PRIORITIES}
+            reserved = sum(1 for st in self._states if st.task_id in self._reservations)
+        return {
+            "workers": self.workers,
+            "threads_per_worker": self.threads_per_worker,
+            "pending": pending,
+            "queued": queued,
+            "reserved": reserved,
+            "per_worker": workers,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            for st in self._states:
+                try:
+                    st.conn.send(None)
+                except (OSError, ValueError):
+                    pass
+        for st in self._states:
+            if st.process is not None:
+                st.process.join(timeout=5)
+                if st.process.is_alive():
+                    st.process.terminate()
+        with self._lock:
+            futures = list(self._futures.values())
+            self._futures.clear()
+            for q in self._pending.values():
+                q.clear()
+            # 枠の割り当てを待っている reserve() は解放する（閉じたプールでは親で推論してよい）
+            for ready in self._reservations.values():
+                ready.set()
+            for st in self._states:
+                st.conn.close()
+        for fut in futures:
+            if not fut.done():
+                fut.set_exception(RuntimeError("SynthWorkerPool closed"))
@@ -125,6 +125,14 @@ def test_local_backend_uploads_csv_and_generates_mp3(tmp_path: Path) -> None:
     try:
         _wait_port(host, port, timeout_s=30.0)
 
+        # SSE は接続直後に現在の初期化状態（init）を送る
+        with urlopen(Request(f"{base_url}/api/events", method="GET"), timeout=10) as resp:  # noqa: S310
+            assert resp.headers.get("Content-Type", "").startswith("text/event-stream")
+            lines: list[str] = []
+            while not any(line.startswith("data:") for line in lines):
+                lines.append(resp.readline().decode("utf-8").strip())
+        assert "event: init" in lines
+
         # index.html が配信される（UIの入口がある）こと
         code, body = _http_get(f"{base_url}/index.html", timeout=10)
         assert code == 200
@@ -152,11 +160,11 @@ def test_local_backend_uploads_csv_and_generates_mp3(tmp_path: Path) -> None:
         payload = {"speaker_wav": str(speaker)}
         code, body = _http_post_json(f"{base_url}/api/build_voice_model", payload, timeout=180)
         assert code == 200
-        j = json.loads(body.decode("utf-8"))
-        assert j.get("ok") == "true"
+        build = json.loads(body.decode("utf-8"))
+        assert build.get("ok") == "true"
 
         # 一括生成（保存済みモデルのspeaker_wavが使われる）
-        payload = {"overwrite": True}
+        payload = {"overwrite": True, "narration": True}
         code, body = _http_post_json(f"{base_url}/api/generate_from_csv", payload, timeout=180)
         assert code == 200
         j = json.loads(body.decode("utf-8"))
@@ -168,6 +176,74 @@ def test_local_backend_uploads_csv_and_generates_mp3(tmp_path: Path) -> None:
         assert out0.exists() and out0.stat().st_size > 0
         assert out1.exists() and out1.stat().st_size > 0
 
+        # narration: 2 行を連結した narration.mp3 とチャプターが返る
+        narration = j["narration"]
+        assert [c["index"] for c in narration["chapters"]] == [0, 1]
+        assert narration["missing"] == []
+        assert (output_dir / "narration.mp3").stat().st_size == narration["bytes"]
+
+        # 再アップロード時の差分は生成と同じ話者で比べる（話者を変えると同じ原稿でも changed になる）
+        def upload_changes() -> dict[str, object]:
+            code, body = _http_post_multipart_file(
+                f"{base_url}/api/upload/csv",
+                field="file",
+                filename="原稿.csv",
+                content_type="text/csv",
+                file_bytes=csv_path.read_bytes(),
+                timeout=20,
+            )
+            assert code == 200
+            return json.loads(body.decode("utf-8"))["changes"]
+
+        changes = upload_changes()
+        assert changes["changed"] == [] and changes["unchanged"] == 2
+        # フェイクTTSの voice キャッシュは内容が固定なので、作り直した latent の代わりに中身を書き換える
+        voice_file = Path(build["voice_file"])
+        voice_file.write_bytes(voice_file.read_bytes() + b"-rebuilt")
+        assert upload_changes()["changed"] == [0, 1]
+
+        # 同じ一括生成をジョブとして登録し、完了までポーリングする
+        code, body = _http_post_json(f"{base_url}/api/jobs", {"overwrite": True}, timeout=30)
+        assert code == 200
+        job_id = json.loads(body.decode("utf-8"))["job_id"]
+        deadline = time.time() + 120
+        while True:
+            code, body = _http_get(f"{base_url}/api/jobs/{job_id}", timeout=10)
+            j = json.loads(body.decode("utf-8"))
+            if j["status"] in ("done", "error", "cancelled") or time.time() > deadline:
+                break
+            time.sleep(0.2)
+        assert j["status"] == "done", j
+        assert j["counts"].get("done") == 2
+        assert j["result"]["count"] == 2
+
+        # バッチ生成: 行ごとに NDJSON が 1 行ずつ届き、最後に summary が来る
+        req = Request(
+            f"{base_url}/api/generate_batch",
+            data=json.dumps({"start": 1, "end": 1, "use_cache": False}).encode("utf-8"),
+            method="POST",
+        )
+        req.add_header("Content-Type", "application/json")
+        with urlopen(req, timeout=60) as resp:  # noqa: S310
+            assert resp.headers.get("Content-Type", "").startswith("application/x-ndjson")
+            lines = [json.loads(line) for line in resp.read().decode("utf-8").splitlines() if line]
+        assert [(x["type"], x.get("index"), x.get("status")) for x in lines[:-1]] == [("row", 1, "done")]
+        assert lines[0]["path"] == str(out1) and lines[0]["audio_seconds"] > 0
+        assert lines[-1]["type"] == "summary" and lines[-1]["ok"] is True, lines[-1]
+
+        # ストリーミング合成: MP3 がチャンクで届き、終了時に voice_002.mp3 として保存される
+        req = Request(
+            f"{base_url}/api/stream_audio",
+            data=json.dumps({"index": 2, "script": "ストリーミング", "use_cache": False}).encode("utf-8"),
+            method="POST",
+        )
+        req.add_header("Content-Type", "application/json")
+        with urlopen(req, timeout=60) as resp:  # noqa: S310
+            assert resp.headers.get("Content-Type", "").startswith("audio/mpeg")
+            streamed = resp.read()
+        assert len(streamed) > 0
+        assert (output_dir / "voice_002.mp3").stat().st_size > 0
+
     finally:
         server.terminate()
         try:
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+
+from src.voice.audio_prep import preprocess, prepare_reference, read_wav, write_wav
+
+SR = 24000
+
+
+def _tone(seconds: float, amp: float = 0.2) -> np.ndarray:
+    t = np.arange(int(SR * seconds), dtype=np.float32) / SR
+    return (amp * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def _silence(seconds: float) -> np.ndarray:
+    return np.zeros(int(SR * seconds), dtype=np.float32)
+
+
+def test_preprocess_trims_compacts_normalizes_and_caps() -> None:
+    audio = np.concatenate([_silence(1.0), _tone(1.0), _silence(2.0), _tone(1.0), _silence(1.5)])
+    out, report = preprocess(audio, SR, max_pause=0.3)
+
+    # 前後は 0.1 秒ずつ、間は 0.3 秒だけ残る
+    assert abs(report.output_seconds - (2.0 + 0.3 + 0.2)) < 0.05
+    assert abs(report.removed_seconds - (6.5 - report.output_seconds)) < 1e-6
+    assert report.trimmed_seconds > 2.0 and report.compacted_seconds > 1.6
+    assert abs(float(np.abs(out).max()) - 10 ** (-1 / 20)) < 1e-3
+    assert report.gain_db > 0
+
+    capped, rep = preprocess(np.concatenate([_tone(3.0), _silence(0.1), _tone(3.0)]), SR, max_seconds=4.0)
+    assert len(capped) == 4 * SR and rep.capped_seconds > 2.0
+
+    # 2 回目はほとんど削らない
+    again, rep2 = preprocess(out, SR, max_pause=0.3)
+    assert rep2.removed_seconds < 0.05 and abs(rep2.gain_db) < 0.01
+
+
+def test_silent_recording_is_left_untouched(tmp_path: Path) -> None:
+    src = tmp_path / "sample_01.wav"
+    write_wav(src, _silence(1.0), SR)
+    report = prepare_reference(src)
+    audio, sr = read_wav(src)
+    assert sr == SR and len(audio) == SR
+    assert report.removed_seconds == 0.0
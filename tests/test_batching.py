@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import wave
+from pathlib import Path
+
+import numpy as np
+
+from src.voice.batching import Chunk, RowAssembler, plan_batches, split_chunks, split_sentences
+
+
+def _write_wav(path: Path) -> None:
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(24000)
+        wf.writeframes(b"\x00\x00" * 2400)
+
+
+def test_chunks_are_grouped_by_length_and_reassembled_per_row() -> None:
+    assert split_sentences("こんにちは。元気ですか？はい") == ["こんにちは。", "元気ですか？", "はい"]
+
+    chunks = split_chunks([(0, "ああ。いいいいいい。"), (1, "うう"), (2, "えええええええ")])
+    groups = plan_batches(chunks, 2)
+    assert [[(c.index, c.seq) for c in g] for g in groups] == [[(1, 0), (0, 0)], [(0, 1), (2, 0)]]
+
+    asm = RowAssembler(chunks)
+    assert asm.add(Chunk(0, 1, "", 0), np.full(2, 1.0, dtype=np.float32)) is None
+    row0 = asm.add(Chunk(0, 0, "", 0), np.zeros(3, dtype=np.float32))
+    assert row0 is not None and row0.tolist() == [0, 0, 0, 1, 1]
+
+
+def test_generate_rows_batched_matches_row_order(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setenv("SVM_FAKE_TTS", "1")
+    monkeypatch.setenv("SVM_SYNTH_CACHE_MAX_MB", "0")
+    from src.voice.voice_generator import ScriptRow, VoiceGenerator
+
+    speaker = tmp_path / "speaker.wav"
+    _write_wav(speaker)
+    vg = VoiceGenerator()
+    rows = [ScriptRow(index=i, script="文。" * (5 - i)) for i in range(5)] + [ScriptRow(index=5, script=" ")]
+    events: list[tuple[str, int]] = []
+
+    paths = vg.generate_rows(
+        rows,
+        speaker_wav=speaker,
+        output_dir=tmp_path / "out",
+        batch_size=3,
+        on_row=lambda event, index, info: events.append((event, index)),
+    )
+
+    assert [p.name for p in paths] == [f"voice_{i:03d}.mp3" for i in range(5)]
+    assert all(p.stat().st_size > 0 for p in paths)
+    for i in range(5):
+        assert events.index(("started", i)) < events.index(("done", i))
+    assert ("skipped", 5) in events
+
+
+def test_per_chunk_fallback_can_reload_evicted_voice(tmp_path: Path, monkeypatch) -> None:
+    """バッチ経路が失敗したときのチャンクごとの推論に voice_dir を渡す（LRU から外れた voice を読み直せる）。"""
+
+    monkeypatch.setenv("SVM_FAKE_TTS", "1")
+    from src.voice.voice_generator import VoiceGenerator
+
+    class FailingRunner:
+        def run(self, texts: list[str]) -> list[np.ndarray]:
+            raise RuntimeError("batched path unavailable")
+
+    vg = VoiceGenerator()
+    calls: list[dict[str, object]] = []
+
+    def infer(**kwargs: object) -> tuple[np.ndarray, int]:
+        calls.append(kwargs)
+        return np.zeros(10, dtype=np.float32), 24000
+
+    monkeypatch.setattr(vg, "_try_infer_with_latents", infer)
+    chunks = [Chunk(0, 0, "一。", 2), Chunk(1, 0, "二。", 2)]
+    runner = FailingRunner()
+    audios, sr = vg._infer_chunk_batch(runner, chunks, voice_id="narrator", voice_dir=tmp_path)  # type: ignore[arg-type]
+
+    assert len(audios) == 2 and sr == 24000
+    assert [(c["voice_id"], c["voice_dir"], c["script"]) for c in calls] == [
+        ("narrator", tmp_path, "一。"),
+        ("narrator", tmp_path, "二。"),
+    ]
+
+
+class _StubTokenizer:
+    char_limits: dict[str, int] = {}
+
+    def encode(self, text: str, lang: str) -> list[int]:
+        return [3 + ord(ch) % 40 for ch in text]
+
+
+class _StubGPT:
+    """XTTS の GPT の入出力の形だけを真似たスタブ（compute_embeddings と同じ並びで入力を検査する）。"""
+
+    start_text_token = 1
+    stop_text_token = 0
+    start_audio_token = 98
+    stop_audio_token = 99
+    code_stride_len = 4
+
+    def __init__(self) -> None:
+        self.calls: list[dict] = []
+
+    def generate(self, cond_latents, text_inputs, attention_mask, **kwargs):
+        import torch
+
+        batch, cond_len = int(cond_latents.shape[0]), int(cond_latents.shape[1])
+        rows = []
+        for i in range(batch):
+            # compute_embeddings は [cond, start, text_inputs..., stop] + start_audio を GPT に渡す
+            seq = [None] * cond_len + [self.start_text_token, *text_inputs[i].tolist(), self.stop_text_token, self.start_audio_token]
+            assert len(seq) == attention_mask.shape[1]
+            visible = [tok for tok, m in zip(seq, attention_mask[i].tolist()) if m]
+            assert visible[:cond_len] == [None] * cond_len
+            text = visible[cond_len:]
+            # マスク後に見えるのは [start, tokens..., stop, start_audio] だけ（パディングの stop は隠れる）
+            assert text[0] == self.start_text_token and text[-2:] == [self.stop_text_token, self.start_audio_token]
+            tokens = text[1:-2]
+            assert self.stop_text_token not in tokens
+            rows.append([2 + (t * 7) % 50 for t in tokens] + [self.stop_audio_token])
+        self.calls.append({"batch": batch, "text_inputs": text_inputs.tolist()})
+        longest = max(len(r) for r in rows)
+        # HF の generate と同じく、短い行の後ろは pad_token_id（= stop_audio）で埋まる
+        return torch.tensor([r + [self.stop_audio_token] * (longest - len(r)) for r in rows])
+
+    def __call__(self, text, text_lengths, codes, wav_lengths, *, cond_latents, return_attentions, return_latent):
+        import torch
+
+        assert int(text_lengths[0]) == text.shape[1]
+        assert int(wav_lengths[0]) == codes.shape[-1] * self.code_stride_len
+        values = codes[0].float() + float(text.sum()) / 1000.0
+        return values.reshape(1, -1, 1).repeat(1, 1, 2)
+
+
+class _StubXtts:
+    def __init__(self) -> None:
+        self.tokenizer = _StubTokenizer()
+        self.gpt = _StubGPT()
+        self.config = None
+
+    def parameters(self):
+        return iter(())
+
+    def hifigan_decoder(self, latents, g):
+        # フレームごとに 3 サンプルへ展開する（フレーム間で混ざらない = ゼロ詰めの影響は切り戻しで消える）
+        return (latents[:, :, 0] * g[:, 0, 0:1]).repeat_interleave(3, dim=1).unsqueeze(1)
+
+
+def test_batch_runner_masks_padding_and_matches_unbatched_calls() -> None:
+    import torch
+
+    from src.voice.batching import XttsBatchRunner
+
+    model = _StubXtts()
+    runner = XttsBatchRunner(
+        model,
+        gpt_cond_latent=torch.zeros(1, 4, 8),
+        speaker_embedding=torch.full((1, 2, 1), 0.5),
+        language="ja",
+    )
+    texts = ["ああ", "いいいいい", "う"]
+
+    batched = runner.run(texts)
+    single = [runner.run([t])[0] for t in texts]
+
+    # 短い行は stop_text_token でパディングされ、長さは最長 + 1 に揃う
+    stop = _StubGPT.stop_text_token
+    assert model.gpt.calls[0]["batch"] == 3
+    assert [row[len(runner._tokens(t)) :] for row, t in zip(model.gpt.calls[0]["text_inputs"], texts)] == [
+        [stop] * 4,
+        [stop],
+        [stop] * 5,
+    ]
+    # 各行の長さ（フレーム数 × 3 サンプル）と値が、1 行ずつ推論した場合と一致する
+    assert [len(a) for a in batched] == [3 * (len(t) + 1) for t in texts]
+    for got, want in zip(batched, single):
+        np.testing.assert_allclose(got, want)
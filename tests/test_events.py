@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import wave
+from pathlib import Path
+
+from src.voice.events import publish_event, subscribe_events
+
+
+def test_publish_reaches_subscribers_until_unsubscribed() -> None:
+    got: list[dict] = []
+    unsubscribe = subscribe_events(got.append)
+    publish_event("init", stage="load_xtts_model", ready=False)
+    unsubscribe()
+    publish_event("init", stage="ready", ready=True)
+
+    assert len(got) == 1
+    assert got[0]["type"] == "init"
+    assert got[0]["stage"] == "load_xtts_model"
+
+
+def test_generate_one_emits_row_stages(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setenv("SVM_FAKE_TTS", "1")
+    monkeypatch.setenv("SVM_SYNTH_CACHE_MAX_MB", "0")
+    from src.voice.voice_generator import VoiceGenerator
+
+    speaker = tmp_path / "speaker.wav"
+    with wave.open(str(speaker), "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(24000)
+        wf.writeframes(b"\x00\x00" * 2400)
+
+    vg = VoiceGenerator()
+    got: list[dict] = []
+    unsubscribe = subscribe_events(got.append)
+    try:
+        vg.generate_one(index=3, script="テスト", speaker_wav=speaker, output_dir=tmp_path / "out")
+    finally:
+        unsubscribe()
+
+    rows = [e for e in got if e["type"] == "row"]
+    assert [e["stage"] for e in rows] == ["started", "wav_done", "mp3_done"]
+    assert all(e["index"] == 3 for e in rows)
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import threading
+import wave
+from pathlib import Path
+
+from src.voice.ffmpeg_pool import EncoderPool
+
+
+def test_pool_applies_backpressure_and_reports_stats() -> None:
+    pool = EncoderPool(workers=1, max_queue=1)
+    release = threading.Event()
+    started = threading.Event()
+
+    def block() -> str:
+        started.set()
+        release.wait(5)
+        return "ok"
+
+    first = pool.submit(block)
+    assert started.wait(5)
+    pool.submit(lambda: "queued")  # キューの 1 枠を埋める
+
+    # 3 件目はキューが空くまで submit 側で待たされる
+    third: list[object] = []
+    t = threading.Thread(target=lambda: third.append(pool.submit(lambda: "late")))
+    t.start()
+    t.join(0.2)
+    assert t.is_alive()
+
+    release.set()
+    t.join(5)
+    assert first.result(5) == "ok"
+    assert third[0].result(5) == "late"  # type: ignore[union-attr]
+
+    pool.close()
+    stats = pool.stats()
+    assert stats["healthy"] is True
+    assert stats["completed"] == 3 and stats["failed"] == 0
+
+
+def test_convert_to_wav_via_pool(tmp_path: Path) -> None:
+    src = tmp_path / "in.wav"
+    with wave.open(str(src), "wb") as wf:
+        wf.setnchannels(2)
+        wf.setsampwidth(2)
+        wf.setframerate(44100)
+        wf.writeframes(b"\x00\x00\x00\x00" * 4410)
+
+    pool = EncoderPool(workers=1)
+    dst = tmp_path / "out.wav"
+    pool.convert_to_wav(src, dst)
+    pool.close()
+
+    with wave.open(str(dst), "rb") as wf:
+        assert (wf.getnchannels(), wf.getframerate(), wf.getsampwidth()) == (1, 24000, 2)
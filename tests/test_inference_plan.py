@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import inspect
+
+import numpy as np
+import torch
+
+from src.voice.inference_plan import LatentInferencePlan, waveform_from_output
+
+
+class _FakeXtts(torch.nn.Module):
+    def __init__(self) -> None:
+        super().__init__()
+        self.proj = torch.nn.Linear(2, 2)
+        self.calls: list[dict[str, object]] = []
+
+    def inference(self, text, language, gpt_cond_latent, speaker_embedding, enable_text_splitting=False):
+        self.calls.append(
+            {
+                "text": text,
+                "language": language,
+                "gpt": gpt_cond_latent,
+                "spk": speaker_embedding,
+                "split": enable_text_splitting,
+                "inference_mode": torch.is_inference_mode_enabled(),
+            }
+        )
+        return {"wav": np.ones(4, dtype=np.float32), "sample_rate": 22050}
+
+
+def test_plan_resolves_once_and_calls_directly(monkeypatch) -> None:
+    model = _FakeXtts()
+    gpt, spk = torch.zeros(1, 3, 2), torch.zeros(1, 2, 1)
+    plan = LatentInferencePlan.build(
+        model, gpt_cond_latent=gpt, speaker_embedding=spk, language="ja", params={"enable_text_splitting": True, "nope": 1}
+    )
+
+    def no_signature(*args, **kwargs):
+        raise AssertionError("signature must not be resolved per row")
+
+    monkeypatch.setattr(inspect, "signature", no_signature)
+    for text in ("一行目", "二行目"):
+        wav, sr = waveform_from_output(plan(text))  # type: ignore[misc]
+        assert sr == 22050 and wav.shape == (4,)
+
+    assert [c["text"] for c in model.calls] == ["一行目", "二行目"]
+    first = model.calls[0]
+    assert first["language"] == "ja" and first["split"] is True and first["inference_mode"] is True
+    assert first["gpt"] is plan.gpt_cond_latent and first["spk"] is plan.speaker_embedding
+
+
+def test_plan_positional_fallback_and_output_shapes() -> None:
+    class Positional:
+        def parameters(self):
+            return iter(())
+
+        def inference(self, *args):
+            return (np.zeros(2, dtype=np.float32), 16000, args)
+
+    plan = LatentInferencePlan.build(Positional(), gpt_cond_latent="g", speaker_embedding="s", language="ja")
+    out = plan("こんにちは")
+    assert out[2] == ("こんにちは", "ja", "g", "s")
+    assert waveform_from_output(out)[1] == 16000  # type: ignore[index]
+    assert waveform_from_output({"audio": np.zeros(1)})[1] == 24000  # type: ignore[index]
+    assert waveform_from_output({"nothing": 1}) is None
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from src.jobs import JobManager
+
+
+def _wait(job, statuses: tuple[str, ...], timeout: float = 5.0) -> dict:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        snap = job.snapshot()
+        if snap["status"] in statuses:
+            return snap
+        time.sleep(0.01)
+    raise AssertionError(f"job did not reach {statuses}: {job.snapshot()}")
+
+
+def test_job_reports_row_states_and_result() -> None:
+    jobs = JobManager()
+
+    def run(job):
+        for i in (0, 1):
+            job.on_row("started", i, {})
+            job.on_row("done", i, {"seconds": 0.01, "path": f"voice_{i:03d}.mp3"})
+        job.on_row("skipped", 2, {"reason": "empty"})
+        return {"count": 2}
+
+    job = jobs.submit([0, 1, 2], run)
+    snap = _wait(job, ("done",))
+    assert snap["result"] == {"count": 2}
+    assert snap["counts"] == {"done": 2, "skipped": 1}
+    assert [r["state"] for r in snap["rows"]] == ["done", "done", "skipped"]
+
+
+def test_cancel_stops_running_and_queued_jobs() -> None:
+    jobs = JobManager()
+    release = threading.Event()
+
+    def run(job):
+        job.on_row("started", 0, {})
+        release.wait(5)
+        if job.cancel_event.is_set():
+            raise RuntimeError("cancelled")
+        return None
+
+    running = jobs.submit([0, 1], run)
+    queued = jobs.submit([0], run)
+    _wait(running, ("running",))
+
+    assert jobs.cancel(queued.id).snapshot()["status"] == "cancelled"
+    assert jobs.cancel(running.id).snapshot()["status"] == "cancelling"
+    release.set()
+
+    snap = _wait(running, ("cancelled",))
+    assert snap["counts"] == {"cancelled": 2}
+    assert jobs.get("missing") is None
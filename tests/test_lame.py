@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import subprocess
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src.voice.ffmpeg_pool import ffmpeg_exe
+from src.voice.lame import encode_pcm16, lame_available, mp3_encoder
+from src.voice.narration import scan_mp3
+
+pytestmark = pytest.mark.skipif(not lame_available(), reason="lameenc is not installed")
+
+
+def _decode(path: Path) -> tuple[np.ndarray, str]:
+    proc = subprocess.run(
+        [ffmpeg_exe(), "-hide_banner", "-v", "warning", "-i", str(path), "-f", "s16le", "-ac", "1", "pipe:1"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        check=True,
+    )
+    return np.frombuffer(proc.stdout, dtype="<i2"), proc.stderr.decode("utf-8", errors="replace")
+
+
+@pytest.mark.parametrize("samples", [24000, 12345])
+def test_in_process_mp3_keeps_length_and_timing(tmp_path: Path, samples: int) -> None:
+    """Xing/LAME タグの遅延・パディングで、デコード結果が入力と同じ長さ・位置になること。"""
+    pcm = np.zeros(samples, dtype="<i2")
+    click = samples // 5
+    pcm[click : click + 40] = 26000
+    path = tmp_path / "voice_000.mp3"
+    path.write_bytes(encode_pcm16(pcm.tobytes(), sample_rate=24000))
+
+    decoded, warnings = _decode(path)
+    assert warnings == ""
+    assert len(decoded) == samples
+    assert int(np.argmax(np.abs(decoded) > 3000)) == click
+
+    scanned = scan_mp3(path)
+    assert scanned.info_frame is not None and scanned.header.sample_rate == 24000
+
+
+def test_encoder_selection(monkeypatch) -> None:
+    monkeypatch.setenv("SVM_MP3_ENCODER", "ffmpeg")
+    assert mp3_encoder() == "ffmpeg"
+    monkeypatch.setenv("SVM_MP3_ENCODER", "auto")
+    assert mp3_encoder() == "lame"
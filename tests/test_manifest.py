@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import wave
+from pathlib import Path
+
+from src.voice.manifest import diff_rows, load_manifest, script_digest
+
+
+def _write_wav(path: Path) -> None:
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(24000)
+        wf.writeframes(b"\x00\x00" * 2400)
+
+
+def test_diff_rows_classifies_rows() -> None:
+    manifest = {
+        0: {"script_sha": script_digest("a"), "voice_key": "v1", "file": "voice_000.mp3"},
+        1: {"script_sha": script_digest("b"), "voice_key": "v1", "file": "voice_001.mp3"},
+        2: {"script_sha": script_digest("c"), "voice_key": "v1", "file": "voice_002.mp3"},
+    }
+    diff = diff_rows([(0, "a"), (1, "B"), (3, "d")], manifest, voice_key="v1")
+    assert diff.unchanged == [0]
+    assert diff.changed == [1]
+    assert diff.added == [3]
+    assert diff.removed == [2]
+
+    # 話者が変わったら全行が変更扱い
+    assert diff_rows([(0, "a")], manifest, voice_key="v2").changed == [0]
+
+
+def test_generate_from_csv_only_changed(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setenv("SVM_FAKE_TTS", "1")
+    monkeypatch.setenv("SVM_SYNTH_CACHE_MAX_MB", "0")
+    from src.voice.voice_generator import VoiceGenerator
+
+    speaker = tmp_path / "speaker.wav"
+    _write_wav(speaker)
+    out = tmp_path / "out"
+    csv_path = tmp_path / "原稿.csv"
+    csv_path.write_text("index,script\n0,いち\n1,に\n2,さん\n", encoding="utf-8")
+
+    vg = VoiceGenerator()
+    vg.generate_from_csv(script_csv_path=csv_path, speaker_wav=speaker, output_dir=out)
+    assert sorted(load_manifest(out)) == [0, 1, 2]
+
+    calls: list[int] = []
+    orig = vg._synthesize_row
+
+    def counting(task):
+        calls.append(task.index)
+        return orig(task)
+
+    monkeypatch.setattr(vg, "_synthesize_row", counting)
+    csv_path.write_text("index,script\n0,いち\n1,にー\n3,よん\n", encoding="utf-8")
+    paths = vg.generate_from_csv(script_csv_path=csv_path, speaker_wav=speaker, output_dir=out, only_changed=True)
+
+    assert calls == [1, 3]
+    assert [p.name for p in paths] == ["voice_000.mp3", "voice_001.mp3", "voice_003.mp3"]
+    assert not (out / "voice_002.mp3").exists()
+    assert sorted(load_manifest(out)) == [0, 1, 3]
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+import pytest
+import torch
+
+from src.voice.model_snapshot import assign_state_dict, load_snapshot_meta, load_state_dict_mmap, save_snapshot
+
+
+class _Gpt(torch.nn.Module):
+    def __init__(self) -> None:
+        super().__init__()
+        self.layer = torch.nn.Linear(64, 64)
+        # 推論用ラッパーは本体の層を参照するだけ（XTTS の gpt.gpt_inference と同じ形）
+        self.gpt_inference = torch.nn.Sequential(self.layer)
+
+
+class _Model(torch.nn.Module):
+    def __init__(self) -> None:
+        super().__init__()
+        self.gpt = _Gpt()
+        self.decoder = torch.nn.Linear(64, 8)
+
+
+def _model_dir(tmp_path: Path) -> Path:
+    d = tmp_path / "xtts_v2"
+    d.mkdir()
+    for name in ("model.pth", "config.json", "vocab.json"):
+        (d / name).write_text(name, encoding="utf-8")
+    return d
+
+
+def _mapped(ptr: int, path: Path) -> bool:
+    maps = Path("/proc/self/maps")
+    for line in maps.read_text().splitlines():
+        if line.endswith(str(path)):
+            lo, hi = (int(x, 16) for x in line.split()[0].split("-"))
+            if lo <= ptr < hi:
+                return True
+    return False
+
+
+def test_snapshot_roundtrip_is_mmapped_and_skips_derived_keys(tmp_path: Path) -> None:
+    src = _Model()
+    model_dir = _model_dir(tmp_path)
+    out = save_snapshot(src, model_dir=model_dir, model_name="m", path=tmp_path / "snap")
+
+    meta = load_snapshot_meta("m", path=out)
+    assert meta is not None and meta["model_dir"] == str(model_dir)
+
+    state = load_state_dict_mmap(out / "weights.pt")
+    assert not any(k.startswith("gpt.gpt_inference.") for k in state)
+
+    dst = _Model()
+    assign_state_dict(dst, state)
+    assert torch.equal(dst.gpt.layer.weight, src.gpt.layer.weight)
+    assert torch.equal(dst.decoder.bias, src.decoder.bias)
+    if Path("/proc/self/maps").exists():
+        assert _mapped(dst.gpt.layer.weight.data_ptr(), (out / "weights.pt").resolve())
+
+    with pytest.raises(RuntimeError, match="does not match"):
+        assign_state_dict(torch.nn.Linear(64, 8), state)
+
+
+def test_snapshot_is_ignored_when_source_or_model_changes(tmp_path: Path) -> None:
+    model_dir = _model_dir(tmp_path)
+    out = save_snapshot(_Model(), model_dir=model_dir, model_name="m", path=tmp_path / "snap")
+
+    assert load_snapshot_meta("other", path=out) is None
+
+    (model_dir / "model.pth").write_text("updated checkpoint", encoding="utf-8")
+    assert load_snapshot_meta("m", path=out) is None
+
+    save_snapshot(_Model(), model_dir=model_dir, model_name="m", path=out)
+    assert load_snapshot_meta("m", path=out) is not None
+    os.remove(out / "weights.pt")
+    assert load_snapshot_meta("m", path=out) is None
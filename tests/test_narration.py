@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import json
+import math
+import struct
+import wave
+from pathlib import Path
+
+import pytest
+
+from src.voice.ffmpeg_pool import run_ffmpeg
+from src.voice.narration import build_narration, merge_narration, scan_mp3
+
+
+def _write_mp3(path: Path, *, seconds: float, sr: int = 24000) -> None:
+    """生成時と同じ設定（VBR・モノラル）で正弦波の MP3 を作る。"""
+
+    n = int(seconds * sr)
+    pcm = b"".join(struct.pack("<h", int(8000 * math.sin(2 * math.pi * 440 * i / sr))) for i in range(n))
+    run_ffmpeg(
+        ["-f", "s16le", "-ar", str(sr), "-ac", "1", "-i", "pipe:0", "-vn", "-c:a", "libmp3lame", "-q:a", "3", str(path)],
+        stdin_bytes=pcm,
+    )
+
+
+def _decoded_samples(path: Path, tmp_path: Path) -> int:
+    wav = tmp_path / f"{path.stem}.wav"
+    run_ffmpeg(["-i", str(path), "-f", "wav", str(wav)])
+    with wave.open(str(wav), "rb") as wf:
+        return wf.getnframes()
+
+
+def test_merge_joins_frames_and_reports_chapter_offsets(tmp_path: Path) -> None:
+    parts = []
+    for i, seconds in enumerate([1.0, 0.4, 1.7]):
+        p = tmp_path / f"voice_{i:03d}.mp3"
+        _write_mp3(p, seconds=seconds)
+        parts.append((i, p))
+    dst = tmp_path / "narration.mp3"
+
+    result = merge_narration(list(reversed(parts)), dst, gap_seconds=0.5, manifest_path=tmp_path / "narration.json")
+
+    scans = [scan_mp3(p) for _, p in parts]
+    gap_samples = round(0.5 * 24000 / 576) * 576
+    chapters = result["chapters"]
+    assert [c["index"] for c in chapters] == [0, 1, 2]
+    assert [c["samples"] for c in chapters] == [s.samples for s in scans]
+    assert chapters[0]["start_sample"] == 0
+    assert chapters[1]["start_sample"] == scans[0].samples + gap_samples
+    assert chapters[2]["start_sample"] == scans[0].samples + scans[1].samples + 2 * gap_samples
+
+    total = sum(s.samples for s in scans) + 2 * gap_samples
+    assert result["duration_seconds"] == round(total / 24000, 3)
+    assert dst.stat().st_size == result["bytes"]
+    assert json.loads((tmp_path / "narration.json").read_text(encoding="utf-8")) == result
+
+    # 再エンコードせずに連結したフレーム列がそのままデコードでき、長さはチャプターの合計と一致する
+    merged = scan_mp3(dst)
+    assert merged.samples == total and merged.info_frame is not None
+    assert _decoded_samples(dst, tmp_path) == total
+
+
+def test_build_narration_skips_missing_rows(tmp_path: Path) -> None:
+    _write_mp3(tmp_path / "voice_000.mp3", seconds=0.5)
+    _write_mp3(tmp_path / "voice_002.mp3", seconds=0.5)
+
+    result = build_narration(tmp_path, indices=[0, 1, 2], gap_seconds=0)
+
+    assert [c["index"] for c in result["chapters"]] == [0, 2]
+    assert result["missing"] == [1]
+    assert result["gap_seconds"] == 0
+    assert (tmp_path / "narration.mp3").exists() and (tmp_path / "narration.json").exists()
+    # indices 省略時は output にある voice_XXX.mp3 をすべて使う（narration.mp3 自体は含めない）
+    assert [c["index"] for c in build_narration(tmp_path)["chapters"]] == [0, 2]
+
+
+def test_merge_rejects_mixed_formats(tmp_path: Path) -> None:
+    _write_mp3(tmp_path / "a.mp3", seconds=0.3)
+    _write_mp3(tmp_path / "b.mp3", seconds=0.3, sr=16000)
+
+    with pytest.raises(ValueError):
+        merge_narration([(0, tmp_path / "a.mp3"), (1, tmp_path / "b.mp3")], tmp_path / "narration.mp3")
+    with pytest.raises(ValueError):
+        merge_narration([], tmp_path / "narration.mp3")
+    assert not (tmp_path / "narration.mp3").exists()
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import os
+import wave
+from pathlib import Path
+
+import pytest
+
+from src.voice.perf_profile import build_grid, load_profile, measurement_groups, save_profile
+from src.voice.worker_pool import fork_supported
+
+
+def test_grid_skips_oversubscribed_and_redundant_configs() -> None:
+    grid = build_grid(cores=4, intra="1,2,4", inter="1", workers="1,2", batch="1,4")
+    keys = {(c["intra_op_threads"], c["synth_workers"], c["batch_size"]) for c in grid}
+    assert (4, 2, 1) not in keys  # 4 スレッド × 2 ワーカー > 4 コア
+    assert (1, 2, 4) not in keys  # ワーカー併用のバッチ推論は計測しない
+    assert {(2, 2, 1), (4, 1, 4), (1, 1, 1)} <= keys
+
+
+def test_profile_is_applied_unless_env_overrides(tmp_path: Path, monkeypatch) -> None:
+    path = tmp_path / "perf_profile.json"
+    monkeypatch.setenv("SVM_PERF_PROFILE", str(path))
+    monkeypatch.delenv("SVM_TTS_BATCH_SIZE", raising=False)
+    monkeypatch.delenv("SVM_SYNTH_WORKERS", raising=False)
+    from src.voice.voice_generator import _synth_workers, _tts_batch_size
+
+    assert load_profile() == {} and _tts_batch_size() == 1
+    save_profile({"intra_op_threads": 2, "inter_op_threads": 1, "synth_workers": 3, "batch_size": 4, "rtf": 0.5})
+    assert load_profile()["rtf"] == 0.5
+    assert (_synth_workers(), _tts_batch_size()) == (3, 4)
+
+    monkeypatch.setenv("SVM_TTS_BATCH_SIZE", "2")
+    assert _tts_batch_size() == 2
+
+
+def test_multi_worker_configs_are_measured_in_their_own_process() -> None:
+    grid = build_grid(cores=4, intra="1,2", inter="1,2", workers="1,2", batch="1")
+    groups = measurement_groups(grid)
+    key = lambda c: tuple(sorted(c.items()))  # noqa: E731
+    assert sorted(map(key, (c for g in groups for c in g))) == sorted(map(key, grid))
+    for g in groups:
+        assert len({c["inter_op_threads"] for c in g}) == 1
+        assert all(c["synth_workers"] == 1 for c in g) or len(g) == 1
+
+
+@pytest.mark.skipif(not fork_supported(), reason="fork is not available")
+def test_run_configs_forks_workers_before_any_parent_inference(tmp_path: Path, monkeypatch, capsys) -> None:
+    """計測でも本番と同じく、親で推論する前（VoiceGenerator の初期化時）にワーカーを fork すること。"""
+
+    import src.voice.perf_profile as perf_profile
+    from src.voice.voice_generator import VoiceGenerator
+    from src.voice.worker_pool import SynthWorkerPool
+
+    monkeypatch.setenv("SVM_FAKE_TTS", "1")
+    for key in ("SVM_SYNTH_CACHE_MAX_MB", "SVM_PERF_PROFILE", "SVM_SYNTH_WORKERS", "SVM_SYNTH_THREADS"):
+        monkeypatch.setenv(key, "")
+    speaker = tmp_path / "speaker.wav"
+    with wave.open(str(speaker), "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(24000)
+        wf.writeframes(b"\x00\x00" * 2400)
+    monkeypatch.setattr(perf_profile, "_voice_args", lambda: {"speaker_wav": speaker})
+
+    parent = os.getpid()
+    calls: list[str] = []
+    init_pool = SynthWorkerPool.__init__
+    synthesize_local = VoiceGenerator._synthesize_local
+
+    def record_fork(self, *args, **kwargs) -> None:
+        calls.append("fork")
+        init_pool(self, *args, **kwargs)
+
+    def record_inference(self, task) -> None:
+        if os.getpid() == parent:
+            calls.append("parent_inference")
+        synthesize_local(self, task)
+
+    monkeypatch.setattr(SynthWorkerPool, "__init__", record_fork)
+    monkeypatch.setattr(VoiceGenerator, "_synthesize_local", record_inference)
+
+    cfg = {"intra_op_threads": 1, "inter_op_threads": 1, "synth_workers": 2, "batch_size": 1}
+    perf_profile._run_configs([cfg], ["こんにちは。", "ありがとうございます。"])
+
+    assert calls == ["fork"]
+    assert "SVM_TUNE_RESULT" in capsys.readouterr().out
+    with pytest.raises(ValueError):
+        perf_profile._run_configs([cfg, {**cfg, "synth_workers": 1}], ["こんにちは。"])
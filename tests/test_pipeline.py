@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import wave
+from pathlib import Path
+
+import pytest
+
+from src.voice.voice_generator import ScriptRow
+
+
+def _write_wav(path: Path) -> None:
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(24000)
+        wf.writeframes(b"\x00\x00" * 2400)
+
+
+def test_generate_rows_keeps_order_and_maps_encode_errors(tmp_path: Path, monkeypatch) -> None:
+    """エンコードを並行化しても出力順は行順で、失敗は該当行に紐づくこと。"""
+    monkeypatch.setenv("SVM_FAKE_TTS", "1")
+    monkeypatch.setenv("SVM_SYNTH_CACHE_MAX_MB", "0")
+    monkeypatch.setenv("SVM_ENCODE_WORKERS", "2")
+    from src.voice.voice_generator import VoiceGenerator
+
+    speaker = tmp_path / "speaker.wav"
+    _write_wav(speaker)
+    vg = VoiceGenerator()
+    rows = [ScriptRow(index=i, script=f"行{i}") for i in range(4)]
+    out = tmp_path / "out"
+
+    paths = vg.generate_rows(rows, speaker_wav=speaker, output_dir=out)
+    assert [p.name for p in paths] == [f"voice_{i:03d}.mp3" for i in range(4)]
+    assert all(p.stat().st_size > 0 for p in paths)
+
+    orig = vg._encode_row
+
+    def flaky(task):
+        if task.index == 2:
+            raise RuntimeError("boom")
+        return orig(task)
+
+    monkeypatch.setattr(vg, "_encode_row", flaky)
+    events: list[tuple[str, int]] = []
+    with pytest.raises(RuntimeError, match="index=2"):
+        vg.generate_rows(rows, speaker_wav=speaker, output_dir=out, on_row=lambda e, i, info: events.append((e, i)))
+
+    assert ("error", 2) in events
+    assert {i for e, i in events if e == "done"} == {0, 1, 3}
+
+
+def test_pcm_is_piped_without_temp_wav(tmp_path: Path, monkeypatch) -> None:
+    """既定では中間WAVを書かず、SVM_KEEP_WAV=1 のときだけ temp/ に残すこと。"""
+    monkeypatch.setenv("SVM_FAKE_TTS", "1")
+    monkeypatch.setenv("SVM_SYNTH_CACHE_MAX_MB", "0")
+    from src.voice.voice_generator import VoiceGenerator
+
+    speaker = tmp_path / "speaker.wav"
+    _write_wav(speaker)
+    vg = VoiceGenerator()
+    out = tmp_path / "out"
+
+    mp3 = vg.generate_one(index=0, script="こんにちは", speaker_wav=speaker, output_dir=out)
+    assert mp3.stat().st_size > 0
+    assert not list(out.glob("temp/*.wav"))
+
+    monkeypatch.setenv("SVM_KEEP_WAV", "1")
+    vg.generate_one(index=1, script="さようなら", speaker_wav=speaker, output_dir=out)
+    assert [p.name for p in out.glob("temp/*.wav")] == ["voice_001.wav"]
+
+
+def test_generate_rows_reports_row_timings_before_returning(tmp_path: Path, monkeypatch) -> None:
+    """"done" 通知には所要時間・音声の長さが載り、generate_rows が返る前に全行ぶん届くこと。"""
+    monkeypatch.setenv("SVM_FAKE_TTS", "1")
+    monkeypatch.setenv("SVM_ENCODE_WORKERS", "2")
+    monkeypatch.setenv("SVM_SYNTH_CACHE_DIR", str(tmp_path / "cache"))
+    from src.voice.voice_generator import VoiceGenerator
+
+    speaker = tmp_path / "speaker.wav"
+    _write_wav(speaker)
+    vg = VoiceGenerator()
+    rows = [ScriptRow(index=i, script=f"行{i}") for i in range(3)]
+    out = tmp_path / "out"
+
+    for expect_cached in (False, True):
+        done: dict[int, dict[str, object]] = {}
+        vg.generate_rows(
+            rows,
+            speaker_wav=speaker,
+            output_dir=out,
+            on_row=lambda e, i, info: done.__setitem__(i, info) if e == "done" else None,
+        )
+        assert sorted(done) == [0, 1, 2]
+        assert all(info["cached"] is expect_cached for info in done.values())
+        if not expect_cached:
+            assert all(float(info["audio_seconds"]) > 0 and "encode_seconds" in info for info in done.values())
+
+
+@pytest.mark.parametrize("batch_size", [1, 2])
+def test_generate_rows_synthesizes_duplicate_scripts_once(tmp_path: Path, monkeypatch, batch_size: int) -> None:
+    """同じ原稿が別の index に出てきたら 1 回だけ合成し、MP3 を複製すること。"""
+    monkeypatch.setenv("SVM_FAKE_TTS", "1")
+    monkeypatch.setenv("SVM_SYNTH_CACHE_MAX_MB", "0")
+    from src.voice.voice_generator import VoiceGenerator
+
+    speaker = tmp_path / "speaker.wav"
+    _write_wav(speaker)
+    vg = VoiceGenerator()
+    encoded: list[int] = []
+    orig = vg._encode_row
+    monkeypatch.setattr(vg, "_encode_row", lambda task: (encoded.append(task.index), orig(task))[1])
+
+    rows = [ScriptRow(index=i, script=s) for i, s in enumerate(["はい", "次へ", "はい", "はい"])]
+    done: dict[int, dict[str, object]] = {}
+    paths = vg.generate_rows(
+        rows,
+        speaker_wav=speaker,
+        output_dir=tmp_path / "out",
+        batch_size=batch_size,
+        on_row=lambda e, i, info: done.__setitem__(i, info) if e == "done" else None,
+    )
+
+    assert sorted(encoded) == [0, 1]
+    assert [p.name for p in paths] == [f"voice_{i:03d}.mp3" for i in range(4)]
+    assert paths[2].read_bytes() == paths[3].read_bytes() == paths[0].read_bytes()
+    assert sorted(done) == [0, 1, 2, 3]
+    assert done[2]["copied_from"] == 0 and done[3]["copied_from"] == 0
+
+
+@pytest.mark.parametrize("path", ["pool", "batch"])
+def test_duplicate_rows_fail_when_source_row_fails(tmp_path: Path, monkeypatch, path: str) -> None:
+    """複製元の行が推論ワーカー・バッチ推論で失敗したら、複製待ちの行にも error が届くこと。"""
+    from concurrent.futures import Future
+
+    monkeypatch.setenv("SVM_FAKE_TTS", "1")
+    monkeypatch.setenv("SVM_SYNTH_CACHE_MAX_MB", "0")
+    from src.voice.voice_generator import VoiceGenerator
+
+    speaker = tmp_path / "speaker.wav"
+    _write_wav(speaker)
+    vg = VoiceGenerator()
+
+    class FailingPool:
+        workers = 2
+
+        def submit(self, task, *, priority=None):
+            fut: Future = Future()
+            fut.set_exception(RuntimeError("boom"))
+            return fut
+
+    if path == "pool":
+        monkeypatch.setattr(vg, "_synth_pool", lambda: FailingPool())
+    else:
+        monkeypatch.setattr(vg, "_infer_chunk_batch", lambda *a, **kw: (_ for _ in ()).throw(RuntimeError("boom")))
+
+    rows = [ScriptRow(index=i, script=s) for i, s in enumerate(["はい", "はい", "はい"])]
+    events: dict[int, list[str]] = {}
+    with pytest.raises(RuntimeError, match="boom"):
+        vg.generate_rows(
+            rows,
+            speaker_wav=speaker,
+            output_dir=tmp_path / "out",
+            batch_size=2 if path == "batch" else 1,
+            on_row=lambda e, i, info: events.setdefault(i, []).append(e),
+        )
+
+    assert events == {0: ["started", "error"], 1: ["started", "error"], 2: ["started", "error"]}
@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+from src.voice.quantize import quantize_dynamic_int8, resolve_quantize_mode
+
+
+def test_resolve_quantize_mode_prefers_env(tmp_path: Path, monkeypatch) -> None:
+    cfg = tmp_path / "tts_model.json"
+    cfg.write_text(json.dumps({"voice_id": "myvoice", "quantize": "int8"}), encoding="utf-8")
+
+    monkeypatch.delenv("SVM_QUANTIZE", raising=False)
+    assert resolve_quantize_mode(cfg) == "int8"
+    monkeypatch.setenv("SVM_QUANTIZE", "off")
+    assert resolve_quantize_mode(cfg) is None
+    monkeypatch.setenv("SVM_QUANTIZE", "fp16")
+    assert resolve_quantize_mode(cfg) is None
+
+
+def test_dynamic_int8_shrinks_linear_layers() -> None:
+    torch = pytest.importorskip("torch")
+    torch.manual_seed(0)
+    model = torch.nn.Sequential(torch.nn.Linear(256, 256), torch.nn.GELU(), torch.nn.Linear(256, 64))
+    x = torch.randn(4, 256)
+    ref = model(x)
+
+    stats = quantize_dynamic_int8(model)
+
+    assert stats["linear_layers"] == 2
+    assert int(stats["bytes_after"]) < int(stats["bytes_before"]) / 2
+    out = model(x)
+    assert torch.nn.functional.cosine_similarity(out.flatten(), ref.flatten(), dim=0) > 0.99
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import wave
+from pathlib import Path
+
+import torch
+
+from src.voice.sample_latents import SampleLatentCache, aggregate_latents
+
+
+def _write_wav(path: Path, seconds: float, value: int) -> Path:
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(24000)
+        wf.writeframes(value.to_bytes(2, "little", signed=True) * int(24000 * seconds))
+    return path
+
+
+def _fake_compute(calls: list[str]):
+    def compute(sample: Path) -> tuple[torch.Tensor, torch.Tensor]:
+        calls.append(sample.name)
+        v = float(sample.read_bytes()[44])  # 先頭サンプルの下位バイト（= _write_wav の value）
+        return torch.full((1, 32, 8), v), torch.full((1, 4, 1), v)
+
+    return compute
+
+
+def test_adding_a_sample_computes_only_that_sample(tmp_path: Path) -> None:
+    samples = [_write_wav(tmp_path / f"sample_0{i}.wav", 1.0, i) for i in (1, 2)]
+    cache = SampleLatentCache(tmp_path / "sample_latents", model_key="m")
+    calls: list[str] = []
+
+    cache.build(samples, _fake_compute(calls))
+    assert calls == ["sample_01.wav", "sample_02.wav"]
+
+    samples.append(_write_wav(tmp_path / "sample_03.wav", 2.0, 3))
+    calls.clear()
+    _, _, entries = cache.build(samples, _fake_compute(calls))
+    assert calls == ["sample_03.wav"]
+    assert [e.cached for e in entries] == [True, True, False]
+    assert entries[2].seconds == 2.0
+
+    # 名前を変えても内容が同じなら再計算しない。モデル設定が変われば計算し直す
+    renamed = samples[0].rename(tmp_path / "renamed.wav")
+    cache.build([renamed], _fake_compute(calls))
+    assert calls == ["sample_03.wav"]
+    SampleLatentCache(tmp_path / "sample_latents", model_key="m:int8").build([renamed], _fake_compute(calls))
+    assert calls == ["sample_03.wav", "renamed.wav"]
+    assert cache.stats()["computed"] == 3 and cache.stats()["reused"] == 3
+
+
+def test_aggregate_weights_gpt_by_duration_and_averages_speaker(tmp_path: Path) -> None:
+    cache = SampleLatentCache(tmp_path / "sample_latents", model_key="m")
+    short = cache.get(_write_wav(tmp_path / "a.wav", 1.0, 0), lambda _: (torch.zeros(1, 2), torch.zeros(3)))
+    long = cache.get(_write_wav(tmp_path / "b.wav", 3.0, 1), lambda _: (torch.full((1, 2), 4.0), torch.full((3,), 2.0)))
+
+    gpt, spk = aggregate_latents([short, long])
+    assert torch.allclose(gpt, torch.full((1, 2), 3.0))
+    assert torch.allclose(spk, torch.full((3,), 1.0))
+
+
+def test_voice_built_from_samples_is_readable_as_voice_cache(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setenv("SVM_FAKE_TTS", "1")
+    from src.voice.voice_generator import VoiceGenerator
+
+    class _Model:
+        def get_conditioning_latents(self, audio_path):
+            return _fake_compute([])(Path(audio_path[0]))
+
+    samples = [_write_wav(tmp_path / f"sample_0{i}.wav", 1.0, i) for i in (1, 3)]
+    voice_file = tmp_path / "voices" / "narrator.pth"
+    voice_file.parent.mkdir()
+    vg = VoiceGenerator()
+    vg._build_voice_from_samples(_Model(), samples, voice_file)
+
+    latents = vg._read_voice_latents(voice_file)
+    assert latents is not None
+    assert torch.allclose(latents["gpt"], torch.full((1, 32, 8), 2.0))
+    assert len(list((tmp_path / "voices" / "sample_latents").glob("*.safetensors"))) == 2
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+
+from src.voice.scheduler import BULK, INTERACTIVE, GenerationScheduler, PriorityGate
+
+
+def _wait_until(cond, timeout: float = 5.0) -> None:
+    deadline = time.time() + timeout
+    while not cond():
+        assert time.time() < deadline
+        time.sleep(0.005)
+
+
+def test_gate_lets_interactive_jump_ahead_of_queued_bulk() -> None:
+    gate = PriorityGate("model", capacity=1)
+    order: list[str] = []
+    release = threading.Event()
+
+    def holder() -> None:
+        with gate.slot(BULK):
+            release.wait()
+
+    def worker(name: str, priority: str) -> None:
+        with gate.slot(priority):
+            order.append(name)
+
+    threads = [threading.Thread(target=holder)]
+    threads[0].start()
+    _wait_until(lambda: gate.stats()["running"] == 1)
+    for name, priority in (("bulk-1", BULK), ("bulk-2", BULK), ("preview", INTERACTIVE)):
+        t = threading.Thread(target=worker, args=(name, priority))
+        t.start()
+        threads.append(t)
+        _wait_until(lambda p=priority: gate.stats()[p]["waiting"] >= 1)
+    time.sleep(0.02)
+    release.set()
+    for t in threads:
+        t.join(timeout=5)
+
+    assert order == ["preview", "bulk-1", "bulk-2"]
+    stats = gate.stats()
+    assert stats["running"] == 0
+    assert stats[BULK]["acquired"] == 3 and stats[INTERACTIVE]["acquired"] == 1
+    assert stats[INTERACTIVE]["max_wait_seconds"] > 0
+
+
+def test_gate_is_reentrant_within_a_thread() -> None:
+    gate = PriorityGate("model", capacity=1)
+    with gate.slot(INTERACTIVE):
+        with gate.slot(INTERACTIVE):
+            assert gate.stats()["running"] == 1
+    assert gate.stats()["running"] == 0
+
+
+def test_scheduler_runs_on_dedicated_threads() -> None:
+    scheduler = GenerationScheduler(interactive_threads=1, bulk_threads=1)
+
+    async def main() -> list[str]:
+        return await asyncio.gather(
+            scheduler.run(INTERACTIVE, lambda: threading.current_thread().name),
+            scheduler.run(BULK, lambda: threading.current_thread().name),
+        )
+
+    try:
+        names = asyncio.run(main())
+    finally:
+        scheduler.close()
+
+    assert names[0].startswith("svm-interactive") and names[1].startswith("svm-bulk")
+    assert scheduler.stats()["executors"][BULK]["acquired"] == 1
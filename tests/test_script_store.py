@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import os
+import shutil
+from pathlib import Path
+
+from src.voice.script_store import ScriptStore, load_script_csv
+
+
+def _csv(path: Path, rows: dict[int, str]) -> Path:
+    lines = ["index,script"] + [f"{i},{text}" for i, text in rows.items()]
+    path.write_text("\n".join(lines) + "\n", encoding="cp932")
+    return path
+
+
+def test_store_reuses_parse_by_stamp_and_content(tmp_path: Path) -> None:
+    store = ScriptStore(max_entries=4)
+    first = _csv(tmp_path / "原稿_20250101-000000.csv", {2: "二", 0: "零", 1: "一"})
+
+    parsed = store.load(first)
+    assert [r.index for r in parsed.rows] == [0, 1, 2]
+    assert parsed.row(1).script == "一" and parsed.row(9) is None
+    assert store.load(first) is parsed
+
+    # 同じ内容の別ファイル（原稿.csv へのコピー）は解析し直さない
+    assert store.load(shutil.copy(first, tmp_path / "原稿.csv")) is parsed
+    assert store.stats() == {
+        "entries": 1, "max_entries": 4, "hits": 1, "content_hits": 1, "parses": 1, "evictions": 0,
+    }
+
+    # 書き換えられたら読み直す
+    _csv(first, {0: "更新"})
+    os.utime(first, ns=(0, 10))
+    assert store.load(first).row(0).script == "更新"
+    assert store.stats()["parses"] == 2
+
+
+def test_store_evicts_least_recently_used(tmp_path: Path) -> None:
+    store = ScriptStore(max_entries=2)
+    a, b, c = (_csv(tmp_path / f"{n}.csv", {0: n}) for n in "abc")
+    store.load(a)
+    store.load(b)
+    store.load(a)
+    store.load(c)
+
+    assert store.stats()["evictions"] == 1
+    store.load(a)
+    assert store.stats()["parses"] == 3  # a は残っている
+    store.load(b)
+    assert store.stats()["parses"] == 4  # b は追い出されていた
+
+
+def test_load_script_csv_detects_encoding_from_prefix(tmp_path: Path) -> None:
+    """UTF-8 は strict 成功で即採用し、それ以外は先頭部分の採点で CP932 / EUC-JP を選ぶこと。"""
+    lines = ["index,script"] + [f"{i},これは{i}行目の原稿です" for i in range(3000)]
+    text = "\n".join(lines) + "\n"
+    for enc in ("utf-8", "cp932", "euc-jp"):
+        p = tmp_path / f"{enc}.csv"
+        p.write_bytes(text.encode(enc))
+        assert len(p.read_bytes()) > 64 * 1024
+        rows = load_script_csv(p)
+        assert len(rows) == 3000
+        assert rows[-1].script == "これは2999行目の原稿です"
+
+
+def test_load_script_csv_single_pass_keeps_rules(tmp_path: Path) -> None:
+    """列順・大文字小文字・欠けた列・不正な index の扱いが従来どおりで、index 順に並ぶこと。"""
+    p = tmp_path / "原稿.csv"
+    p.write_text("Script , Index ,note\n二行目,2,x\n,abc\n一行目,1\n\n空,\n末尾,3,y,z\n", encoding="utf-8")
+
+    rows = load_script_csv(p)
+    assert [(r.index, r.script) for r in rows] == [(1, "一行目"), (2, "二行目"), (3, "末尾")]
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import threading
+import time
+import wave
+from pathlib import Path
+
+import pytest
+
+from src.voice.events import subscribe_events
+from src.voice.single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution() -> None:
+    flights: SingleFlight[int] = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls: list[int] = []
+    results: list[tuple[int, bool]] = []
+
+    def slow() -> int:
+        calls.append(1)
+        started.set()
+        release.wait()
+        return 42
+
+    leader = threading.Thread(target=lambda: results.append(flights.do("k", slow)))
+    leader.start()
+    started.wait(timeout=5)
+    followers = [threading.Thread(target=lambda: results.append(flights.do("k", slow))) for _ in range(2)]
+    for t in followers:
+        t.start()
+    while flights.stats()["shared"] < 2:
+        time.sleep(0.001)
+    release.set()
+    for t in [leader, *followers]:
+        t.join(timeout=5)
+
+    assert len(calls) == 1
+    assert sorted(results) == [(42, False), (42, True), (42, True)]
+    # 完了したキーは忘れる（次の呼び出しは実行し直す）
+    assert flights.do("k", lambda: 7) == (7, False)
+    assert flights.stats() == {"in_flight": 0, "executed": 2, "shared": 2}
+
+
+def test_errors_are_raised_and_not_remembered() -> None:
+    flights: SingleFlight[int] = SingleFlight()
+
+    def boom() -> int:
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError, match="boom"):
+        flights.do("k", boom)
+    assert flights.do("k", lambda: 1) == (1, False)
+
+
+def test_generate_one_coalesces_identical_requests(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setenv("SVM_FAKE_TTS", "1")
+    monkeypatch.setenv("SVM_SYNTH_CACHE_MAX_MB", "0")
+    from src.voice.voice_generator import VoiceGenerator
+
+    speaker = tmp_path / "speaker.wav"
+    with wave.open(str(speaker), "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(24000)
+        wf.writeframes(b"\x00\x00" * 2400)
+
+    vg = VoiceGenerator()
+    gate = threading.Barrier(2)
+    synth_calls: list[int] = []
+    orig = vg._synthesize_local
+
+    def slow_synth(task):
+        synth_calls.append(task.index)
+        gate.wait(timeout=5)  # 2 件目のリクエストが待ちに入るまで止める
+        return orig(task)
+
+    monkeypatch.setattr(vg, "_synthesize_local", slow_synth)
+    kwargs = dict(index=3, script="同じ原稿", speaker_wav=speaker, output_dir=tmp_path / "out")
+    paths: list[Path] = []
+    events: list[dict] = []
+    unsubscribe = subscribe_events(events.append)
+    threads = [threading.Thread(target=lambda: paths.append(vg.generate_one(**kwargs))) for _ in range(2)]
+    try:
+        for t in threads:
+            t.start()
+        while vg.coalesce_stats()["shared"] < 1:
+            time.sleep(0.001)
+        gate.wait(timeout=5)
+        for t in threads:
+            t.join(timeout=5)
+    finally:
+        unsubscribe()
+
+    assert synth_calls == [3]
+    assert paths == [tmp_path / "out" / "voice_003.mp3"] * 2
+    # まとめられた側にも完了イベントが届く
+    done = [e for e in events if e["type"] == "row" and e["stage"] == "mp3_done"]
+    assert [bool(e.get("coalesced")) for e in done] == [False, True]
+
+
+def test_generate_one_does_not_coalesce_different_flags(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setenv("SVM_FAKE_TTS", "1")
+    from src.voice.voice_generator import VoiceGenerator
+
+    vg = VoiceGenerator()
+    started = threading.Barrier(2)
+    keys: list[tuple] = []
+    orig = vg._flights.do
+
+    def do(key, fn):
+        keys.append(key)
+        started.wait(timeout=5)  # 2 件とも実行中に入ってから進める
+        return orig(key, lambda: tmp_path / "voice_003.mp3")
+
+    monkeypatch.setattr(vg._flights, "do", do)
+    base = dict(index=3, script="同じ原稿", output_dir=tmp_path)
+    threads = [
+        threading.Thread(target=vg.generate_one, kwargs={**base, "use_cache": True}),
+        threading.Thread(target=vg.generate_one, kwargs={**base, "use_cache": False}),
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=5)
+
+    assert len(keys) == 2 and keys[0] != keys[1]
+    assert vg.coalesce_stats()["shared"] == 0
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import time
+import wave
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src.voice.streaming import Mp3StreamEncoder, StreamResult, pump_stream
+
+
+def _write_wav(path: Path) -> None:
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(24000)
+        wf.writeframes(b"\x00\x00" * 2400)
+
+
+def _to_pcm(audio: np.ndarray) -> bytes:
+    return (audio * 32767.0).astype("<i2").tobytes()
+
+
+def test_stream_yields_mp3_then_persists(tmp_path: Path, monkeypatch) -> None:
+    """チャンクが逐次返り、反復し終えると voice_XXX.mp3 が保存されて次回はキャッシュから返ること。"""
+    monkeypatch.setenv("SVM_FAKE_TTS", "1")
+    monkeypatch.setenv("SVM_SYNTH_CACHE_DIR", str(tmp_path / "cache"))
+    from src.voice.voice_generator import VoiceGenerator
+
+    speaker = tmp_path / "speaker.wav"
+    _write_wav(speaker)
+    vg = VoiceGenerator()
+    out = tmp_path / "out"
+
+    stream = vg.open_stream(index=3, script="ストリーミングのテストです。", speaker_wav=speaker, output_dir=out)
+    assert not stream.cached and stream.path == out / "voice_003.mp3"
+    chunks = list(stream)
+    assert len(chunks) > 1 and all(chunks)
+    assert stream.path.exists() and stream.path.stat().st_size > 0
+
+    again = vg.open_stream(index=3, script="ストリーミングのテストです。", speaker_wav=speaker, output_dir=out)
+    assert again.cached
+    assert b"".join(again) == stream.path.read_bytes()
+
+
+def test_stream_cancel_stops_producer_and_skips_persist(tmp_path: Path, monkeypatch) -> None:
+    """途中で反復をやめると推論側が止まり、ファイルは書かれないこと。"""
+    monkeypatch.setenv("SVM_FAKE_TTS", "1")
+    monkeypatch.setenv("SVM_SYNTH_CACHE_MAX_MB", "0")
+    from src.voice.voice_generator import VoiceGenerator
+
+    speaker = tmp_path / "speaker.wav"
+    _write_wav(speaker)
+    vg = VoiceGenerator()
+    out = tmp_path / "out"
+
+    stream = vg.open_stream(index=0, script="あ" * 100, speaker_wav=speaker, output_dir=out)
+    it = iter(stream)
+    assert next(it)
+    it.close()  # type: ignore[attr-defined]
+    assert not stream.path.exists()
+
+    produced: list[int] = []
+
+    def endless():
+        while True:
+            produced.append(1)
+            yield np.zeros((6000,), dtype=np.float32)
+
+    result = StreamResult()
+    gen = pump_stream(endless(), Mp3StreamEncoder(24000, ["-c:a", "libmp3lame"]), result, to_pcm=_to_pcm)
+    assert next(gen)
+    gen.close()
+    assert result.cancelled
+    n = len(produced)
+    time.sleep(0.2)
+    assert len(produced) == n  # 停止後は推論側が進まない
+
+
+def test_pump_stream_reraises_producer_error() -> None:
+    def broken():
+        yield np.zeros((2400,), dtype=np.float32)
+        raise ValueError("inference failed")
+
+    result = StreamResult()
+    gen = pump_stream(broken(), Mp3StreamEncoder(24000, ["-c:a", "libmp3lame"]), result, to_pcm=_to_pcm)
+    with pytest.raises(ValueError, match="inference failed"):
+        list(gen)
+    assert len(result.chunks) == 1
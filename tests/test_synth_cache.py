@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import wave
+from pathlib import Path
+
+from src.voice.synth_cache import SynthCache, make_cache_key
+
+
+def _key(script: str) -> str:
+    return make_cache_key(
+        script=script,
+        voice_id="myvoice",
+        voice_digest="abc",
+        model_name="fake",
+        language="ja",
+        params={"enable_text_splitting": True},
+    )
+
+
+def test_cache_key_normalizes_whitespace() -> None:
+    """空白/全角差分だけの原稿は同じキーになること。"""
+    assert _key("こんにちは　 世界\n") == _key("こんにちは 世界")
+    assert _key("こんにちは") != _key("こんばんは")
+
+
+def test_cache_evicts_least_recently_used(tmp_path: Path) -> None:
+    cache = SynthCache(tmp_path / "cache", max_bytes=25)
+    for name in ("a", "b", "c"):
+        src = tmp_path / f"{name}.mp3"
+        src.write_bytes(b"x" * 10)
+        cache.store(name, src)
+        if name == "b":
+            # a を参照して最近使ったことにする → 次に追い出されるのは b
+            assert cache.fetch("a", tmp_path / "out_a.mp3")
+
+    assert cache.fetch("a", tmp_path / "out.mp3")
+    assert not cache.fetch("b", tmp_path / "out.mp3")
+    st = cache.stats()
+    assert st["evictions"] == 1
+    assert st["bytes"] <= 25
+
+
+def test_file_digest_memo_keeps_only_recent_files(tmp_path: Path, monkeypatch) -> None:
+    import src.voice.synth_cache as synth_cache
+
+    monkeypatch.setattr(synth_cache, "_DIGEST_MEMO", synth_cache.OrderedDict())
+    monkeypatch.setattr(synth_cache, "_DIGEST_MEMO_MAX", 3)
+    paths = []
+    for i in range(5):
+        p = tmp_path / f"sample_{i:02d}.wav"
+        p.write_bytes(bytes([i]) * 10)
+        paths.append(p)
+        synth_cache.file_digest(p)
+        if i == 2:
+            synth_cache.file_digest(paths[0])  # 最近使ったので残る
+
+    assert list(synth_cache._DIGEST_MEMO) == [str(paths[i].resolve()) for i in (0, 3, 4)]
+
+
+def test_fetch_counts_hit_only_after_placing_file(tmp_path: Path, monkeypatch) -> None:
+    import src.voice.synth_cache as synth_cache
+
+    cache = SynthCache(tmp_path / "cache", max_bytes=100)
+    src = tmp_path / "a.mp3"
+    src.write_bytes(b"x" * 10)
+    cache.store("a", src)
+
+    def fail(src: Path, dst: Path) -> None:
+        raise OSError("disk full")
+
+    monkeypatch.setattr(synth_cache, "_link_or_copy", fail)
+    assert not cache.fetch("a", tmp_path / "out.mp3")
+    st = cache.stats()
+    assert (st["hits"], st["misses"]) == (0, 1)
+
+    monkeypatch.undo()
+    assert cache.fetch("a", tmp_path / "out.mp3")
+    st = cache.stats()
+    assert (st["hits"], st["misses"]) == (1, 1)
+
+
+def test_generate_one_reuses_cached_mp3(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setenv("SVM_FAKE_TTS", "1")
+    monkeypatch.setenv("SVM_SYNTH_CACHE_DIR", str(tmp_path / "cache"))
+    from src.voice.voice_generator import VoiceGenerator
+
+    speaker = tmp_path / "speaker.wav"
+    with wave.open(str(speaker), "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(24000)
+        wf.writeframes(b"\x00\x00" * 2400)
+
+    vg = VoiceGenerator()
+    out = tmp_path / "out"
+    p0 = vg.generate_one(index=0, script="テスト", speaker_wav=speaker, output_dir=out)
+    p1 = vg.generate_one(index=1, script="テスト", speaker_wav=speaker, output_dir=out)
+    vg.generate_one(index=2, script="テスト", speaker_wav=speaker, output_dir=out, use_cache=False)
+
+    assert p1.read_bytes() == p0.read_bytes()
+    st = vg.synth_cache_stats()
+    assert st["hits"] == 1
+    assert st["misses"] == 1
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import asyncio
+import io
+import wave
+from pathlib import Path
+
+import pytest
+
+from src.uploads import UploadLimitMiddleware, UploadTooLarge, copy_upload, retry_on_permission_error
+from src.voice.ffmpeg_pool import is_xtts_wav
+
+
+def test_copy_upload_streams_in_chunks_and_enforces_limit(tmp_path: Path) -> None:
+    data = bytes(range(256)) * 100
+    dst = tmp_path / "out.bin"
+    assert copy_upload(io.BytesIO(data), dst, max_bytes=len(data), chunk_size=1000) == len(data)
+    assert dst.read_bytes() == data
+
+    big = tmp_path / "big.bin"
+    with pytest.raises(UploadTooLarge):
+        copy_upload(io.BytesIO(data), big, max_bytes=len(data) - 1, chunk_size=1000)
+    assert not big.exists() and not list(tmp_path.glob("*.part"))
+
+
+def test_retry_does_not_block_event_loop() -> None:
+    attempts: list[int] = []
+    ticks: list[int] = []
+
+    def locked_twice() -> str:
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise PermissionError("locked")
+        return "ok"
+
+    async def ticker() -> None:
+        for _ in range(5):
+            ticks.append(1)
+            await asyncio.sleep(0.02)
+
+    async def main() -> str:
+        result, _ = await asyncio.gather(retry_on_permission_error(locked_twice, delay=0.05), ticker())
+        return result
+
+    assert asyncio.run(main()) == "ok"
+    assert len(attempts) == 3 and len(ticks) == 5
+
+
+def test_is_xtts_wav(tmp_path: Path) -> None:
+    def write(path: Path, rate: int, channels: int) -> Path:
+        with wave.open(str(path), "wb") as wf:
+            wf.setnchannels(channels)
+            wf.setsampwidth(2)
+            wf.setframerate(rate)
+            wf.writeframes(b"\x00\x00" * channels * 240)
+        return path
+
+    assert is_xtts_wav(write(tmp_path / "ok.wav", 24000, 1))
+    assert not is_xtts_wav(write(tmp_path / "stereo.wav", 24000, 2))
+    assert not is_xtts_wav(write(tmp_path / "44k.wav", 44100, 1))
+    (tmp_path / "rec.webm").write_bytes(b"\x1aE\xdf\xa3")
+    assert not is_xtts_wav(tmp_path / "rec.webm")
+
+
+def test_upload_limit_rejects_by_content_length_before_reading_body(monkeypatch) -> None:
+    monkeypatch.setenv("SVM_UPLOAD_MAX_MB", "1")
+    called: list[str] = []
+
+    async def app(scope, receive, send) -> None:
+        called.append(scope["path"])
+
+    async def receive() -> dict[str, object]:
+        raise AssertionError("body must not be read")
+
+    async def run(path: str, length: int) -> list[dict[str, object]]:
+        sent: list[dict[str, object]] = []
+
+        async def send(message: dict[str, object]) -> None:
+            sent.append(message)
+
+        scope = {"type": "http", "path": path, "headers": [(b"content-length", str(length).encode())]}
+        await UploadLimitMiddleware(app, paths=("/api/upload/csv",))(scope, receive, send)
+        return sent
+
+    sent = asyncio.run(run("/api/upload/csv", 2 * 1024 * 1024))
+    assert sent[0]["status"] == 413 and called == []
+    # 上限以内・対象外のパスはそのまま通す（本文のサイズはコピー時にも確かめる）
+    assert asyncio.run(run("/api/upload/csv", 1024 * 1024)) == []
+    assert asyncio.run(run("/api/generate_audio", 2 * 1024 * 1024)) == []
+    assert called == ["/api/upload/csv", "/api/generate_audio"]
@@ -28,3 +28,22 @@ def test_load_voice_file_allows_pickle_objects(tmp_path):
     assert "speaker_embedding" in loaded
     assert isinstance(loaded.get("custom"), _Dummy)
     assert loaded["custom"].value == 7
+
+
+def test_read_voice_latents_writes_and_prefers_compact_file(tmp_path, monkeypatch):
+    """.pth から読めたら軽量ファイルを書き、次回はそちら（unpickle 無し）から読むこと."""
+
+    monkeypatch.setenv("SVM_FAKE_TTS", "1")
+    from src.voice.voice_generator import VoiceGenerator
+
+    voice_file = tmp_path / "voice.pth"
+    torch.save({"nested": {"gpt_cond_latent": torch.ones((1, 4)), "speaker_embedding": torch.ones((1, 3))}}, voice_file)
+    vg = VoiceGenerator()
+
+    first = vg._read_voice_latents(voice_file)
+    assert first is not None and first["gpt_key"] == "gpt_cond_latent" and "content_hash" not in first
+    assert (tmp_path / "voice.safetensors").exists()
+
+    second = vg._read_voice_latents(voice_file)
+    assert second is not None and second["content_hash"]
+    assert torch.equal(second["gpt"], first["gpt"]) and torch.equal(second["spk"], first["spk"])
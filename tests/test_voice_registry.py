@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+import numpy as np
+
+from src.voice.voice_registry import VoiceRegistry
+
+
+def _latents(kb: int) -> dict[str, object]:
+    return {"gpt": np.zeros((kb * 256,), dtype=np.float32), "spk": np.zeros((0,), dtype=np.float32)}
+
+
+def test_lru_eviction_keeps_recent_voices_within_budget() -> None:
+    reg = VoiceRegistry(max_bytes=2 * 1024)
+    reg.put("a", _latents(1))
+    reg.put("b", _latents(1))
+    assert reg.get("a", loader=lambda: None) is not None  # a を直近利用にする
+    reg.put("c", _latents(1))
+
+    st = reg.stats()
+    assert st["voices"] == ["a", "c"] and st["bytes"] == 2 * 1024
+    assert st["evictions"] == 1 and st["hits"] == 1
+
+    # 1 つで上限を超える voice も、直前に使ったものとしては残す
+    reg.put("big", _latents(4))
+    assert reg.stats()["voices"] == ["big"]
+
+
+def test_lazy_load_and_reload_when_source_changes(tmp_path: Path) -> None:
+    src = tmp_path / "narrator.pth"
+    src.write_bytes(b"v1")
+    calls: list[int] = []
+
+    def loader() -> dict[str, object]:
+        calls.append(1)
+        return _latents(1)
+
+    reg = VoiceRegistry(max_bytes=1 << 20)
+    first = reg.get("narrator", source=src, loader=loader)
+    assert first is not None and reg.get("narrator", source=src, loader=loader) is first
+    assert len(calls) == 1
+
+    src.write_bytes(b"v2-rebuilt")
+    os.utime(src, ns=(0, 1))
+    second = reg.get("narrator", source=src, loader=loader)
+    assert second is not first and len(calls) == 2
+
+    assert reg.get("missing", source=tmp_path / "missing.pth", loader=lambda: None) is None
+    st = reg.stats()
+    assert (st["hits"], st["misses"], st["loads"]) == (1, 3, 2)
+    assert "missing" not in reg
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+import pytest
+import torch
+
+from src.voice.voice_tensors import compact_path, content_hash, load_compact_voice, save_compact_voice
+
+
+def _legacy_pth(tmp_path: Path) -> Path:
+    voice_file = tmp_path / "narrator.pth"
+    torch.save({"meta": {"gpt_conditioning_latents": torch.ones(1, 32, 1024)}}, voice_file)
+    return voice_file
+
+
+@pytest.mark.parametrize("dtype", [torch.float32, torch.float16, torch.bfloat16])
+def test_compact_voice_roundtrip(tmp_path: Path, dtype: torch.dtype) -> None:
+    voice_file = _legacy_pth(tmp_path)
+    gpt = torch.randn(1, 32, 1024).to(dtype)
+    spk = torch.randn(1, 512, 1).to(dtype)
+    out = save_compact_voice(voice_file, gpt=gpt, spk=spk)
+    assert out == compact_path(voice_file) == tmp_path / "narrator.safetensors"
+
+    data = load_compact_voice(voice_file)
+    assert data is not None
+    assert data["gpt_cond_latent"].dtype == dtype
+    assert torch.equal(data["gpt_cond_latent"], gpt) and torch.equal(data["speaker_embedding"], spk)
+    assert data["content_hash"] == content_hash(gpt, spk)
+
+
+def test_compact_voice_rejects_stale_or_tampered_files(tmp_path: Path) -> None:
+    voice_file = _legacy_pth(tmp_path)
+    path = save_compact_voice(voice_file, gpt=torch.zeros(1, 4), spk=torch.zeros(1, 2))
+
+    # データ部の 1 バイトを書き換えると内容ハッシュが一致しない
+    raw = bytearray(path.read_bytes())
+    raw[-1] ^= 0xFF
+    path.write_bytes(bytes(raw))
+    assert load_compact_voice(voice_file) is None
+
+    # .pth が作り直された
+    save_compact_voice(voice_file, gpt=torch.zeros(1, 4), spk=torch.zeros(1, 2))
+    assert load_compact_voice(voice_file) is not None
+    os.utime(voice_file, ns=(0, 1))
+    assert load_compact_voice(voice_file) is None
+
+    path.write_bytes(b"broken")
+    assert load_compact_voice(voice_file) is None
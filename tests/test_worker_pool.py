@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import os
+import wave
+from pathlib import Path
+
+import pytest
+
+from src.voice.worker_pool import SynthWorkerPool, fork_supported, split_cores
+
+pytestmark = pytest.mark.skipif(not fork_supported(), reason="fork is not available")
+
+
+def _square_or_die(x: int) -> int:
+    if x < 0:
+        os._exit(3)
+    return x * x
+
+
+def _write_wav(path: Path) -> None:
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(24000)
+        wf.writeframes(b"\x00\x00" * 2400)
+
+
+def test_split_cores() -> None:
+    assert split_cores([0, 1, 2, 3, 4], 2) == [[0, 1, 2], [3, 4]]
+    assert split_cores([0], 2) == [[0], [0]]
+
+
+def test_pool_dispatches_reports_and_recovers_from_dead_worker() -> None:
+    pool = SynthWorkerPool(_square_or_die, workers=2, threads_per_worker=2)
+    try:
+        assert [f.result(10) for f in [pool.submit(i) for i in range(6)]] == [i * i for i in range(6)]
+
+        with pytest.raises(RuntimeError, match="exited unexpectedly"):
+            pool.submit(-1).result(10)
+        assert pool.submit(7).result(10) == 49
+
+        stats = pool.stats()
+        assert sum(w["tasks"] for w in stats["per_worker"]) == 7
+        assert sum(w["restarts"] for w in stats["per_worker"]) == 1
+        # 補充したワーカーは親が並列処理を実行した後の fork なので 1 スレッドに制限する
+        assert sorted(w["threads"] for w in stats["per_worker"]) == [1, 2]
+        assert all(0.0 <= w["utilization"] <= 1.0 for w in stats["per_worker"])
+    finally:
+        pool.close()
+
+
+def test_generate_rows_with_worker_processes(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setenv("SVM_FAKE_TTS", "1")
+    monkeypatch.setenv("SVM_SYNTH_CACHE_MAX_MB", "0")
+    monkeypatch.setenv("SVM_SYNTH_WORKERS", "2")
+    from src.voice.voice_generator import ScriptRow, VoiceGenerator
+
+    speaker = tmp_path / "speaker.wav"
+    _write_wav(speaker)
+    vg = VoiceGenerator()
+    try:
+        # 推論する前（モデルのロード直後）に fork 済み
+        assert vg.synth_pool_stats() is not None
+        rows = [ScriptRow(index=i, script=f"行{i}") for i in range(5)]
+        paths = vg.generate_rows(rows, speaker_wav=speaker, output_dir=tmp_path / "out")
+        assert [p.name for p in paths] == [f"voice_{i:03d}.mp3" for i in range(5)]
+        assert all(p.stat().st_size > 0 for p in paths)
+        stats = vg.synth_pool_stats()
+        assert stats is not None and sum(w["tasks"] for w in stats["per_worker"]) == 5
+    finally:
+        if vg._procs is not None:
+            vg._procs.close()
+
+
+def _sleep_and_return(x: int) -> int:
+    import time
+
+    time.sleep(0.2 if x == 0 else 0.01)
+    return x
+
+
+def test_pool_hands_interactive_tasks_out_first_and_reserve_holds_a_worker() -> None:
+    from src.voice.scheduler import INTERACTIVE
+
+    pool = SynthWorkerPool(_sleep_and_return, workers=1, threads_per_worker=1)
+    try:
+        done: list[int] = []
+        first = pool.submit(0)  # 唯一のワーカーを塞ぐ
+        futures = [pool.submit(1), pool.submit(2), pool.submit(3, priority=INTERACTIVE)]
+        for f in futures:
+            f.add_done_callback(lambda f: done.append(f.result()))
+        first.result(10)
+        for f in futures:
+            f.result(10)
+        assert done == [3, 1, 2]
+
+        # reserve() の間はワーカーへ割り当てない
+        with pool.reserve(INTERACTIVE):
+            held = pool.submit(4)
+            assert pool.stats()["reserved"] == 1
+            assert not held.done() and pool.stats()["queued"]["bulk"] == 1
+        assert held.result(10) == 4
+    finally:
+        pool.close()